@@ -0,0 +1,215 @@
+# benchmarks/api_fixtures.py
+"""
+Recorded and stubbed OpenAI / Cohere responses for offline benchmarks.
+
+`ApiFixtures.install()` swaps `openai.embeddings.create`, `openai.chat.completions.create`
+and the Cohere reranker's client for local replacements, so the unmodified pipeline runs
+without network access or API keys:
+
+- replay: responses recorded earlier (`--record`) are served from a JSON file keyed by a
+  hash of the request, so relevance numbers reflect the real models;
+- stub: requests missing from the recording get deterministic local answers, i.e.
+  hashed bag-of-words embeddings, keyword tagging and token-overlap rerank scores. The
+  numbers are only comparable with other stub runs.
+
+Each replacement can sleep `latency_s` to model network round trips under concurrency.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+import numpy as np
+
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+import openai
+
+from utils.prompts import PRODUCT_TAGGING_PROMPT, QUERY_TAGGING_PROMPT
+from utils.rerankers import get_reranker
+from utils.sparse_encoder import tokenize
+from utils.vector_store import EMBEDDING_DIMS
+
+logger = logging.getLogger("api_fixtures")
+
+FIXTURES_PATH = "./benchmarks/fixtures/api_responses.json"
+
+# Keyword tagger standing in for the LLM: tag -> pattern over the lower-cased document/query
+STUB_TAG_RULES = {
+    "lego": r"\blego\b|\bduplo\b",
+    "stem": r"\bstem\b|science|coding|circuits|engineering",
+    "wood": r"\bwood(?:en)?\b",
+    "plastic": r"material: plastic",
+    "puzzle": r"puzzle|jigsaw",
+    "board game": r"board game|card game|memory game",
+    "educational": r"educational|learn",
+    "toddler": r"toddler|baby|babies",
+    "preschool": r"preschool",
+    "family": r"famil(?:y|ies)",
+    "plush": r"plush|teddy",
+    "outdoor": r"outdoor|garden",
+    "pretend play": r"pretend|role-play",
+}
+STUB_AGE_PATTERN = re.compile(r"age:\s*(\d+)\s+years? and up")
+
+
+def request_key(*parts: str) -> str:
+    return hashlib.sha256("\x00".join(parts).encode("utf-8")).hexdigest()
+
+
+def stub_embedding(text: str, dims: int = EMBEDDING_DIMS) -> List[float]:
+    """Signed feature hashing of the BM25 tokens: texts sharing words get a positive cosine."""
+    vector = np.zeros(dims, dtype=np.float32)
+    for token in tokenize(text):
+        digest = hashlib.blake2b((token.rstrip("s") or token).encode("utf-8"), digest_size=8).digest()
+        value = int.from_bytes(digest, "little")
+        vector[value % dims] += 1.0 if value >> 63 else -1.0
+    norm = np.linalg.norm(vector)
+    return (vector / norm if norm else vector).tolist()
+
+
+def stub_tags(text: str, with_age: bool = True) -> List[str]:
+    text = text.lower()
+    tags = [tag for tag, pattern in STUB_TAG_RULES.items() if re.search(pattern, text)]
+    if with_age:
+        tags += [f"{age}+" for age in STUB_AGE_PATTERN.findall(text)[:1]]
+    return tags
+
+
+def stub_chat(system_prompt: str, user_input: str) -> str:
+    if system_prompt == PRODUCT_TAGGING_PROMPT:
+        return json.dumps({"tags": stub_tags(user_input)})
+    if system_prompt == QUERY_TAGGING_PROMPT:
+        return json.dumps({"tags": stub_tags(user_input, with_age=False)})
+    names = re.findall(r"^Product Name: (.*)$", user_input, re.MULTILINE)
+    return "## Recommendation\n\n" + "\n".join(f"- {name}" for name in names[:3])
+
+
+def stub_rerank_scores(query: str, documents: List[str]) -> List[float]:
+    terms = {token.rstrip("s") for token in tokenize(query)}
+    return [
+        len(terms & {token.rstrip("s") for token in tokenize(doc)}) / (len(terms) or 1)
+        for doc in documents
+    ]
+
+
+class ApiFixtures:
+    """
+    Replays recorded API responses, falling back to deterministic stubs.
+
+    With `record=True` misses go to the live APIs instead and are saved by `save()`.
+    """
+
+    def __init__(self, path: Optional[str] = FIXTURES_PATH, record: bool = False, latency_s: float = 0.0):
+        self.path = path
+        self.record = record
+        self.latency_s = latency_s
+        self.responses: Dict[str, dict] = {"embeddings": {}, "chat": {}, "rerank": {}}
+        if path and Path(path).exists():
+            with open(path, encoding="utf-8") as f:
+                self.responses.update(json.load(f))
+        self.replayed = 0
+        self.stubbed = 0
+        self.recorded = 0
+        self._lock = threading.Lock()
+        self._live = {}
+
+    @property
+    def mode(self) -> str:
+        if self.record:
+            return "record"
+        return "replay" if any(self.responses.values()) else "stub"
+
+    def _lookup(self, kind: str, key: str, live, stub):
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        with self._lock:
+            if key in self.responses[kind]:
+                self.replayed += 1
+                return self.responses[kind][key]
+        if self.record:
+            value = live()
+            with self._lock:
+                self.responses[kind][key] = value
+                self.recorded += 1
+            return value
+        with self._lock:
+            self.stubbed += 1
+        return stub()
+
+    # --- OpenAI ---
+    def embeddings_create(self, input, model, **kwargs):
+        texts = input if isinstance(input, list) else [input]
+        vectors = [
+            self._lookup(
+                "embeddings", request_key(model, text),
+                lambda text=text: self._live["embeddings"](input=text, model=model).data[0].embedding,
+                lambda text=text: stub_embedding(text),
+            )
+            for text in texts
+        ]
+        tokens = sum(len(text.split()) for text in texts)
+        return SimpleNamespace(
+            data=[SimpleNamespace(index=i, embedding=vector) for i, vector in enumerate(vectors)],
+            usage=SimpleNamespace(prompt_tokens=tokens, total_tokens=tokens),
+        )
+
+    def chat_create(self, model, messages, temperature=0.3, stream=False, stream_options=None, **kwargs):
+        system_prompt, user_input = messages[0]["content"], messages[-1]["content"]
+
+        def live():
+            response = self._live["chat"](model=model, messages=messages, temperature=temperature)
+            return response.choices[0].message.content
+
+        content = self._lookup("chat", request_key(model, system_prompt, user_input), live,
+                               lambda: stub_chat(system_prompt, user_input))
+        usage = SimpleNamespace(prompt_tokens=(len(system_prompt) + len(user_input)) // 4,
+                                completion_tokens=len(content) // 4)
+        if not stream:
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=usage)
+        deltas = re.findall(r"\S+\s*", content)
+        return iter(
+            [SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=delta))], usage=None)
+             for delta in deltas]
+            + [SimpleNamespace(choices=[], usage=usage)]
+        )
+
+    # --- Cohere ---
+    def rerank(self, query, documents, model, top_n=None, **kwargs):
+        def live():
+            response = self._live["rerank"](query=query, documents=documents, model=model, top_n=len(documents))
+            scores = [0.0] * len(documents)
+            for result in response.results:
+                scores[result.index] = result.relevance_score
+            return scores
+
+        scores = self._lookup("rerank", request_key(model, query, *documents), live,
+                              lambda: stub_rerank_scores(query, documents))
+        ranked = sorted(range(len(documents)), key=lambda i: scores[i], reverse=True)[:top_n or len(documents)]
+        return SimpleNamespace(results=[SimpleNamespace(index=i, relevance_score=scores[i]) for i in ranked])
+
+    def install(self) -> "ApiFixtures":
+        """Patch the OpenAI module functions and the shared Cohere reranker's client."""
+        self._live["embeddings"] = openai.embeddings.create
+        self._live["chat"] = openai.chat.completions.create
+        if self.record:
+            import cohere
+            self._live["rerank"] = cohere.Client(os.getenv("COHERE_API_KEY")).rerank
+        openai.embeddings.create = self.embeddings_create
+        openai.chat.completions.create = self.chat_create
+        get_reranker("cohere")._client = SimpleNamespace(rerank=self.rerank)
+        return self
+
+    def save(self, path: Optional[str] = None):
+        path = path or self.path
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.responses, f)
+        logger.info(f"💾 Saved {sum(len(v) for v in self.responses.values())} recorded responses to {path}")
+
+    def stats(self) -> dict:
+        return {"mode": self.mode, "replayed": self.replayed, "stubbed": self.stubbed, "recorded": self.recorded}
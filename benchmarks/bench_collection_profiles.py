@@ -0,0 +1,181 @@
+# benchmarks/bench_collection_profiles.py
+"""
+RAM, build time, QPS and recall@k of each collection profile (quantization, on-disk
+vectors, HNSW settings, Matryoshka dims) from `utils.vector_store.PROFILES`.
+
+Every profile indexes the same vectors into a throwaway collection. Recall is measured
+against exact float32 search over the full 1536-d vectors, so it includes the loss from
+quantization, the HNSW approximation and Matryoshka truncation. Vectors come from the
+catalog through the embedding cache, so repeated runs make no API calls. Use
+`--synthetic N` for random vectors and no API access. Random vectors have no Matryoshka
+structure, so truncated profiles show much lower recall on them than on real embeddings.
+
+Quantization, on-disk storage and HNSW only take effect on a Qdrant server (--url).
+Embedded storage searches exactly and reports the dimension effect only. RAM is the
+Qdrant sizing estimate for the profile, plus the server's resident memory after the
+build when --url is given.
+
+    python -m benchmarks.bench_collection_profiles --url http://localhost:6333 --queries 200 --k 10
+"""
+import argparse
+import json
+import re
+import shutil
+import tempfile
+import time
+import urllib.request
+import uuid
+import numpy as np
+
+from concurrent.futures import ThreadPoolExecutor
+
+from qdrant_client import QdrantClient
+from qdrant_client.http.models import CollectionStatus, PointStruct
+
+from benchmarks.bench_hybrid_retrieval import INPUT_PATH
+from core.feature_extraction_pipeline import read_rag_dataset
+from utils.llm_utils import get_embeddings
+from utils.vector_store import (
+    EMBEDDING_DIMS, PROFILES, CollectionProfile, collection_layout, ensure_collection, fit_dims
+)
+
+UPSERT_BATCH_SIZE = 256
+
+
+def load_vectors(input_path: str, limit: int, queries: int, synthetic: int, seed: int):
+    """(corpus, queries) as float32 matrices; catalog queries are product names (known-item)."""
+    rng = np.random.default_rng(seed)
+    if synthetic:
+        corpus = rng.standard_normal((synthetic, EMBEDDING_DIMS)).astype(np.float32)
+        picks = rng.choice(len(corpus), size=min(queries, len(corpus)), replace=False)
+        query_vectors = corpus[picks] + 0.5 * rng.standard_normal((len(picks), EMBEDDING_DIMS)).astype(np.float32)
+    else:
+        df = read_rag_dataset(input_path, columns=["product_name", "rag_document"])
+        df = df.head(limit) if limit else df
+        corpus = np.asarray(get_embeddings(df["rag_document"].tolist()), dtype=np.float32)
+        names = df["product_name"].sample(n=min(queries, len(df)), random_state=seed).tolist()
+        query_vectors = np.asarray(get_embeddings(names), dtype=np.float32)
+    return normalize(corpus), normalize(query_vectors)
+
+
+def normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+
+def exact_top_k(corpus: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    scores = queries @ corpus.T
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    return np.take_along_axis(top, np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1), axis=1)
+
+
+def estimate_ram_mb(profile: CollectionProfile, n: int) -> float:
+    """Qdrant sizing rule of thumb: RAM-resident vectors (x1.5 overhead) + quantized copies + HNSW links."""
+    ram = 0.0
+    if not profile.on_disk:
+        ram += n * profile.dims * 4 * 1.5
+    if profile.quantization == "int8":
+        ram += n * profile.dims
+    elif profile.quantization == "binary":
+        ram += n * profile.dims / 8
+    ram += n * profile.hnsw_m * 2 * 4
+    return round(ram / 2**20, 2)
+
+
+def server_rss_mb(url: str):
+    """Resident memory of the Qdrant server from its Prometheus endpoint, if exposed."""
+    try:
+        with urllib.request.urlopen(f"{url.rstrip('/')}/metrics", timeout=5) as response:
+            metrics = response.read().decode()
+    except Exception:
+        return None
+    match = re.search(r"^memory_resident_bytes\s+([0-9.e+]+)", metrics, re.MULTILINE)
+    return round(float(match.group(1)) / 2**20, 2) if match else None
+
+
+def wait_until_indexed(client, collection: str, timeout_s: float = 600.0):
+    deadline = time.perf_counter() + timeout_s
+    while client.get_collection(collection).status != CollectionStatus.GREEN and time.perf_counter() < deadline:
+        time.sleep(0.5)
+
+
+def run_profile(client, url, name: str, profile: CollectionProfile, corpus: np.ndarray, queries: np.ndarray,
+                truth: np.ndarray, k: int, concurrency: int) -> dict:
+    collection = f"bench-profile-{name}"
+    if client.collection_exists(collection):
+        client.delete_collection(collection)
+    ids = [str(uuid.uuid4()) for _ in range(len(corpus))]
+    position = {point_id: i for i, point_id in enumerate(ids)}
+
+    start = time.perf_counter()
+    ensure_collection(client, collection, profile)
+    for i in range(0, len(corpus), UPSERT_BATCH_SIZE):
+        client.upsert(collection, points=[
+            PointStruct(id=point_id, vector=fit_dims(vector.tolist(), profile.dims))
+            for point_id, vector in zip(ids[i:i + UPSERT_BATCH_SIZE], corpus[i:i + UPSERT_BATCH_SIZE])
+        ], wait=True)
+    wait_until_indexed(client, collection)
+    build_s = time.perf_counter() - start
+
+    search_params = collection_layout(client, collection).search_params
+    query_vectors = [fit_dims(vector.tolist(), profile.dims) for vector in queries]
+
+    def search(vector):
+        return client.query_points(collection, query=vector, limit=k, search_params=search_params).points
+
+    wall = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(search, query_vectors))
+    wall = time.perf_counter() - wall
+
+    hits = sum(
+        len({position[str(point.id)] for point in points} & set(expected.tolist()))
+        for points, expected in zip(results, truth)
+    )
+    report = {
+        "profile": name,
+        "dims": profile.dims,
+        "quantization": profile.quantization or "none",
+        "on_disk": profile.on_disk,
+        "hnsw_m": profile.hnsw_m,
+        "hnsw_ef_construct": profile.hnsw_ef_construct,
+        "points": len(corpus),
+        "ram_estimate_mb": estimate_ram_mb(profile, len(corpus)),
+        "server_rss_mb": server_rss_mb(url) if url else None,
+        "build_s": round(build_s, 2),
+        "qps": round(len(queries) / wall, 1),
+        f"recall@{k}": round(hits / (len(queries) * k), 4),
+    }
+    client.delete_collection(collection)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=None, help="Qdrant server URL (default: embedded temp storage)")
+    parser.add_argument("--input", default=INPUT_PATH)
+    parser.add_argument("--limit", type=int, default=0, help="Index only the first N products (0 = all)")
+    parser.add_argument("--synthetic", type=int, default=0, help="Use N random vectors instead of the catalog")
+    parser.add_argument("--profiles", nargs="+", default=list(PROFILES), choices=list(PROFILES))
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    corpus, queries = load_vectors(args.input, args.limit, args.queries, args.synthetic, args.seed)
+    truth = exact_top_k(corpus, queries, args.k)
+    concurrency = args.concurrency if args.url else 1     # embedded storage is single-threaded
+
+    path = None if args.url else tempfile.mkdtemp(prefix="bench-profiles-")
+    client = QdrantClient(url=args.url) if args.url else QdrantClient(path=path)
+    try:
+        results = [
+            run_profile(client, args.url, name, PROFILES[name], corpus, queries, truth, args.k, concurrency)
+            for name in args.profiles
+        ]
+        print(json.dumps(results, indent=2))
+    finally:
+        client.close()
+        if path:
+            shutil.rmtree(path, ignore_errors=True)
@@ -0,0 +1,69 @@
+# benchmarks/bench_hybrid_retrieval.py
+"""
+Recall and latency of dense-only vs hybrid (dense + BM25, RRF-fused) retrieval, over
+whole-document vectors and over section chunks aggregated per product (max-sim).
+
+Uses known-item queries sampled from the indexed catalog: each query is a product's
+name (optionally truncated), and the product itself is the single relevant result.
+Brand and model-number heavy names are where BM25 is expected to help.
+
+Needs an ingested collection (`python -m core.ingest_pipeline`) and its BM25 vocabulary.
+Query embeddings go through the embedding cache, so repeated runs are offline:
+
+    python -m benchmarks.bench_hybrid_retrieval --queries 200 --k 5
+"""
+import argparse
+import json
+import statistics
+import time
+import pandas as pd
+
+from core.feature_extraction_pipeline import read_rag_dataset
+from core.ingest_pipeline import point_id
+from core.search_pipeline import semantic_search
+from utils.llm_utils import get_embeddings
+
+INPUT_PATH = "./data/rag_docs.parquet"
+
+
+def sample_queries(input_path: str, n: int, max_tokens: int, seed: int) -> pd.DataFrame:
+    df = read_rag_dataset(input_path, columns=["uniq_id", "product_name", "rag_document"])
+    df = df[df["product_name"].str.len() > 0].sample(n=min(n, len(df)), random_state=seed)
+    df["query"] = df["product_name"].apply(lambda name: " ".join(str(name).split()[:max_tokens]))
+    return df
+
+
+def evaluate(df: pd.DataFrame, vectors, k: int, hybrid: bool, sections: bool = False) -> dict:
+    hits, latencies = 0, []
+    for (_, row), vector in zip(df.iterrows(), vectors):
+        start = time.perf_counter()
+        results = semantic_search(row["query"], top_k=k, query_vector=vector, hybrid=hybrid, sections=sections)
+        latencies.append((time.perf_counter() - start) * 1000)
+        expected = point_id(row.to_dict())
+        hits += any(hit.id == expected for hit in results)
+    latencies.sort()
+    return {
+        "retrieval": "hybrid" if hybrid else "dense",
+        "index": "sections" if sections else "documents",
+        f"recall@{k}": round(hits / len(df), 4),
+        "p50_ms": round(statistics.median(latencies), 2),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1], 2),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--input", default=INPUT_PATH)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--max-query-tokens", type=int, default=6)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    queries = sample_queries(args.input, args.queries, args.max_query_tokens, args.seed)
+    query_vectors = get_embeddings(queries["query"].tolist())
+    results = [
+        evaluate(queries, query_vectors, args.k, hybrid, sections)
+        for sections in (False, True) for hybrid in (False, True)
+    ]
+    print(json.dumps(results, indent=2))
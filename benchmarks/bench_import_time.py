@@ -0,0 +1,165 @@
+# benchmarks/bench_import_time.py
+"""
+Import time and cold start of the serving entry points, with a regression budget.
+
+Each module is imported `--runs` times in a fresh interpreter under `python -X importtime`.
+The report gives the median cumulative import time, the packages that cost the most, and
+the wall time of a cold process (interpreter start + import). With --warm-up, a cold
+process also runs `core.search_pipeline.warm_up()` and reports its steps.
+
+Exits with status 1 when a module's median import time exceeds its budget, or when a
+project module imports a dependency at module level that must only be loaded on first
+use (DEFERRED_IMPORTS):
+
+    python -m benchmarks.bench_import_time [--runs 5] [--warm-up] [--output import_time.json]
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+# === CONFIG ===
+# Median cumulative import time allowed per module (ms). gradio_app has no budget: gradio
+# itself takes seconds to import; what it may not do is pull in DEFERRED_IMPORTS.
+IMPORT_BUDGETS_MS: Dict[str, Optional[float]] = {
+    "core.search_pipeline": 350.0,
+    "core.batch_search": 400.0,
+    "gradio_app": None,
+}
+DEFERRED_IMPORTS = ("openai", "qdrant_client", "cohere", "pandas", "pyarrow", "tiktoken")
+PROJECT_PACKAGES = ("core", "utils", "gradio_app")
+TOP_PACKAGES = 10
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def parse_importtime(stderr: str) -> List[dict]:
+    """`-X importtime` lines as dicts with self/cumulative microseconds, nesting depth and parent module."""
+    entries, stack = [], []
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        depth = len(indent) // 2
+        entries.append({"name": name, "self_us": int(self_us), "cumulative_us": int(cumulative_us),
+                        "depth": depth, "children": []})
+        # children are printed before their parent, one level deeper
+        while stack and stack[-1]["depth"] > depth:
+            entries[-1]["children"].append(stack.pop())
+        stack.append(entries[-1])
+    return entries
+
+
+def _root(name: str) -> str:
+    return name.split(".")[0]
+
+
+def deferred_violations(entries: List[dict]) -> List[str]:
+    """'<dependency> imported by <project module>' for every DEFERRED_IMPORTS package a project module imports."""
+    violations = []
+    for entry in entries:
+        if _root(entry["name"]) not in PROJECT_PACKAGES:
+            continue
+        for child in entry["children"]:
+            if _root(child["name"]) in DEFERRED_IMPORTS:
+                violations.append(f"{_root(child['name'])} imported by {entry['name']}")
+    return sorted(set(violations))
+
+
+def package_costs(entries: List[dict]) -> Dict[str, float]:
+    """Cumulative ms per top-level package, counted where another package first imports it."""
+    parents = {id(child): entry for entry in entries for child in entry["children"]}
+    costs = defaultdict(float)
+    for entry in entries:
+        parent = parents.get(id(entry))
+        if parent is None or _root(parent["name"]) != _root(entry["name"]):
+            costs[_root(entry["name"])] += entry["cumulative_us"] / 1000
+    top = sorted(costs.items(), key=lambda item: item[1], reverse=True)[:TOP_PACKAGES]
+    return {name: round(ms, 1) for name, ms in top}
+
+
+def measure_import(module: str, runs: int) -> dict:
+    import_ms, wall_ms, entries, error = [], [], [], None
+    for _ in range(runs):
+        start = time.perf_counter()
+        process = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                                 capture_output=True, text=True, env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"})
+        wall_ms.append((time.perf_counter() - start) * 1000)
+        if process.returncode != 0:
+            error = process.stderr.strip().splitlines()[-1]
+            break
+        entries = parse_importtime(process.stderr)
+        import_ms.append(next(entry["cumulative_us"] for entry in entries if entry["name"] == module
+                              and entry["depth"] == 0) / 1000)
+    if error:
+        return {"module": module, "error": error}
+    return {
+        "module": module,
+        "import_ms": round(statistics.median(import_ms), 1),
+        "import_ms_min": round(min(import_ms), 1),
+        "cold_start_ms": round(statistics.median(wall_ms), 1),
+        "budget_ms": IMPORT_BUDGETS_MS.get(module),
+        "packages_ms": package_costs(entries),
+        "deferred_violations": deferred_violations(entries),
+    }
+
+
+def measure_warm_up() -> dict:
+    """Cold process: import the pipeline, then run `warm_up()`; wall times in ms plus warm-up steps (s)."""
+    script = (
+        "import json, time; start = time.perf_counter()\n"
+        "import core.search_pipeline as sp; imported = time.perf_counter()\n"
+        "steps = sp.warm_up(); done = time.perf_counter()\n"
+        "print(json.dumps({'import_ms': (imported - start) * 1000, 'warm_up_ms': (done - imported) * 1000, "
+        "'steps_s': steps}))"
+    )
+    process = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True)
+    if process.returncode != 0:
+        return {"error": process.stderr.strip().splitlines()[-1]}
+    result = json.loads(process.stdout.strip().splitlines()[-1])
+    return {key: round(value, 1) if isinstance(value, float) else value for key, value in result.items()}
+
+
+def check_budgets(results: List[dict]) -> List[str]:
+    failures = []
+    for result in results:
+        if "error" in result:
+            failures.append(f"{result['module']}: import failed ({result['error']})")
+            continue
+        budget = result["budget_ms"]
+        if budget is not None and result["import_ms"] > budget:
+            failures.append(f"{result['module']}: {result['import_ms']} ms > budget {budget} ms")
+        failures += [f"{result['module']}: {violation}" for violation in result["deferred_violations"]]
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modules", nargs="+", default=list(IMPORT_BUDGETS_MS))
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--warm-up", action="store_true", help="Also time warm_up() in a cold process")
+    parser.add_argument("--output", default="-", help="Results JSON path (default: stdout)")
+    args = parser.parse_args()
+
+    results = {"imports": [measure_import(module, args.runs) for module in args.modules]}
+    if args.warm_up:
+        results["warm_up"] = measure_warm_up()
+    results["failures"] = check_budgets(results["imports"])
+
+    text = json.dumps(results, indent=2)
+    if args.output == "-":
+        print(text)
+    else:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    for failure in results["failures"]:
+        print(f"❌ {failure}", file=sys.stderr)
+    sys.exit(1 if results["failures"] else 0)
@@ -0,0 +1,105 @@
+# benchmarks/bench_qdrant_client.py
+"""
+Per-query Qdrant latency under concurrent load: a new client opened and closed for
+every search (the old `semantic_search` behaviour) vs the shared process-wide client.
+
+Runs against a throwaway embedded collection of random vectors by default, or against
+a Qdrant server with --url. Example:
+
+    python -m benchmarks.bench_qdrant_client --points 5000 --queries 200 --concurrency 8
+"""
+import argparse
+import json
+import shutil
+import statistics
+import tempfile
+import time
+import uuid
+import numpy as np
+
+from concurrent.futures import ThreadPoolExecutor
+
+from qdrant_client import QdrantClient
+from qdrant_client.http.models import Distance, PointStruct, VectorParams
+
+from utils.vector_store import get_qdrant_client, reset_qdrant_client
+
+COLLECTION = "bench-qdrant-client"
+DIM = 1536
+
+
+def build_collection(path: str, url: str, points: int, seed: int = 0):
+    client = QdrantClient(url=url) if url else QdrantClient(path=path)
+    if client.collection_exists(COLLECTION):
+        client.delete_collection(COLLECTION)
+    client.create_collection(COLLECTION, vectors_config=VectorParams(size=DIM, distance=Distance.COSINE))
+    rng = np.random.default_rng(seed)
+    for start in range(0, points, 512):
+        vectors = rng.standard_normal((min(512, points - start), DIM)).astype(np.float32)
+        client.upsert(COLLECTION, points=[
+            PointStruct(id=str(uuid.uuid4()), vector=vector.tolist(), payload={"price": float(i)})
+            for i, vector in enumerate(vectors, start)
+        ])
+    client.close()
+
+
+def run(mode: str, path: str, url: str, queries: np.ndarray, concurrency: int) -> dict:
+    def per_request(vector):
+        client = QdrantClient(url=url) if url else QdrantClient(path=path)
+        try:
+            return client.query_points(COLLECTION, query=vector.tolist(), limit=5)
+        finally:
+            client.close()
+
+    def shared(vector):
+        return get_qdrant_client(path=path, url=url).query_points(COLLECTION, query=vector.tolist(), limit=5)
+
+    search = per_request if mode == "per-request" else shared
+    latencies, errors = [], 0
+
+    def timed(vector):
+        start = time.perf_counter()
+        try:
+            search(vector)
+            return time.perf_counter() - start, None
+        except Exception as e:
+            return time.perf_counter() - start, e
+
+    wall = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for latency, error in pool.map(timed, queries):
+            if error is None:
+                latencies.append(latency * 1000)
+            else:
+                errors += 1
+    wall = time.perf_counter() - wall
+
+    latencies.sort()
+    return {
+        "mode": mode,
+        "queries": len(queries),
+        "concurrency": concurrency,
+        "errors": errors,
+        "p50_ms": round(statistics.median(latencies), 2) if latencies else None,
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1], 2) if latencies else None,
+        "qps": round(len(latencies) / wall, 1),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=None, help="Qdrant server URL (default: embedded temp storage)")
+    parser.add_argument("--points", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    path = tempfile.mkdtemp(prefix="bench-qdrant-")
+    try:
+        build_collection(path, args.url, args.points)
+        queries = np.random.default_rng(1).standard_normal((args.queries, DIM)).astype(np.float32)
+        results = [run(mode, path, args.url, queries, args.concurrency) for mode in ("per-request", "shared")]
+        print(json.dumps(results, indent=2))
+    finally:
+        reset_qdrant_client(path=path, url=args.url)
+        shutil.rmtree(path, ignore_errors=True)
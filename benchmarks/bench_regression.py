@@ -0,0 +1,311 @@
+# benchmarks/bench_regression.py
+"""
+Offline benchmark and relevance-regression suite.
+
+Runs the real pipeline end to end on a fixed catalog and query set, without network
+access: the fixture catalog (`benchmarks/fixtures/catalog.csv`) goes through feature
+extraction and ingest into a throwaway embedded Qdrant, then the fixed queries (the
+Gradio sample queries plus a labeled set, `benchmarks/fixtures/queries.json`) are run
+with OpenAI and Cohere served by `benchmarks.api_fixtures` (recorded responses where
+available, deterministic stubs otherwise).
+
+Measures:
+- relevance: recall@k, NDCG@k (graded labels) and MRR per retrieval configuration
+- stages: p50/p95 per pipeline stage from `utils.tracing` traces of full requests
+- throughput: QPS and latency of `retrieve` at several concurrency levels
+- memory: Python heap peak during a query pass and process peak RSS
+
+Results are one JSON document. `--baseline` compares against an earlier run and exits
+non-zero when relevance drops or latency/memory grow past the thresholds:
+
+    python -m benchmarks.bench_regression --output results.json
+    python -m benchmarks.bench_regression --baseline results.json
+    python -m benchmarks.bench_regression --record      # refresh recordings (needs API keys)
+"""
+import os
+import tempfile
+
+# Isolate the run before project modules read their configuration: embedded Qdrant,
+# BM25 vocabulary and manifests live in a temporary directory, caches and API rate limits are off.
+WORKDIR = tempfile.mkdtemp(prefix="smartfind-regression-")
+os.environ.pop("QDRANT_URL", None)
+os.environ.update({
+    "QDRANT_PATH": os.path.join(WORKDIR, "qdrant"),
+    "SMARTFIND_BM25_VOCABULARY": os.path.join(WORKDIR, "bm25_vocabulary.json"),
+    "SMARTFIND_EMBEDDING_CACHE": "off",
+    "SMARTFIND_RESPONSE_CACHE": "off",
+    "SMARTFIND_OPENAI_RPS": "0",
+    "SMARTFIND_COHERE_RPS": "0",
+    "SMARTFIND_VECTOR_BACKEND": "qdrant",
+    "SMARTFIND_COLLECTION_PROFILE": "default",
+})
+
+import argparse  # noqa: E402
+import json  # noqa: E402
+import logging  # noqa: E402
+import platform  # noqa: E402
+import shutil  # noqa: E402
+import subprocess  # noqa: E402
+import sys  # noqa: E402
+import time  # noqa: E402
+import tomllib  # noqa: E402
+import tracemalloc  # noqa: E402
+import numpy as np  # noqa: E402
+
+from concurrent.futures import ThreadPoolExecutor  # noqa: E402
+from pathlib import Path  # noqa: E402
+from typing import Dict, List, Optional  # noqa: E402
+
+from benchmarks.api_fixtures import FIXTURES_PATH, ApiFixtures  # noqa: E402
+from core.feature_extraction_pipeline import run_feature_extraction  # noqa: E402
+from core.ingest_pipeline import point_id, run_ingest  # noqa: E402
+from core.query_understanding import _query_cache  # noqa: E402
+from core.search_pipeline import (  # noqa: E402
+    RERANK_CANDIDATES, analyze_query, query_filter, rerank, retrieve, search_pipeline_with_trace, semantic_search
+)
+from utils.llm_utils import get_embeddings  # noqa: E402
+
+logger = logging.getLogger("bench_regression")
+
+CATALOG_PATH = "./benchmarks/fixtures/catalog.csv"
+QUERIES_PATH = "./benchmarks/fixtures/queries.json"
+COLLECTION_NAME = "ecommerce-products"
+
+# Retrieval configurations scored for relevance (tags = query tag/constraint filtering)
+CONFIGS = [
+    {"name": "dense", "hybrid": False, "sections": False, "tags": True, "reranker": None},
+    {"name": "dense-no-tags", "hybrid": False, "sections": False, "tags": False, "reranker": None},
+    {"name": "hybrid", "hybrid": True, "sections": False, "tags": True, "reranker": None},
+    {"name": "sections", "hybrid": False, "sections": True, "tags": True, "reranker": None},
+    {"name": "hybrid-sections", "hybrid": True, "sections": True, "tags": True, "reranker": None},
+    {"name": "hybrid-sections+features", "hybrid": True, "sections": True, "tags": True, "reranker": "features"},
+    {"name": "hybrid-sections+cohere", "hybrid": True, "sections": True, "tags": True, "reranker": "cohere"},
+]
+MAX_RELEVANCE_DROP = 0.02       # absolute drop in recall/NDCG/MRR flagged as a regression
+MAX_LATENCY_INCREASE = 0.25     # relative growth in p95 latency / memory (or QPS loss) flagged
+LATENCY_NOISE_FLOOR_S = 0.01    # p95 changes smaller than this are run-to-run noise on local stubs
+
+
+def load_queries(path: str = QUERIES_PATH) -> List[dict]:
+    with open(path, encoding="utf-8") as f:
+        queries = json.load(f)
+    for item in queries:
+        item["labels"] = {point_id({"uniq_id": uniq_id}): grade for uniq_id, grade in item["relevant"].items()}
+    return queries
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    return round(float(np.percentile(values, q)), 6) if values else None
+
+
+def dcg(grades: List[float]) -> float:
+    return sum((2 ** grade - 1) / np.log2(i + 2) for i, grade in enumerate(grades))
+
+
+# === Stages ===
+def build_index(workdir: str) -> dict:
+    """Feature extraction + ingest of the fixture catalog into the isolated collection."""
+    rag_path = os.path.join(workdir, "rag_docs.parquet")
+    start = time.perf_counter()
+    extraction = run_feature_extraction(CATALOG_PATH, rag_path)
+    extraction_s = time.perf_counter() - start
+    start = time.perf_counter()
+    ingest = run_ingest(rag_path, COLLECTION_NAME, manifest_path=os.path.join(workdir, "manifest.sqlite"),
+                        vocabulary_path=os.environ["SMARTFIND_BM25_VOCABULARY"],
+                        tag_anchors_path=os.path.join(workdir, "tag_anchors.npz"))
+    return {
+        "products": extraction["rows_out"] if extraction else 0,
+        "feature_extraction_s": round(extraction_s, 3),
+        "ingest_s": round(time.perf_counter() - start, 3),
+        "points": ingest["docs"],
+        "sections": ingest["sections"],
+        "tag_requests": ingest["tag_requests"],
+    }
+
+
+def evaluate_relevance(queries: List[dict], k: int) -> List[dict]:
+    vectors = get_embeddings([item["query"] for item in queries])
+    results = []
+    for config in CONFIGS:
+        recalls, ndcgs, reciprocal_ranks = [], [], []
+        for item, vector in zip(queries, vectors):
+            query, labels = item["query"], item["labels"]
+            filter_obj = query_filter(analyze_query(query)) if config["tags"] else None
+            hits = semantic_search(query, filter_obj, top_k=RERANK_CANDIDATES if config["reranker"] else k,
+                                   query_vector=vector, hybrid=config["hybrid"], sections=config["sections"])
+            if config["reranker"]:
+                hits = rerank(query, hits, reranker=config["reranker"], top_k=k)
+            grades = [labels.get(hit.id, 0) for hit in hits[:k]]
+            relevant = [point for point, grade in labels.items() if grade > 0]
+            recalls.append(sum(1 for grade in grades if grade > 0) / len(relevant))
+            ideal = dcg(sorted(labels.values(), reverse=True)[:k])
+            ndcgs.append(dcg(grades) / ideal if ideal else 0.0)
+            reciprocal_ranks.append(next((1 / (i + 1) for i, grade in enumerate(grades) if grade > 0), 0.0))
+        results.append({
+            "config": config["name"],
+            f"recall@{k}": round(float(np.mean(recalls)), 4),
+            f"ndcg@{k}": round(float(np.mean(ndcgs)), 4),
+            "mrr": round(float(np.mean(reciprocal_ranks)), 4),
+        })
+    return results
+
+
+def stage_latencies(queries: List[dict], rounds: int = 1) -> Dict[str, dict]:
+    """
+    Per-stage p50/p95 over full traced requests (tags, embedding, search, rerank, report).
+    The query cache is cleared first, so the first pass pays for cold tag extraction.
+    """
+    _query_cache.clear()
+    durations: Dict[str, List[float]] = {}
+    for item in queries * rounds:
+        _, request_trace = search_pipeline_with_trace(item["query"], use_reranker=True, use_tags=True)
+        for stage, seconds in {**request_trace.stage_seconds(), "total": request_trace.duration_s}.items():
+            durations.setdefault(stage, []).append(seconds)
+    return {
+        stage: {"count": len(values), "p50_s": percentile(values, 50), "p95_s": percentile(values, 95)}
+        for stage, values in sorted(durations.items())
+    }
+
+
+def measure_throughput(queries: List[dict], levels: List[int], rounds: int) -> List[dict]:
+    """QPS of `retrieve` (tags + search + rerank, no report) with `level` concurrent callers."""
+    work = [item["query"] for item in queries] * rounds
+    results = []
+    for level in levels:
+        def timed_retrieve(query: str) -> float:
+            start = time.perf_counter()
+            retrieve(query, use_reranker=True, use_tags=True)
+            return time.perf_counter() - start
+
+        wall = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=level) as pool:
+            latencies = list(pool.map(timed_retrieve, work))
+        wall = time.perf_counter() - wall
+        results.append({
+            "concurrency": level,
+            "requests": len(work),
+            "qps": round(len(work) / wall, 2),
+            "p50_s": percentile(latencies, 50),
+            "p95_s": percentile(latencies, 95),
+        })
+    return results
+
+
+def measure_memory(queries: List[dict]) -> dict:
+    _query_cache.clear()
+    tracemalloc.start()
+    for item in queries:
+        retrieve(item["query"], use_reranker=True, use_tags=True)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    try:
+        import resource
+        peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024    # KiB on Linux
+    except ImportError:
+        peak_rss_mb = None
+    return {
+        "query_pass_heap_peak_mb": round(peak / 2**20, 2),
+        "peak_rss_mb": round(peak_rss_mb, 1) if peak_rss_mb else None,
+    }
+
+
+# === Baseline Comparison ===
+def compare(current: dict, baseline: dict, max_relevance_drop: float = MAX_RELEVANCE_DROP,
+            max_latency_increase: float = MAX_LATENCY_INCREASE) -> List[dict]:
+    """Regressions of `current` against `baseline`: relevance drops, slower p95, lower QPS, more memory."""
+    regressions = []
+
+    def flag(metric: str, before, after):
+        regressions.append({"metric": metric, "baseline": before, "current": after})
+
+    baseline_relevance = {row["config"]: row for row in baseline.get("relevance", [])}
+    for row in current["relevance"]:
+        before = baseline_relevance.get(row["config"], {})
+        for metric, value in row.items():
+            if metric != "config" and metric in before and before[metric] - value > max_relevance_drop:
+                flag(f"relevance.{row['config']}.{metric}", before[metric], value)
+
+    for stage, stats in current["stages"].items():
+        before = baseline.get("stages", {}).get(stage, {}).get("p95_s")
+        after = stats["p95_s"]
+        if before is not None and after - before > max(before * max_latency_increase, LATENCY_NOISE_FLOOR_S):
+            flag(f"stages.{stage}.p95_s", before, after)
+
+    baseline_throughput = {row["concurrency"]: row for row in baseline.get("throughput", [])}
+    for row in current["throughput"]:
+        before = baseline_throughput.get(row["concurrency"], {}).get("qps")
+        if before and row["qps"] < before * (1 - max_latency_increase):
+            flag(f"throughput.c{row['concurrency']}.qps", before, row["qps"])
+
+    before = baseline.get("memory", {}).get("query_pass_heap_peak_mb")
+    after = current["memory"]["query_pass_heap_peak_mb"]
+    if before and after > before * (1 + max_latency_increase):
+        flag("memory.query_pass_heap_peak_mb", before, after)
+    return regressions
+
+
+def run_metadata(fixtures: ApiFixtures, queries: List[dict], k: int) -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    with open("pyproject.toml", "rb") as f:
+        version = tomllib.load(f)["project"]["version"]
+    return {
+        "version": version,
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "queries": len(queries),
+        "k": k,
+        "fixtures": fixtures.mode,
+        "api_latency_s": fixtures.latency_s,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--fixtures", default=FIXTURES_PATH, help="Recorded API responses (JSON)")
+    parser.add_argument("--record", action="store_true", help="Call the live APIs for missing responses and save them")
+    parser.add_argument("--api-latency-ms", type=float, default=0.0, help="Simulated latency per API call")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--rounds", type=int, default=3,
+                        help="Passes over the query set for stage latencies and per concurrency level")
+    parser.add_argument("--output", default="-", help="Results JSON path (default: stdout)")
+    parser.add_argument("--baseline", default=None, help="Earlier results JSON to compare against")
+    parser.add_argument("--max-relevance-drop", type=float, default=MAX_RELEVANCE_DROP)
+    parser.add_argument("--max-latency-increase", type=float, default=MAX_LATENCY_INCREASE)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    fixtures = ApiFixtures(args.fixtures, record=args.record, latency_s=args.api_latency_ms / 1000).install()
+    queries = load_queries()
+    try:
+        results = {"meta": run_metadata(fixtures, queries, args.k)}
+        results["index"] = build_index(WORKDIR)
+        results["relevance"] = evaluate_relevance(queries, args.k)
+        results["stages"] = stage_latencies(queries, args.rounds)
+        results["throughput"] = measure_throughput(queries, args.concurrency, args.rounds)
+        results["memory"] = measure_memory(queries)
+        results["meta"]["api_calls"] = fixtures.stats()
+        if args.record:
+            fixtures.save()
+
+        regressions = None
+        if args.baseline:
+            with open(args.baseline, encoding="utf-8") as f:
+                regressions = compare(results, json.load(f), args.max_relevance_drop, args.max_latency_increase)
+            results["regressions"] = regressions
+    finally:
+        shutil.rmtree(WORKDIR, ignore_errors=True)
+
+    text = json.dumps(results, indent=2)
+    if args.output == "-":
+        print(text)
+    else:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+    if regressions:
+        logger.error(f"❌ {len(regressions)} regression(s) against {args.baseline}")
+        sys.exit(1)
@@ -0,0 +1,70 @@
+# benchmarks/bench_rerankers.py
+"""
+Reranker latency vs NDCG on a fixed query set.
+
+Uses the same known-item queries as `bench_hybrid_retrieval` (a product's name, with
+that product as the only relevant result): candidates come from one vector search per
+query, and each reranker reorders the identical candidate lists. "none" is the raw
+vector order. The Cohere reranker is skipped unless COHERE_API_KEY is set.
+
+    python -m benchmarks.bench_rerankers --queries 100 --candidates 20 --k 5
+"""
+import argparse
+import json
+import os
+import statistics
+import time
+
+from benchmarks.bench_hybrid_retrieval import INPUT_PATH, sample_queries
+from core.ingest_pipeline import point_id
+from core.search_pipeline import semantic_search
+from utils.llm_utils import get_embeddings
+from utils.rerankers import get_reranker, ndcg_at_k
+
+
+def evaluate(name: str, queries, candidate_lists, expected_ids, k: int) -> dict:
+    latencies, ndcgs = [], []
+    for query, candidates, expected in zip(queries, candidate_lists, expected_ids):
+        start = time.perf_counter()
+        ranked = candidates if name == "none" else get_reranker(name).rerank(query, candidates)
+        latencies.append((time.perf_counter() - start) * 1000)
+        ndcgs.append(ndcg_at_k([1.0 if hit.id == expected else 0.0 for hit in ranked], k))
+
+    # Batched scoring of the whole query set in one call
+    batch_ms = None
+    if name != "none":
+        start = time.perf_counter()
+        get_reranker(name).rerank_batch(queries, candidate_lists)
+        batch_ms = round((time.perf_counter() - start) * 1000, 2)
+
+    latencies.sort()
+    return {
+        "reranker": name,
+        f"ndcg@{k}": round(statistics.mean(ndcgs), 4),
+        "p50_ms": round(statistics.median(latencies), 3),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1], 3),
+        "batch_total_ms": batch_ms,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--input", default=INPUT_PATH)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--candidates", type=int, default=20)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args()
+
+    df = sample_queries(args.input, args.queries, max_tokens=6, seed=args.seed)
+    queries = df["query"].tolist()
+    vectors = get_embeddings(queries)
+    candidate_lists = [
+        semantic_search(query, top_k=args.candidates, query_vector=vector)
+        for query, vector in zip(queries, vectors)
+    ]
+    expected_ids = [point_id(row) for row in df.to_dict(orient="records")]
+
+    rerankers = ["none", "features"] + (["cohere"] if os.getenv("COHERE_API_KEY") else [])
+    results = [evaluate(name, queries, candidate_lists, expected_ids, args.k) for name in rerankers]
+    print(json.dumps(results, indent=2))
@@ -0,0 +1,211 @@
+# core/batch_search.py
+"""
+Batch search for offline jobs (landing pages, merchandising audits, evaluation runs).
+
+Pushes many queries through the same stages as `search_pipeline`, but stage by stage
+over chunks of queries: identical queries (after normalization) are processed once, tag
+extraction runs concurrently, query embeddings are requested in bulk, searches go to the
+vector store as one batched request, and reranking scores every query of the chunk in one
+`rerank_batch` call. The LLM report is optional and off by default.
+
+Results are written as JSONL, one line per input query in input order, and each stage
+reports items processed, time spent and throughput:
+
+    python -m core.batch_search --input queries.txt --output results.jsonl --rerank
+"""
+import argparse
+import json
+import logging
+import sys
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from core.query_understanding import normalize_query, understand_query
+from core.search_pipeline import (
+    COLLECTION_NAME, HYBRID_SEARCH, RERANK_CANDIDATES, SECTION_SEARCH, TOP_K, generate_summary_report, query_filter
+)
+from utils.llm_utils import get_embeddings
+from utils.rerankers import get_reranker
+from utils.vector_store import get_vector_store
+
+# === CONFIG ===
+CHUNK_SIZE = 256          # unique queries carried through the stages together
+EMBED_BATCH_SIZE = 256    # inputs per embeddings request
+TAG_WORKERS = 8           # concurrent tag extractions (only LLM fallbacks leave the process)
+REPORT_WORKERS = 4        # concurrent LLM report generations
+
+logger = logging.getLogger("batch_search")
+
+
+class StageStats:
+    """Items processed and wall time spent per pipeline stage."""
+
+    def __init__(self):
+        self.items: Dict[str, int] = {}
+        self.seconds: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str, items: int):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.items[name] = self.items.get(name, 0) + items
+            self.seconds[name] = self.seconds.get(name, 0.0) + time.perf_counter() - start
+
+    def count(self, name: str, items: int):
+        self.items[name] = self.items.get(name, 0) + items
+
+    def to_dict(self) -> dict:
+        return {
+            name: {
+                "items": items,
+                "seconds": round(self.seconds[name], 3),
+                "items_per_s": round(items / self.seconds[name], 1) if self.seconds[name] else None,
+            } if name in self.seconds else {"items": items}
+            for name, items in self.items.items()
+        }
+
+
+def _chunks(items: Iterable, size: int) -> Iterator[list]:
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def search_unique(queries: List[str], stats: StageStats, use_reranker: bool = False, use_tags: bool = True,
+                  report: bool = False, top_k: int = TOP_K, reranker: Optional[str] = None,
+                  hybrid: bool = HYBRID_SEARCH, sections: bool = SECTION_SEARCH) -> List[dict]:
+    """Run the pipeline stages over distinct queries; one result dict per query."""
+    tags, filters = [[] for _ in queries], [None] * len(queries)
+    if use_tags:
+        with stats.stage("tags", len(queries)), ThreadPoolExecutor(max_workers=TAG_WORKERS) as pool:
+            analyses = list(pool.map(understand_query, queries))
+        tags = [analysis["tags"] for analysis in analyses]
+        filters = [query_filter(analysis) for analysis in analyses]
+
+    with stats.stage("embedding", len(queries)):
+        vectors = []
+        for batch in _chunks(queries, EMBED_BATCH_SIZE):
+            vectors.extend(get_embeddings(batch))
+
+    store = get_vector_store(collection=COLLECTION_NAME)
+    with stats.stage("search", len(queries)):
+        candidates = store.search_batch(queries, vectors, filters, top_k=RERANK_CANDIDATES if use_reranker else top_k,
+                                        hybrid=hybrid, sections=sections)
+
+    if use_reranker:
+        with stats.stage("rerank", sum(len(hits) for hits in candidates)):
+            candidates = [hits[:top_k] for hits in get_reranker(reranker).rerank_batch(queries, candidates)]
+
+    reports = [None] * len(queries)
+    if report:
+        with stats.stage("report", len(queries)), ThreadPoolExecutor(max_workers=REPORT_WORKERS) as pool:
+            reports = list(pool.map(generate_summary_report, queries, candidates))
+
+    return [
+        {
+            "query": query,
+            "tags": query_tags,
+            "results": [hit.to_dict() for hit in hits],
+            **({"report": text} if report else {}),
+        }
+        for query, query_tags, hits, text in zip(queries, tags, candidates, reports)
+    ]
+
+
+def iter_batch_search(queries: Iterable[str], chunk_size: int = CHUNK_SIZE, stats: Optional[StageStats] = None,
+                      **options) -> Iterator[dict]:
+    """
+    Stream `batch_search` results in input order, one chunk of distinct queries at a time.
+
+    Duplicates (same normalized query) within a chunk are searched once and repeated in the
+    output; `options` are passed to `search_unique`.
+    """
+    stats = stats if stats is not None else StageStats()
+    for chunk in _chunks((query for query in queries if query and query.strip()), chunk_size):
+        unique = {}
+        for query in chunk:
+            unique.setdefault(normalize_query(query), query)
+        stats.count("queries", len(chunk))
+        stats.count("unique_queries", len(unique))
+        results = dict(zip(unique, search_unique(list(unique.values()), stats, **options)))
+        for query in chunk:
+            yield {**results[normalize_query(query)], "query": query}
+
+
+def batch_search(queries: List[str], use_reranker: bool = False, use_tags: bool = True, report: bool = False,
+                 top_k: int = TOP_K, reranker: Optional[str] = None, chunk_size: int = CHUNK_SIZE) -> tuple:
+    """
+    Search many queries at once.
+
+    Args:
+        queries (List[str]): Search queries; blank entries are skipped.
+        use_reranker (bool): Rerank RERANK_CANDIDATES candidates per query down to `top_k`.
+        use_tags (bool): Extract tags/constraints and filter the search with them.
+        report (bool): Also generate the LLM markdown report per query (slow; off by default).
+        top_k (int): Results kept per query.
+        reranker (str, optional): Reranker name (default: SMARTFIND_RERANKER).
+        chunk_size (int): Queries carried through the stages together.
+
+    Returns:
+        tuple: (results, stats) — one dict per query with `query`, `tags`, `results`
+            (`SearchHit.to_dict()`s) and optionally `report`, plus per-stage throughput counters.
+    """
+    stats = StageStats()
+    results = list(iter_batch_search(queries, chunk_size=chunk_size, stats=stats, use_reranker=use_reranker,
+                                     use_tags=use_tags, report=report, top_k=top_k, reranker=reranker))
+    return results, stats.to_dict()
+
+
+def read_queries(path: str) -> Iterator[str]:
+    """Queries from a text file (one per line) or a JSONL file with a `query` field; '-' reads stdin."""
+    handle = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    try:
+        for line in handle:
+            line = line.strip()
+            if line:
+                yield json.loads(line)["query"] if path.endswith(".jsonl") else line
+    finally:
+        if handle is not sys.stdin:
+            handle.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--input", required=True, help="Text file with one query per line, *.jsonl with a 'query' field, or '-'")
+    parser.add_argument("--output", default="-", help="JSONL output path (default: stdout)")
+    parser.add_argument("--rerank", action="store_true", help="Rerank candidates (SMARTFIND_RERANKER)")
+    parser.add_argument("--reranker", default=None, choices=["cohere", "features"])
+    parser.add_argument("--no-tags", action="store_true", help="Skip tag extraction and metadata filters")
+    parser.add_argument("--report", action="store_true", help="Generate the LLM report for every query")
+    parser.add_argument("--top-k", type=int, default=TOP_K)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    stats = StageStats()
+    start = time.perf_counter()
+    output = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        for result in iter_batch_search(read_queries(args.input), chunk_size=args.chunk_size, stats=stats,
+                                        use_reranker=args.rerank, use_tags=not args.no_tags, report=args.report,
+                                        top_k=args.top_k, reranker=args.reranker):
+            output.write(json.dumps(result, ensure_ascii=False) + "\n")
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    summary = stats.to_dict()
+    elapsed = time.perf_counter() - start
+    queries = summary.get("queries", {}).get("items", 0)
+    logger.info(f"✅ {queries} queries in {elapsed:.2f}s ({queries / elapsed if elapsed else 0:.1f} q/s)")
+    print(json.dumps(summary, indent=2), file=sys.stderr)
@@ -1,54 +1,300 @@
 # core/feature_extraction_pipeline.py
+import argparse
+import os
+import re
+import time
 import uuid
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
 import logging
-from pathlib import Path
 
-from utils.llm_utils import build_rag_document, clean_rag_document
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterator, List, Optional
 
 # === CONFIG ===
 INPUT_PATH = "./data/amazon_co-ecommerce_sample.csv"
-OUTPUT_PATH = "./data/rag_docs.csv"
+OUTPUT_PATH = "./data/rag_docs.parquet"
 RAG_FIELDS = ["product_name", "product_description", "description", "product_information", "price", "average_review_rating", "customer_reviews"]
+INPUT_COLUMNS = ["uniq_id"] + RAG_FIELDS
+OUTPUT_COLUMNS = ["uniq_id", "product_name", "price", "rating", "customer_reviews", "rag_document"]
+OUTPUT_SCHEMA = pa.schema([
+    ("uniq_id", pa.string()),
+    ("product_name", pa.string()),
+    ("price", pa.float64()),
+    ("rating", pa.float64()),
+    ("customer_reviews", pa.string()),
+    ("rag_document", pa.string()),
+])
+CHUNK_SIZE = 20_000           # input rows per chunk; bounds peak memory
+BLOCK_SIZE_BYTES = 64 << 20   # pyarrow CSV reader block size
+MAX_WORKERS = 1               # >1 spreads chunks across a process pool
+SECTION_SEPARATOR = "\x1f"    # placeholder between document sections while joining columns
+TEXT_COLUMNS = ["uniq_id", "product_name", "customer_reviews", "rag_document"]
+SUMMARY_MAX_CHARS = 1200      # display text stored in the Qdrant payload
+REVIEWS_MAX_CHARS = 800       # review excerpt stored in the Qdrant payload
 
 # === LOGGING SETUP ===
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
 logger = logging.getLogger("feature_extraction_pipeline")
 
-# === PIPELINE ===
-def run_feature_extraction(input_path=INPUT_PATH, output_path=OUTPUT_PATH):
-    if not Path(input_path).exists():
-        logger.error(f"Input file not found: {input_path}")
-        return
+# === DOCUMENT CLEANING ===
+# Compiled once at import; applied in order by clean_rag_document
+CLEANUP_PATTERNS = [
+    # Embedded JavaScript snippets
+    (re.compile(r"amznJQ\.onReady\([\s\S]*?\)\);"), ""),
+    (re.compile(r"\(function\(\$.*?\}\)\(\$.*?\);"), ""),
+    # Redundant 'Customer Reviews' JS junk
+    (re.compile(r"Customer Reviews[\s\S]+?(?:\d+ out of 5 stars|See all reviews)"), ""),
+    # Amazon popover configs and trailing JS
+    (re.compile(r"window\.reviewHistPopoverConfig[\s\S]*?onCacheUpdateReselect_average_customer_reviews.*?\);"), ""),
+    # Stray HTML/JS tail
+    (re.compile(r"(Feedback\s+Would you like to update product info.*)"), ""),
+    # Excessive spacing
+    (re.compile(r"\n{2,}"), "\n\n"),
+]
+
+
+def clean_rag_document(doc: str) -> str:
+    """
+    Cleans noisy JavaScript and Amazon-specific clutter from product RAG documents.
+    """
+    for pattern, replacement in CLEANUP_PATTERNS:
+        doc = pattern.sub(replacement, doc)
+    return doc.strip()
+
+
+def clean_rag_documents(docs: pd.Series) -> pd.Series:
+    """Vectorized `clean_rag_document` over a column of documents."""
+    for pattern, replacement in CLEANUP_PATTERNS:
+        docs = docs.str.replace(pattern, replacement, regex=True)
+    return docs.str.strip()
+
+
+def truncate_text(text: str, max_chars: int) -> str:
+    """Cut text to `max_chars` on a word boundary, marking the cut with an ellipsis."""
+    text = str(text or "").strip()
+    if len(text) <= max_chars:
+        return text
+    return text[:max_chars].rsplit(" ", 1)[0] + " …"
 
-    df = pd.read_csv(input_path)
-    logger.info(f"Loaded input CSV with shape: {df.shape}")
 
+def build_summary(doc: str, max_chars: int = SUMMARY_MAX_CHARS) -> str:
+    """Cleaned, truncated display version of a RAG document for search payloads and reports."""
+    return truncate_text(clean_rag_document(doc), max_chars)
+
+
+# === DOCUMENT CONSTRUCTION ===
+def _text(df: pd.DataFrame, column: str) -> pd.Series:
+    """Column as stripped strings with missing values as "" (absent columns are all-empty)."""
+    if column not in df:
+        return pd.Series("", index=df.index, dtype=object)
+    return df[column].fillna("").astype(str).str.strip()
+
+
+def build_rag_documents(df: pd.DataFrame) -> pd.Series:
+    """
+    Vectorized equivalent of `utils.llm_utils.build_rag_document` for a whole chunk:
+    name, description (falling back to `description`) and product information sections,
+    skipping empty ones, joined by blank lines.
+    """
+    name = _text(df, "product_name")
+    desc = _text(df, "product_description")
+    desc = desc.where(desc != "", _text(df, "description"))
+    info = _text(df, "product_information")
+
+    # Empty sections collapse to "" and the separators between them are squeezed out
+    sections = [
+        ("### Product Name\n" + name).where(name != "", ""),
+        ("### Description\n" + desc).where(desc != "", ""),
+        ("### Product Information\n" + info).where(info != "", ""),
+    ]
+    joined = sections[0].str.cat(sections[1:], sep=SECTION_SEPARATOR)
+    joined = joined.str.replace(f"{SECTION_SEPARATOR}+", SECTION_SEPARATOR, regex=True).str.strip(SECTION_SEPARATOR)
+    return joined.str.replace(SECTION_SEPARATOR, "\n\n", regex=False)
+
+
+def prepare_chunk(df: pd.DataFrame) -> pd.DataFrame:
+    """Turn one chunk of the raw catalog export into RAG-ready rows (OUTPUT_COLUMNS)."""
     # Drop rows where all RAG-relevant fields are missing
-    df_rag = df.dropna(subset=RAG_FIELDS, how="all").copy()
-    logger.info(f"Filtered to {len(df_rag)} rows with RAG-relevant content")
+    df = df.dropna(subset=[field for field in RAG_FIELDS if field in df], how="all")
 
     # Clean price: remove currency symbols and convert to float
-    df_rag["price"] = df_rag["price"].replace(r"[£$,]", "", regex=True).replace(" ", "").astype(str)
-    df_rag["price"] = pd.to_numeric(df_rag["price"], errors="coerce")
-
+    price = _text(df, "price").str.replace(r"[£$,\s]", "", regex=True)
     # Clean rating: extract numeric value from text like '4.9 out of 5 stars'
-    df_rag.rename(columns={"average_review_rating": "rating"}, inplace=True)
-    df_rag["rating"] = df_rag["rating"].astype(str).str.extract(r"([\\d\\.]+)").astype(float)
+    rating = _text(df, "average_review_rating").str.extract(r"(\d+(?:\.\d+)?)", expand=False)
+
+    uniq_id = _text(df, "uniq_id")
+    missing = uniq_id == ""
+    if missing.any():
+        uniq_id[missing] = [str(uuid.uuid4()) for _ in range(int(missing.sum()))]
 
-    # RAG document construction
-    df_rag["rag_document"] = df_rag.apply(build_rag_document, axis=1)
-    df_rag["rag_document"] = df_rag["rag_document"].apply(clean_rag_document)
+    return pd.DataFrame({
+        "uniq_id": uniq_id,
+        "product_name": _text(df, "product_name"),
+        "price": pd.to_numeric(price, errors="coerce"),
+        "rating": pd.to_numeric(rating, errors="coerce"),
+        "customer_reviews": _text(df, "customer_reviews"),
+        "rag_document": clean_rag_documents(build_rag_documents(df)),
+    }, columns=OUTPUT_COLUMNS)
 
-    # UUIDs
-    df_rag["uniq_id"] = df_rag.get("uniq_id", pd.Series(dtype=str)).fillna("").apply(
-        lambda x: x if x else str(uuid.uuid4())
-    )
 
-    # Save selected fields
-    df_rag[["uniq_id", "product_name", "price", "rating", "customer_reviews", "rag_document"]].to_csv(output_path, index=False)
-    logger.info(f"Saved RAG-ready dataset to {output_path} ({len(df_rag)} rows)")
+# === STREAMING I/O ===
+def iter_input_chunks(input_path: str, chunk_size: int = CHUNK_SIZE, engine: str = "pandas") -> Iterator[pd.DataFrame]:
+    """
+    Stream the raw export in chunks, reading only INPUT_COLUMNS as strings.
+
+    `engine="pyarrow"` uses pyarrow's multithreaded streaming CSV reader (chunks are
+    then the reader's blocks, sized by BLOCK_SIZE_BYTES); `"pandas"` uses `read_csv(chunksize=...)`.
+    """
+    if engine == "pyarrow":
+        reader = pa_csv.open_csv(
+            input_path,
+            read_options=pa_csv.ReadOptions(block_size=BLOCK_SIZE_BYTES),
+            parse_options=pa_csv.ParseOptions(newlines_in_values=True),
+            convert_options=pa_csv.ConvertOptions(
+                include_columns=INPUT_COLUMNS,
+                include_missing_columns=True,
+                strings_can_be_null=True,
+                column_types={column: pa.string() for column in INPUT_COLUMNS},
+            ),
+        )
+        for batch in reader:
+            yield batch.to_pandas()
+        return
+    yield from pd.read_csv(input_path, chunksize=chunk_size, dtype=str, usecols=lambda c: c in INPUT_COLUMNS)
+
+
+class RagDatasetWriter:
+    """
+    Appends prepared chunks to a Parquet file (one row group per chunk) or, for *.csv, a CSV.
+    `close()` publishes the file; `abort()` discards it and leaves any previous output in place.
+    """
+
+    def __init__(self, output_path: str):
+        self.output_path = output_path
+        self.rows = 0
+        self._parquet = not output_path.endswith(".csv")
+        self._writer: Optional[pq.ParquetWriter] = None
+        Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+        # Write next to the target and rename on close so readers never see a partial file
+        self._tmp_path = f"{output_path}.tmp"
+
+    def write(self, df: pd.DataFrame):
+        if self._parquet:
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self._tmp_path, OUTPUT_SCHEMA, compression="zstd")
+            self._writer.write_table(pa.Table.from_pandas(df, schema=OUTPUT_SCHEMA, preserve_index=False))
+        else:
+            df.to_csv(self._tmp_path, mode="a" if self.rows else "w", header=not self.rows, index=False)
+        self.rows += len(df)
+
+    def close(self):
+        if self._parquet and self._writer is None:
+            self._writer = pq.ParquetWriter(self._tmp_path, OUTPUT_SCHEMA, compression="zstd")
+        if self._writer is not None:
+            self._writer.close()
+        elif not self.rows:
+            pd.DataFrame(columns=OUTPUT_COLUMNS).to_csv(self._tmp_path, index=False)
+        os.replace(self._tmp_path, self.output_path)
+
+    def abort(self):
+        if self._writer is not None:
+            self._writer.close()
+        Path(self._tmp_path).unlink(missing_ok=True)
+
+
+def _fill_text(df: pd.DataFrame) -> pd.DataFrame:
+    return df.fillna({column: "" for column in TEXT_COLUMNS if column in df})
+
+
+def read_rag_chunks(path: str, chunk_size: int = CHUNK_SIZE, columns: Optional[List[str]] = None) -> Iterator[pd.DataFrame]:
+    """
+    Stream a RAG dataset written by this pipeline. Parquet files are memory-mapped and read
+    batch by batch (only `columns`, if given); CSV is read with `read_csv(chunksize=...)`.
+    Missing text values come back as "".
+    """
+    if path.endswith(".csv"):
+        chunks = pd.read_csv(path, chunksize=chunk_size, usecols=columns)
+    else:
+        parquet = pq.ParquetFile(path, memory_map=True)
+        chunks = (batch.to_pandas() for batch in parquet.iter_batches(batch_size=chunk_size, columns=columns))
+    for chunk in chunks:
+        yield _fill_text(chunk)
+
+
+def read_rag_dataset(path: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """Whole RAG dataset as one DataFrame (memory-mapped for Parquet)."""
+    if path.endswith(".csv"):
+        return _fill_text(pd.read_csv(path, usecols=columns))
+    return _fill_text(pd.read_parquet(path, columns=columns, memory_map=True))
+
+
+# === PIPELINE ===
+def run_feature_extraction(input_path=INPUT_PATH, output_path=OUTPUT_PATH, chunk_size: int = CHUNK_SIZE,
+                           max_workers: int = MAX_WORKERS, engine: str = "pandas") -> Optional[dict]:
+    """
+    Stream the raw export through `prepare_chunk` and append each result to `output_path`.
+
+    Peak memory is a few chunks regardless of file size. With `max_workers > 1` chunks are
+    prepared in a process pool with at most 2 * max_workers chunks in flight; output order
+    always matches input order.
+    """
+    if not Path(input_path).exists():
+        logger.error(f"Input file not found: {input_path}")
+        return None
+
+    start = time.perf_counter()
+    rows_in = 0
+    writer = RagDatasetWriter(output_path)
+
+    def counted(chunks):
+        nonlocal rows_in
+        for chunk in chunks:
+            rows_in += len(chunk)
+            yield chunk
+
+    chunks = counted(iter_input_chunks(input_path, chunk_size, engine))
+    try:
+        if max_workers <= 1:
+            for chunk in chunks:
+                writer.write(prepare_chunk(chunk))
+        else:
+            with ProcessPoolExecutor(max_workers=max_workers) as pool:
+                pending = []
+                for chunk in chunks:
+                    pending.append(pool.submit(prepare_chunk, chunk))
+                    if len(pending) >= 2 * max_workers:
+                        writer.write(pending.pop(0).result())
+                for future in pending:
+                    writer.write(future.result())
+    except BaseException:
+        writer.abort()
+        raise
+    writer.close()
+
+    elapsed = time.perf_counter() - start
+    stats = {
+        "rows_in": rows_in,
+        "rows_out": writer.rows,
+        "elapsed_s": round(elapsed, 2),
+        "rows_per_sec": round(rows_in / elapsed, 1) if elapsed else None,
+    }
+    logger.info(f"Filtered {rows_in} input rows to {writer.rows} with RAG-relevant content")
+    logger.info(f"Saved RAG-ready dataset to {output_path} ({stats})")
+    return stats
+
 
 # === CLI EXECUTION ===
 if __name__ == "__main__":
-    run_feature_extraction()
+    parser = argparse.ArgumentParser(description="Build the RAG-ready product dataset from the raw catalog export")
+    parser.add_argument("--input", default=INPUT_PATH)
+    parser.add_argument("--output", default=OUTPUT_PATH, help="Parquet file (or *.csv)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--max-workers", type=int, default=MAX_WORKERS)
+    parser.add_argument("--engine", choices=("pandas", "pyarrow"), default="pandas")
+    args = parser.parse_args()
+
+    run_feature_extraction(args.input, args.output, args.chunk_size, args.max_workers, args.engine)
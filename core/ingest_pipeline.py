@@ -1,54 +1,572 @@
 # core/ingest_pipeline.py
+import argparse
+import functools
+import logging
+import os
+import queue
+import threading
+import time
 import uuid
 import pandas as pd
 
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Iterator, List, Optional, Sequence, Tuple
+
 from tqdm import tqdm
-from qdrant_client.http.models import PointStruct
+from qdrant_client import QdrantClient
+from qdrant_client.http.models import (
+    FieldCondition, Filter, FilterSelector, MatchAny, PointIdsList, PointStruct, SparseVector
+)
 
-from utils.llm_utils import get_embedding, call_chat, safe_json_parse
+from core.feature_extraction_pipeline import REVIEWS_MAX_CHARS, build_summary, read_rag_chunks, truncate_text
+from core.query_understanding import IGNORED_TAGS, TagVocabulary, canonical_tags, tokenize
+from utils.chunking import EMBEDDING_ENCODING, Section, split_sections, truncate_tokens
+from utils.llm_utils import get_embeddings, call_chat, safe_json_parse
+from utils.index_manifest import IndexManifest, MANIFEST_PATH, content_hash
 from utils.prompts import PRODUCT_TAGGING_PROMPT
-from utils.vector_store import init_qdrant
+from utils.sparse_encoder import BM25Encoder, SPARSE_VECTOR_NAME, VOCABULARY_PATH
+from utils.tagging import LABEL_RATIO, TAG_ANCHORS_PATH, BulkTagger
+from utils.vector_store import (
+    EMBEDDING_DIMS, collection_layout, ensure_collection, fit_dims, get_profile, has_sparse_vectors, init_qdrant,
+    sections_collection_name
+)
 
 # === CONFIG ===
-INPUT_CSV = "./data/rag_docs.csv"
+INPUT_PATH = "./data/rag_docs.parquet"     # feature extraction output; *.csv is also accepted
 COLLECTION_NAME = "ecommerce-products"
 EMBEDDING_MODEL = "text-embedding-3-small"
 LLM_MODEL = "gpt-4.1-mini"
+READ_CHUNK_SIZE = 1000      # rows pulled from the dataset per iteration
+EMBED_BATCH_SIZE = 128      # inputs per embeddings request
+EMBED_MAX_TOKENS = 8000     # embedding input cap in EMBEDDING_ENCODING tokens (model limit is 8191)
+UPSERT_BATCH_SIZE = 256     # points per Qdrant upsert call
+MAX_WORKERS = 8             # concurrent tagging / embedding requests
+MAX_PENDING_UPSERTS = 4     # upsert chunks buffered before readers block
+DELETE_BATCH_SIZE = 1000    # stale point ids removed per delete call
+PAYLOAD_VERSION = 3         # bump when the payload layout changes so incremental runs rewrite every point
+TAGGING = os.getenv("SMARTFIND_TAGGING", "bulk")   # "bulk" (LLM-tag cluster medoids, propagate by kNN) | "llm" (every product)
 
-# === LOAD DATA ===
-df = pd.read_csv(INPUT_CSV)
-df = df.fillna("")
+# === LOGGING ===
+logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+logger = logging.getLogger("ingest_pipeline")
 
-# === INIT QDRANT (uses shared utility) ===
-qdrant = init_qdrant(collection=COLLECTION_NAME)
 
-# === PIPELINE ===
-points = []
-for i, row in tqdm(df.iterrows(), total=len(df)):
-    doc = row["rag_document"]
-    uniq_id = row.get("uniq_id") or str(uuid.uuid4())
-
-    # Step 1: Tag generation
-    tag_response = call_chat(LLM_MODEL, PRODUCT_TAGGING_PROMPT, doc)
-    tags = safe_json_parse(tag_response, key="tags", fallback="misc")
-
-    # Step 2: Embedding
-    embedding = get_embedding(doc)
-
-    # Step 3: Qdrant point construction
-    point = PointStruct(
-        id=str(uniq_id),
-        vector=embedding,
+# === TAGGING ===
+def tag_document(doc: str, chat_fn: Callable = call_chat) -> List[str]:
+    """
+    Generate metadata tags for a single product document with the tagging LLM.
+
+    Args:
+        doc (str): The cleaned RAG document for the product.
+        chat_fn (Callable): Chat completion function (defaults to `call_chat`).
+
+    Returns:
+        List[str]: Extracted tags in canonical form (`canonical_tag`), or ['misc'] if the
+        response could not be parsed.
+    """
+    tag_response = chat_fn(LLM_MODEL, PRODUCT_TAGGING_PROMPT, doc)
+    return canonical_tags(safe_json_parse(tag_response, key="tags", fallback="misc")) or ["misc"]
+
+
+def bulk_tag_documents(tagger: BulkTagger, docs: List[str], embeddings: List[List[float]],
+                       executor: Optional[ThreadPoolExecutor] = None,
+                       headlines: Optional[List[str]] = None) -> List[List[str]]:
+    """
+    Tags for a batch from the bulk tagger (nearest LLM-labelled anchors), plus every tag
+    of the anchor vocabulary that the product's headline (name and summary) mentions,
+    found the same way query tags are (`TagVocabulary.match`). Only the headline is
+    matched: full documents mention most tags somewhere (specs, "not for toddlers",
+    related products), which would make tag filters prune nothing. 'misc' is only kept
+    when nothing else applies.
+    """
+    propagated = tagger.tag(docs, embeddings, executor)
+    vocabulary = TagVocabulary(tagger.vocabulary)
+    results = []
+    for headline, tags in zip(headlines or [""] * len(docs), propagated):
+        tags = canonical_tags(tags + vocabulary.match(tokenize(headline)))
+        results.append([tag for tag in tags if tag not in IGNORED_TAGS] or ["misc"])
+    return results
+
+
+# === POINT IDENTITY ===
+def point_id(row: dict) -> str:
+    """
+    Deterministic Qdrant point id for a row.
+
+    Uses the row's `uniq_id` in canonical UUID form; rows without a usable `uniq_id`
+    get a UUIDv5 derived from their document, so re-runs map them to the same point.
+    """
+    uniq_id = str(row.get("uniq_id") or "")
+    try:
+        return str(uuid.UUID(uniq_id))
+    except ValueError:
+        return str(uuid.uuid5(uuid.NAMESPACE_URL, uniq_id or row["rag_document"]))
+
+
+def section_point_id(parent_id: str, section: Section) -> str:
+    """Deterministic id of one section chunk, derived from its product's point id."""
+    return str(uuid.uuid5(uuid.UUID(parent_id), f"{section.section}:{section.index}"))
+
+
+def row_hash(row: dict) -> str:
+    """Content hash of everything that ends up in the point, plus the models that produced it."""
+    return content_hash(
+        EMBEDDING_MODEL, LLM_MODEL, PAYLOAD_VERSION,
+        row["rag_document"], row.get("customer_reviews"), as_float(row.get("price")), as_float(row.get("rating")),
+    )
+
+
+def as_float(value) -> Optional[float]:
+    """Numeric payload value, or None for blanks so Range filters simply skip the product."""
+    try:
+        return None if value in ("", None) or pd.isna(value) else float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+# === POINT CONSTRUCTION ===
+def build_point(row: dict, embedding: List[float], tags: List[str],
+                sparse: Optional[SparseVector] = None) -> PointStruct:
+    """
+    Build the Qdrant point for one product row.
+
+    Args:
+        row (dict): A row from the RAG dataset.
+        embedding (List[float]): Dense embedding of the row's `rag_document`.
+        tags (List[str]): Metadata tags for the product.
+        sparse (SparseVector, optional): BM25 vector stored next to the dense one for hybrid search.
+
+    Returns:
+        PointStruct: The point ready to be upserted.
+    """
+    return PointStruct(
+        id=point_id(row),
+        vector={"": embedding, SPARSE_VECTOR_NAME: sparse} if sparse is not None else embedding,
         payload={
+            "product_name": row.get("product_name", ""),
+            "summary": build_summary(row["rag_document"]),
+            "review_snippet": truncate_text(row.get("customer_reviews", ""), REVIEWS_MAX_CHARS),
             "reviews": row.get("customer_reviews", ""),
-            "price": row.get("price"),
-            "rating": row.get("rating"),
+            "price": as_float(row.get("price")),
+            "rating": as_float(row.get("rating")),
             "tags": tags,
-            "document": doc
+            "document": row["rag_document"],
+            "content_hash": row_hash(row)
         }
     )
-    points.append(point)
 
-# === UPSERT TO QDRANT ===
-qdrant.upsert(collection_name=COLLECTION_NAME, points=points)
-print(f"✅ Indexed {len(points)} documents into Qdrant collection '{COLLECTION_NAME}'.")
+
+def build_section_points(row: dict, sections: List[Section], embeddings: List[List[float]], tags: List[str],
+                         sparse: Optional[List[SparseVector]] = None) -> List[PointStruct]:
+    """
+    Child points for one product, one per section chunk.
+
+    The payload only carries `parent_id` plus the filterable fields (price, rating, tags),
+    so section search applies the same metadata filters and looks the product up by id.
+    """
+    parent_id = point_id(row)
+    payload = {"price": as_float(row.get("price")), "rating": as_float(row.get("rating")), "tags": tags}
+    return [
+        PointStruct(
+            id=section_point_id(parent_id, section),
+            vector={"": embedding, SPARSE_VECTOR_NAME: sparse[i]} if sparse else embedding,
+            payload={"parent_id": parent_id, "section": section.section, **payload},
+        )
+        for i, (section, embedding) in enumerate(zip(sections, embeddings))
+    ]
+
+
+# === STREAMED UPSERTS ===
+class ChunkedUpserter:
+    """
+    Upserts points into Qdrant in fixed-size chunks from a background thread.
+
+    The hand-off queue is bounded, so when Qdrant falls behind `submit` blocks and
+    the readers/taggers upstream stop producing (backpressure) instead of buffering
+    the whole catalog in memory. `on_upserted` is called with every chunk once Qdrant
+    has acknowledged it, which is where ingest progress gets checkpointed.
+
+    Child points (document sections) go to `child_collection` through the same queue.
+    Buffered children are always flushed ahead of the next parent chunk, so a checkpointed
+    product never has sections still in flight.
+    """
+
+    def __init__(self, client: QdrantClient, collection: str, batch_size: int = UPSERT_BATCH_SIZE,
+                 max_pending: int = MAX_PENDING_UPSERTS,
+                 on_upserted: Optional[Callable[[List[PointStruct]], None]] = None,
+                 child_collection: Optional[str] = None):
+        self.client = client
+        self.collection = collection
+        self.child_collection = child_collection
+        self.batch_size = batch_size
+        self.on_upserted = on_upserted
+        self.upserted = 0
+        self.children_upserted = 0
+        self._buffer: List[PointStruct] = []
+        self._children: List[PointStruct] = []
+        self._queue: queue.Queue = queue.Queue(maxsize=max_pending)
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._run, name="qdrant-upserter", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                collection, chunk = item
+                if self._error is None:
+                    self.client.upsert(collection_name=collection, points=chunk, wait=True)
+                    if collection != self.collection:
+                        self.children_upserted += len(chunk)
+                    else:
+                        self.upserted += len(chunk)
+                        if self.on_upserted:
+                            self.on_upserted(chunk)
+            except Exception as e:
+                logger.error(f"❌ Upsert of {len(chunk)} points failed: {e}")
+                self._error = e
+            finally:
+                self._queue.task_done()
+
+    def _raise_if_failed(self):
+        if self._error is not None:
+            raise RuntimeError(f"Qdrant upsert failed: {self._error}") from self._error
+
+    def _flush_children(self, full_only: bool):
+        while self._children and (len(self._children) >= self.batch_size or not full_only):
+            chunk, self._children = self._children[:self.batch_size], self._children[self.batch_size:]
+            self._queue.put((self.child_collection, chunk))
+
+    def submit(self, points: List[PointStruct], children: Sequence[PointStruct] = ()):
+        """Buffer points (and their child points) and hand off every full chunk to the upsert thread."""
+        self._raise_if_failed()
+        self._children.extend(children)
+        self._flush_children(full_only=True)
+        self._buffer.extend(points)
+        while len(self._buffer) >= self.batch_size:
+            self._flush_children(full_only=False)
+            chunk, self._buffer = self._buffer[:self.batch_size], self._buffer[self.batch_size:]
+            self._queue.put((self.collection, chunk))
+
+    def close(self):
+        """Flush the remaining partial chunks and wait for all upserts to land."""
+        self._flush_children(full_only=False)
+        if self._buffer:
+            self._queue.put((self.collection, self._buffer))
+            self._buffer = []
+        self._queue.put(None)
+        self._thread.join()
+        self._raise_if_failed()
+
+
+# === PIPELINE ===
+def iter_batches(input_path: str = INPUT_PATH, chunk_size: int = READ_CHUNK_SIZE,
+                 columns: Optional[List[str]] = None) -> Iterator[pd.DataFrame]:
+    """Stream the RAG dataset in row chunks (memory-mapped for Parquet) instead of loading it all at once."""
+    yield from read_rag_chunks(input_path, chunk_size, columns)
+
+
+def process_batch(
+    rows: List[dict],
+    executor: ThreadPoolExecutor,
+    embed_fn: Callable = get_embeddings,
+    chat_fn: Callable = call_chat,
+    embed_batch_size: int = EMBED_BATCH_SIZE,
+    sparse_encoder: Optional[BM25Encoder] = None,
+    sections: bool = False,
+    dims: int = EMBEDDING_DIMS,
+    tagger: Optional[BulkTagger] = None,
+) -> Tuple[List[PointStruct], List[PointStruct]]:
+    """
+    Tag and embed a batch of rows concurrently and build their Qdrant points.
+
+    Without a `tagger`, tagging runs one request per document, concurrently with the
+    embeddings; with one, documents are tagged from their embeddings once those are in
+    (only new anchors reach the LLM). Embeddings run one multi-input request per
+    `embed_batch_size` inputs; all requests share the same bounded worker pool. Every
+    input is capped at EMBED_MAX_TOKENS (counted with tiktoken when installed, else a
+    conservative estimate) so oversized listings are truncated rather than rejected.
+    With `sections=True`, every document is also split into bounded section chunks
+    (title, description, specs, reviews) that are embedded in the same batches.
+    Embeddings are truncated to the collection's `dims` (Matryoshka profiles).
+
+    Returns:
+        Tuple[List[PointStruct], List[PointStruct]]: Product points and section points.
+    """
+    docs = [row["rag_document"] for row in rows]
+    row_sections = [
+        split_sections(row["rag_document"], row.get("customer_reviews", ""), row.get("product_name", ""))
+        if sections else []
+        for row in rows
+    ]
+    inputs = [truncate_tokens(text, EMBED_MAX_TOKENS, EMBEDDING_ENCODING, strict=True) for text in
+              docs + [section.text for chunks in row_sections for section in chunks]]
+
+    tag_futures = [executor.submit(tag_document, doc, chat_fn) for doc in docs] if tagger is None else []
+    embed_futures = [
+        executor.submit(embed_fn, inputs[i:i + embed_batch_size], model=EMBEDDING_MODEL)
+        for i in range(0, len(inputs), embed_batch_size)
+    ]
+
+    embeddings = [fit_dims(vector, dims) for future in embed_futures for vector in future.result()]
+    if tagger is not None:
+        headlines = [f"{row.get('product_name', '')}\n{build_summary(row['rag_document'])}" for row in rows]
+        tags = bulk_tag_documents(tagger, docs, embeddings[:len(docs)], executor, headlines)
+    else:
+        tags = [future.result() for future in tag_futures]
+
+    sparse = [sparse_encoder.encode_document(doc) if sparse_encoder else None for doc in docs]
+
+    points = [
+        build_point(row, embedding, row_tags, row_sparse)
+        for row, embedding, row_tags, row_sparse in zip(rows, embeddings, tags, sparse)
+    ]
+    section_points, offset = [], len(docs)
+    for row, chunks, row_tags in zip(rows, row_sections, tags):
+        chunk_sparse = [sparse_encoder.encode_document(section.text) for section in chunks] if sparse_encoder else None
+        section_points += build_section_points(row, chunks, embeddings[offset:offset + len(chunks)], row_tags, chunk_sparse)
+        offset += len(chunks)
+    return points, section_points
+
+
+def fit_sparse_encoder(input_path: str = INPUT_PATH, vocabulary_path: str = VOCABULARY_PATH,
+                       read_chunk_size: int = READ_CHUNK_SIZE, refit_length: bool = True) -> BM25Encoder:
+    """
+    Fit BM25 statistics over every document in the dataset (a cheap local pass, no API calls)
+    and persist the vocabulary. An existing vocabulary is extended so term indices stay stable.
+    Incremental runs that keep indexed points pass `refit_length=False`: the length
+    normalization stays frozen until the next full rebuild, so skipped and re-encoded
+    points score alike (document frequencies, used only for queries, are still refreshed).
+    """
+    encoder = BM25Encoder.load(vocabulary_path) if Path(vocabulary_path).exists() else BM25Encoder()
+    chunks = iter_batches(input_path, read_chunk_size, columns=["rag_document"])
+    encoder.fit((doc for chunk in chunks for doc in chunk["rag_document"]), refit_length=refit_length)
+    encoder.save(vocabulary_path)
+    return encoder
+
+
+def delete_stale_points(client: QdrantClient, collection: str, stale_ids: List[str],
+                        batch_size: int = DELETE_BATCH_SIZE, sections: bool = False):
+    """Delete points whose `uniq_id` no longer appears in the dataset (and their sections)."""
+    for i in range(0, len(stale_ids), batch_size):
+        client.delete(
+            collection_name=collection,
+            points_selector=PointIdsList(points=stale_ids[i:i + batch_size]),
+            wait=True,
+        )
+        if sections:
+            delete_sections(client, sections_collection_name(collection), stale_ids[i:i + batch_size])
+
+
+def delete_sections(client: QdrantClient, sections_collection: str, parent_ids: List[str]):
+    """Drop every section chunk of the given products, e.g. before re-indexing them with fewer chunks."""
+    client.delete(
+        collection_name=sections_collection,
+        points_selector=FilterSelector(filter=Filter(must=[
+            FieldCondition(key="parent_id", match=MatchAny(any=parent_ids))
+        ])),
+        wait=True,
+    )
+
+
+def run_ingest(
+    input_path: str = INPUT_PATH,
+    collection: str = COLLECTION_NAME,
+    client: Optional[QdrantClient] = None,
+    embed_fn: Callable = get_embeddings,
+    chat_fn: Callable = call_chat,
+    read_chunk_size: int = READ_CHUNK_SIZE,
+    embed_batch_size: int = EMBED_BATCH_SIZE,
+    upsert_batch_size: int = UPSERT_BATCH_SIZE,
+    max_workers: int = MAX_WORKERS,
+    incremental: bool = False,
+    manifest_path: str = MANIFEST_PATH,
+    hybrid: bool = True,
+    vocabulary_path: str = VOCABULARY_PATH,
+    sections: bool = True,
+    profile: Optional[str] = None,
+    tagging: str = TAGGING,
+    label_ratio: float = LABEL_RATIO,
+    tag_anchors_path: str = TAG_ANCHORS_PATH,
+) -> dict:
+    """
+    Tag, embed and index the RAG dataset into Qdrant.
+
+    Rows are streamed from the CSV, tagged and embedded with bounded concurrency and
+    upserted in fixed-size chunks while the next chunk is being processed. `embed_fn`,
+    `chat_fn` and `client` can be swapped for local stubs (e.g. `QdrantClient(":memory:")`)
+    to exercise the pipeline without remote APIs.
+
+    Every acknowledged upsert chunk is checkpointed into the sidecar manifest. With
+    `incremental=True`, rows whose content hash matches the manifest are skipped (which
+    also resumes an interrupted run) and points whose `uniq_id` vanished from the dataset
+    are deleted once the whole file has been read.
+
+    With `hybrid=True` (and a collection created with the BM25 sparse vector), a local
+    BM25 vocabulary is fitted over the dataset first and each point also gets a sparse vector.
+
+    With `sections=True`, each product is also split into section chunks stored as child
+    points (grouped by `parent_id`) in the `<collection>-sections` collection, which
+    search queries with per-product max-sim aggregation.
+
+    `profile` names the layout (quantization, on-disk vectors, HNSW settings, Matryoshka
+    dims) used when the collections are created; existing collections keep theirs and
+    embeddings are truncated to whatever size they hold.
+
+    With `tagging="bulk"`, only about `label_ratio` of the products are tagged by the LLM
+    (k-means medoids of the products no earlier anchor covers); every product gets the
+    tags of its nearest anchors plus the anchor tags its name and summary mention
+    (`bulk_tag_documents`). Anchors are kept in `tag_anchors_path`, so incremental runs
+    only label new regions of the catalog.
+    `tagging="llm"` tags every product with its own request.
+
+    Returns:
+        dict: Run statistics (`docs`, `sections`, `skipped`, `deleted`, `tag_requests`, `version`,
+        `elapsed_s`, `docs_per_sec`).
+    """
+    collection_profile = get_profile(profile)
+    qdrant = client or init_qdrant(collection=collection, sections=sections, profile=collection_profile)
+    ensure_collection(qdrant, collection, collection_profile)
+    manifest = IndexManifest(manifest_path)
+    sections_collection = sections_collection_name(collection) if sections else None
+    if sections_collection:
+        ensure_collection(qdrant, sections_collection, collection_profile)
+    dims = collection_layout(qdrant, collection).dims
+
+    known_hashes = manifest.hashes(collection) if incremental else {}
+    if incremental:
+        indexed = qdrant.count(collection_name=collection).count
+        if known_hashes and not indexed:
+            logger.info(f"Collection '{collection}' is empty; discarding stale manifest entries")
+            manifest.remove(collection, list(known_hashes))
+            known_hashes = {}
+        elif not known_hashes and indexed:
+            manifest.rebuild_from_collection(qdrant, collection)
+            known_hashes = manifest.hashes(collection)
+        if sections_collection and known_hashes and not qdrant.count(collection_name=sections_collection).count:
+            logger.info(f"Section collection '{sections_collection}' is empty; re-indexing every product")
+            known_hashes = {}
+
+    sparse_encoder = None
+    if hybrid:
+        if has_sparse_vectors(qdrant, collection):
+            # Points that will be skipped keep vectors normalized with the stored length
+            sparse_encoder = fit_sparse_encoder(input_path, vocabulary_path, read_chunk_size,
+                                                refit_length=not known_hashes)
+        else:
+            logger.warning(f"⚠️ Collection '{collection}' has no '{SPARSE_VECTOR_NAME}' sparse vector; "
+                           "recreate it to enable hybrid search. Indexing dense vectors only.")
+
+    tagger = None
+    anchors_meta = {"llm_model": LLM_MODEL, "embedding_model": EMBEDDING_MODEL, "dims": dims}
+    if tagging == "bulk":
+        tagger = BulkTagger(functools.partial(tag_document, chat_fn=chat_fn), label_ratio=label_ratio, dims=dims)
+        tagger.load(tag_anchors_path, **anchors_meta)
+    elif tagging != "llm":
+        raise ValueError(f"Unknown tagging mode '{tagging}' (expected 'bulk' or 'llm')")
+
+    def checkpoint(points: List[PointStruct]):
+        manifest.record(collection, [(str(point.id), point.payload["content_hash"]) for point in points])
+
+    upserter = ChunkedUpserter(qdrant, collection, batch_size=upsert_batch_size, on_upserted=checkpoint,
+                               child_collection=sections_collection)
+
+    start = time.perf_counter()
+    seen_ids, skipped, processed = set(), 0, 0
+    with ThreadPoolExecutor(max_workers=max_workers) as executor, tqdm(unit="doc") as progress:
+        try:
+            for chunk in iter_batches(input_path, read_chunk_size):
+                rows = []
+                for row in chunk.to_dict(orient="records"):
+                    row_id = point_id(row)
+                    seen_ids.add(row_id)
+                    if known_hashes.get(row_id) == row_hash(row):
+                        skipped += 1
+                    else:
+                        rows.append(row)
+                if rows:
+                    if sections_collection:
+                        # Changed products may now have fewer chunks; drop the old ones first
+                        delete_sections(qdrant, sections_collection, [point_id(row) for row in rows])
+                    points, section_points = process_batch(rows, executor, embed_fn, chat_fn, embed_batch_size,
+                                                           sparse_encoder, sections=bool(sections_collection), dims=dims,
+                                                           tagger=tagger)
+                    upserter.submit(points, section_points)
+                    processed += len(rows)
+                progress.update(len(chunk))
+        finally:
+            if tagger is not None and tagger.labelled:
+                tagger.save(tag_anchors_path, **anchors_meta)
+            upserter.close()
+
+    deleted = 0
+    if incremental:
+        stale_ids = sorted(manifest.stale_ids(collection, seen_ids))
+        if stale_ids:
+            delete_stale_points(qdrant, collection, stale_ids, sections=bool(sections_collection))
+            manifest.remove(collection, stale_ids)
+            deleted = len(stale_ids)
+    if upserter.upserted or deleted or manifest.version(collection) is None:
+        manifest.bump_version(collection)
+    version = manifest.version(collection)
+    manifest.close()
+
+    elapsed = time.perf_counter() - start
+    stats = {
+        "docs": upserter.upserted,
+        "sections": upserter.children_upserted,
+        "skipped": skipped,
+        "deleted": deleted,
+        "tag_requests": tagger.labelled if tagger is not None else processed,
+        "version": version,
+        "elapsed_s": round(elapsed, 2),
+        "docs_per_sec": round(upserter.upserted / elapsed, 2) if elapsed > 0 else 0.0,
+    }
+    logger.info(f"✅ Indexed {stats['docs']} documents into Qdrant collection '{collection}' "
+                f"in {stats['elapsed_s']}s ({stats['docs_per_sec']} docs/sec); "
+                f"{skipped} unchanged, {deleted} deleted, {stats['tag_requests']} tagging requests")
+    return stats
+
+
+# === CLI EXECUTION ===
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tag, embed and index the RAG dataset into Qdrant.")
+    parser.add_argument("--input", default=INPUT_PATH)
+    parser.add_argument("--collection", default=COLLECTION_NAME)
+    parser.add_argument("--read-chunk-size", type=int, default=READ_CHUNK_SIZE)
+    parser.add_argument("--embed-batch-size", type=int, default=EMBED_BATCH_SIZE)
+    parser.add_argument("--upsert-batch-size", type=int, default=UPSERT_BATCH_SIZE)
+    parser.add_argument("--max-workers", type=int, default=MAX_WORKERS)
+    parser.add_argument("--incremental", action="store_true",
+                        help="Skip unchanged rows, resume interrupted runs and delete vanished products")
+    parser.add_argument("--manifest", default=MANIFEST_PATH)
+    parser.add_argument("--no-hybrid", action="store_true", help="Skip BM25 sparse vectors")
+    parser.add_argument("--no-sections", action="store_true", help="Skip per-section child points")
+    parser.add_argument("--profile", default=None,
+                        help="Collection profile for new collections (default: SMARTFIND_COLLECTION_PROFILE or 'default')")
+    parser.add_argument("--tagging", choices=["bulk", "llm"], default=TAGGING,
+                        help="bulk: LLM-tag cluster medoids and propagate by kNN; llm: one tagging request per product")
+    parser.add_argument("--label-ratio", type=float, default=LABEL_RATIO,
+                        help="Share of uncovered products LLM-tagged as anchors in bulk mode")
+    parser.add_argument("--tag-anchors", default=TAG_ANCHORS_PATH)
+    args = parser.parse_args()
+
+    run_ingest(
+        input_path=args.input,
+        collection=args.collection,
+        read_chunk_size=args.read_chunk_size,
+        embed_batch_size=args.embed_batch_size,
+        upsert_batch_size=args.upsert_batch_size,
+        max_workers=args.max_workers,
+        incremental=args.incremental,
+        manifest_path=args.manifest,
+        hybrid=not args.no_hybrid,
+        sections=not args.no_sections,
+        profile=args.profile,
+        tagging=args.tagging,
+        label_ratio=args.label_ratio,
+        tag_anchors_path=args.tag_anchors,
+    )
@@ -0,0 +1,410 @@
+# core/query_understanding.py
+import logging
+import re
+import threading
+import time
+
+from collections import Counter, OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from utils.index_manifest import read_version
+from utils.llm_utils import call_chat, safe_json_parse
+from utils.prompts import QUERY_TAGGING_PROMPT
+from utils.tracing import REGISTRY, count
+from utils.vector_store import get_qdrant_client
+
+# === CONFIG ===
+COLLECTION_NAME = "ecommerce-products"
+LLM_MODEL = "gpt-4.1-mini"
+QUERY_CACHE_SIZE = 10_000          # normalized queries kept in the result cache
+QUERY_CACHE_TTL_S = 6 * 3600       # how long a cached query understanding stays valid
+EMPTY_RESULT_TTL_S = 60            # LLM fallbacks that found no tags (or failed) are retried after this
+VOCABULARY_TTL_S = 3600            # how often the tag vocabulary is reloaded from Qdrant
+VOCABULARY_CHECK_S = 30            # how often the ingest manifest is checked for a re-ingest
+MIN_TAG_FREQUENCY = 2              # tags seen on fewer products are treated as noise
+HIGHLY_RATED_MIN_RATING = 4.0      # rating floor implied by "top-rated" / "highly rated"
+IGNORED_TAGS = {"misc"}
+
+logger = logging.getLogger("query_understanding")
+
+# === TEXT NORMALIZATION ===
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[.\-][a-z0-9]+)*\+?")
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase, unify dashes and collapse whitespace so paraphrase-free repeats share a cache key."""
+    query = query.lower().replace("–", "-").replace("—", "-")
+    return " ".join(query.split())
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(normalize_query(text))
+
+
+def singularize(token: str) -> str:
+    if len(token) > 3 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+# === STRUCTURED CONSTRAINT PATTERNS ===
+NUMBER = r"(\d+(?:\.\d+)?)"
+PRICE_BETWEEN = re.compile(rf"between\s+[$£]?{NUMBER}\s+(?:and|to|-)\s+[$£]?{NUMBER}")
+PRICE_RANGE = re.compile(rf"[$£]{NUMBER}\s*(?:-|to)\s*[$£]?{NUMBER}")
+PRICE_MAX = re.compile(rf"(?:under|below|less than|cheaper than|up to|max(?:imum)?|within)\s+[$£]?{NUMBER}(?!\s*(?:stars?|years?|yrs?|-?year))")
+PRICE_MIN = re.compile(rf"(?:over|above|more than|at least|from)\s+[$£]{NUMBER}")
+RATING_MIN = re.compile(rf"(?:(?:rated\s+)?(?:above|over|at least|min(?:imum)?)\s+)?{NUMBER}\s*\+?\s*(?:-\s*)?stars?")
+HIGHLY_RATED = re.compile(r"\b(?:top|highly|high|best|well)[\s-]rated\b")
+# A bare number after "under"/"between" is only a price with a currency next to it or a price
+# word shortly before it ("kids under 5" and "dolls up to 12 inches" are not prices)
+CURRENCY_AFTER = re.compile(r"\s*(?:dollars?|bucks|usd|pounds?|gbp|quid)\b")
+PRICE_WORD_BEFORE = re.compile(r"\b(?:price[ds]?|costs?|costing|budget|spend(?:ing)?)\b\D{0,12}$")
+# Ranges and "N+" count as ages next to an age word, or without one when the bound is a
+# plausible child age; never when a unit of something else follows ("500-1000 pieces")
+AGE_WORD = re.compile(r"\b(?:ages?d?|years?|yrs?|months?|olds?)\b")
+AGE_MONTHS = re.compile(r"\s*-?\s*months?\b")
+NOT_AGE_UNIT = re.compile(r"\s*-?\s*(?:pieces?|pcs|pc|players?|inch(?:es)?|in\b|cm|mm|ft|feet|foot|count|packs?|"
+                          r"sets?|minutes?|mins?|lbs?|oz|kg|g\b|%)")
+MAX_BARE_AGE = 18
+AGE_RANGE = re.compile(rf"(?:aged?s?\s+)?{NUMBER}\s*(?:-|to)\s*{NUMBER}(?:\s*(?:years?|yrs?)(?:[\s-]olds?)?|(?=\s*$)|(?=[\s-]))")
+AGE_SINGLE = re.compile(rf"{NUMBER}[\s-]*(?:years?|yrs?)[\s-]*olds?|aged?\s+{NUMBER}\b")
+AGE_PLUS = re.compile(rf"{NUMBER}\s*\+\s*(?:years?|yrs?)?(?!\s*(?:-\s*)?stars?)")
+
+
+def _spans_overlap(span: Tuple[int, int], taken: List[Tuple[int, int]]) -> bool:
+    return any(span[0] < end and start < span[1] for start, end in taken)
+
+
+def _is_price(text: str, match: re.Match) -> bool:
+    return bool(
+        re.search(r"[$£]", match.group(0))
+        or CURRENCY_AFTER.match(text, match.end())
+        or PRICE_WORD_BEFORE.search(text, 0, match.start())
+    )
+
+
+def _is_age(text: str, match: re.Match) -> bool:
+    if NOT_AGE_UNIT.match(text, match.end()):
+        return False
+    nearby = text[max(0, match.start() - 8):match.end() + 10]
+    return bool(AGE_WORD.search(nearby)) or max(int(float(value)) for value in match.groups() if value) <= MAX_BARE_AGE
+
+
+def _age_bound(text: str, match: re.Match, value: str) -> int:
+    """Age in years; "6-12 months" is read as 0-1."""
+    age = int(float(value))
+    return age // 12 if AGE_MONTHS.match(text, match.end()) else age
+
+
+def parse_constraints(query: str) -> Dict:
+    """
+    Pull typed numeric constraints (price range, minimum rating, age range) out of a query.
+
+    Patterns are applied most-specific first and each consumes its span of text, so
+    "$30 and $60" is read as a price and "4+ star" as a rating rather than an age. Price
+    bounds need a currency ("$", "£", "dollars") or a price word ("price", "budget");
+    bare numbers ("toys for kids under 5") produce no price condition. Age ranges need an
+    age word nearby or bounds up to MAX_BARE_AGE, and never precede a unit such as
+    "pieces" or "players".
+
+    Returns:
+        Dict: Keys `price_min`, `price_max`, `min_rating`, `age_range` (each None if absent)
+        and `spans`, the character ranges that were consumed.
+    """
+    text = normalize_query(query)
+    taken: List[Tuple[int, int]] = []
+    result = {"price_min": None, "price_max": None, "min_rating": None, "age_range": None}
+
+    def first(pattern, accept=None):
+        for match in pattern.finditer(text):
+            if not _spans_overlap(match.span(), taken) and (accept is None or accept(text, match)):
+                taken.append(match.span())
+                return match
+        return None
+
+    match = first(PRICE_BETWEEN, _is_price) or first(PRICE_RANGE)
+    if match:
+        low, high = sorted(float(value) for value in match.groups())
+        result["price_min"], result["price_max"] = low, high
+    match = first(PRICE_MAX, _is_price)
+    if match and result["price_max"] is None:
+        result["price_max"] = float(match.group(1))
+    match = first(PRICE_MIN)
+    if match and result["price_min"] is None:
+        result["price_min"] = float(match.group(1))
+
+    match = first(RATING_MIN)
+    if match and float(match.group(1)) <= 5:
+        result["min_rating"] = float(match.group(1))
+    elif HIGHLY_RATED.search(text):
+        result["min_rating"] = HIGHLY_RATED_MIN_RATING
+
+    match = first(AGE_RANGE, _is_age)
+    if match:
+        low, high = sorted(_age_bound(text, match, value) for value in match.groups())
+        result["age_range"] = (low, high)
+    else:
+        match = first(AGE_SINGLE)
+        if match:
+            age = int(float(next(value for value in match.groups() if value)))
+            result["age_range"] = (age, age)
+        else:
+            match = first(AGE_PLUS, _is_age)
+            if match:
+                result["age_range"] = (_age_bound(text, match, match.group(1)), None)
+
+    result["spans"] = taken
+    return result
+
+
+def parse_age_tag(tag: str) -> Optional[Tuple[int, Optional[int]]]:
+    """Interpret age-group tags such as '5-7', '3+', '8-12 years' as (low, high) bounds."""
+    match = re.fullmatch(r"(\d{1,2})\s*(?:-|to)\s*(\d{1,2})(?:\s*(?:years?|yrs?))?", tag)
+    if match:
+        return int(match.group(1)), int(match.group(2))
+    match = re.fullmatch(r"(\d{1,2})\s*\+(?:\s*(?:years?|yrs?))?", tag)
+    if match:
+        return int(match.group(1)), None
+    return None
+
+
+def _age_overlaps(wanted: Tuple[int, Optional[int]], tag_range: Tuple[int, Optional[int]]) -> bool:
+    wanted_high = wanted[1] if wanted[1] is not None else 99
+    tag_high = tag_range[1] if tag_range[1] is not None else 99
+    return wanted[0] <= tag_high and tag_range[0] <= wanted_high
+
+
+def canonical_tag(tag) -> str:
+    """
+    Canonical form of a tag: lowercase, single-spaced, without surrounding punctuation, and
+    age groups written as '5-7' or '3+' ('5 - 7 Years' -> '5-7'). Ingest stores product tags
+    in this form and search filters match them verbatim; '' when nothing is left.
+    """
+    if not isinstance(tag, str):
+        return ""
+    tag = normalize_query(tag).strip(" .,;:!?\"'`#*")
+    tag = re.sub(r"(?<=\d)\s*-\s*(?=\d)", "-", re.sub(r"(?<=\d)\s+\+", "+", tag))
+    age = parse_age_tag(re.sub(r"^(?:ages?|for)\s+(?=\d)", "", tag))
+    if age:
+        return f"{age[0]}-{age[1]}" if age[1] is not None else f"{age[0]}+"
+    return tag
+
+
+def canonical_tags(tags: Iterable) -> List[str]:
+    """Canonical, de-duplicated tags in their original order."""
+    return [tag for tag in dict.fromkeys(canonical_tag(tag) for tag in tags) if tag]
+
+
+# === TAG VOCABULARY ===
+class TagVocabulary:
+    """
+    Dictionary of the tags actually stored on indexed products, matched against queries
+    with a token trie (longest match wins, plural tokens fall back to their singular).
+    """
+
+    def __init__(self, tags: Iterable[str]):
+        self.tags = set(canonical_tags(tags)) - IGNORED_TAGS
+        self.age_tags = {tag: parsed for tag in self.tags if (parsed := parse_age_tag(tag))}
+        self._trie: Dict = {}
+        for tag in self.tags:
+            node = self._trie
+            for token in tokenize(tag):
+                node = node.setdefault(token, {})
+            node["$tag"] = tag
+
+    def __len__(self) -> int:
+        return len(self.tags)
+
+    def __contains__(self, tag: str) -> bool:
+        return canonical_tag(tag) in self.tags
+
+    def match(self, tokens: List[str]) -> List[str]:
+        """Return vocabulary tags found in the token sequence, in query order."""
+        found, i = [], 0
+        while i < len(tokens):
+            node, best, best_end, j = self._trie, None, i, i
+            while j < len(tokens):
+                child = node.get(tokens[j]) or node.get(singularize(tokens[j]))
+                if child is None:
+                    break
+                node, j = child, j + 1
+                if "$tag" in node:
+                    best, best_end = node["$tag"], j
+            if best:
+                if best not in found:
+                    found.append(best)
+                i = best_end
+            else:
+                i += 1
+        return found
+
+    def age_tags_for(self, age_range: Tuple[int, Optional[int]]) -> List[str]:
+        return sorted(tag for tag, bounds in self.age_tags.items() if _age_overlaps(age_range, bounds))
+
+
+def load_vocabulary(collection: str = COLLECTION_NAME, min_frequency: int = MIN_TAG_FREQUENCY,
+                    batch_size: int = 1000) -> TagVocabulary:
+    """Build the tag vocabulary by scrolling the `tags` payload field of every indexed product."""
+    qdrant = get_qdrant_client(collection=collection)
+    counts, offset = Counter(), None
+    while True:
+        records, offset = qdrant.scroll(
+            collection_name=collection, limit=batch_size, offset=offset,
+            with_payload=["tags"], with_vectors=False,
+        )
+        for record in records:
+            counts.update(canonical_tags((record.payload or {}).get("tags") or []))
+        if offset is None:
+            break
+    vocabulary = TagVocabulary(tag for tag, count in counts.items() if count >= min_frequency)
+    logger.info(f"Loaded tag vocabulary with {len(vocabulary)} tags from '{collection}'")
+    return vocabulary
+
+
+# === RESULT CACHE ===
+class TTLCache:
+    """Thread-safe LRU mapping whose entries expire `ttl_s` seconds after insertion."""
+
+    def __init__(self, maxsize: int = QUERY_CACHE_SIZE, ttl_s: float = QUERY_CACHE_TTL_S):
+        self.maxsize = maxsize
+        self.ttl_s = ttl_s
+        self._data: "OrderedDict[str, Tuple[float, object]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def __len__(self):
+        return len(self._data)
+
+    def set(self, key: str, value, ttl_s: Optional[float] = None):
+        with self._lock:
+            self._data[key] = (time.monotonic() + (self.ttl_s if ttl_s is None else ttl_s), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+# === TIERED QUERY UNDERSTANDING ===
+_query_cache = TTLCache()
+REGISTRY.register_collector("query_cache", lambda: {
+    "hits": _query_cache.hits, "misses": _query_cache.misses, "items": len(_query_cache)
+})
+_vocabulary: Optional[TagVocabulary] = None
+_vocabulary_version: Optional[str] = None
+_vocabulary_loaded_at = 0.0
+_vocabulary_checked_at = float("-inf")
+_vocabulary_lock = threading.Lock()
+
+
+def _vocabulary_stale(now: float) -> bool:
+    """Past VOCABULARY_TTL_S, or the ingest manifest shows a newer index (checked every VOCABULARY_CHECK_S)."""
+    global _vocabulary_checked_at
+    if _vocabulary is None or now - _vocabulary_loaded_at > VOCABULARY_TTL_S:
+        return True
+    if now - _vocabulary_checked_at < VOCABULARY_CHECK_S:
+        return False
+    _vocabulary_checked_at = now
+    return read_version(COLLECTION_NAME) != _vocabulary_version
+
+
+def get_vocabulary() -> TagVocabulary:
+    """
+    Process-wide tag vocabulary, loaded lazily and refreshed every VOCABULARY_TTL_S or
+    after an ingest. Cached query understandings are dropped when the tags change, since
+    they were resolved against the old vocabulary.
+    """
+    global _vocabulary, _vocabulary_version, _vocabulary_loaded_at
+    now = time.monotonic()
+    if not _vocabulary_stale(now):
+        return _vocabulary
+    with _vocabulary_lock:
+        if _vocabulary is not None and _vocabulary_loaded_at >= now:
+            return _vocabulary      # reloaded by another thread meanwhile
+        version = read_version(COLLECTION_NAME)
+        try:
+            vocabulary = load_vocabulary()
+        except Exception as e:
+            logger.warning(f"⚠️ Could not load tag vocabulary: {e}")
+            vocabulary = _vocabulary or TagVocabulary([])
+        else:
+            _vocabulary_version = version
+            if _vocabulary is not None and vocabulary.tags != _vocabulary.tags:
+                _query_cache.clear()
+        _vocabulary, _vocabulary_loaded_at = vocabulary, time.monotonic()
+    return _vocabulary
+
+
+def extract_local(query: str, vocabulary: TagVocabulary) -> Dict:
+    """
+    Deterministic tag extraction: vocabulary matches on the query text left over after
+    numeric constraints are removed, plus the vocabulary's age-group tags that overlap
+    the requested age range.
+    """
+    constraints = parse_constraints(query)
+    text = normalize_query(query)
+    for start, end in sorted(constraints.pop("spans"), reverse=True):
+        text = text[:start] + " " + text[end:]
+
+    tags = vocabulary.match(tokenize(text))
+    if constraints["age_range"]:
+        tags += [tag for tag in vocabulary.age_tags_for(constraints["age_range"]) if tag not in tags]
+    return {"tags": tags, **constraints}
+
+
+def extract_with_llm(query: str, vocabulary: Optional[TagVocabulary] = None) -> List[str]:
+    """LLM tagger fallback; tags outside a non-empty vocabulary are dropped since they can never match."""
+    raw_response = call_chat(LLM_MODEL, QUERY_TAGGING_PROMPT, query)
+    tags = canonical_tags(safe_json_parse(raw_response, key="tags", fallback="misc"))
+    if vocabulary is not None and len(vocabulary):
+        tags = [tag for tag in tags if tag in vocabulary]
+    return [tag for tag in tags if tag not in IGNORED_TAGS]
+
+
+def understand_query(query: str, use_llm_fallback: bool = True) -> Dict:
+    """
+    Resolve a query into tags and numeric constraints through three tiers:
+    the normalized-query TTL cache, the local vocabulary/regex extractor, and
+    finally the LLM tagger when the local extractor finds no tags. An LLM fallback that
+    found nothing (or failed) is only cached for EMPTY_RESULT_TTL_S, so a transient API
+    error does not disable tag filtering for that query for hours.
+
+    Returns:
+        Dict: `tags`, `price_min`, `price_max`, `min_rating`, `age_range` and `source`
+        ('cache', 'local' or 'llm').
+    """
+    key = normalize_query(query)
+    cached = _query_cache.get(key)
+    if cached is not None:
+        count("query_cache.hits")
+        return {**cached, "source": "cache"}
+    count("query_cache.misses")
+
+    vocabulary = get_vocabulary()
+    result = extract_local(query, vocabulary)
+    result["source"] = "local"
+    if not result["tags"] and use_llm_fallback:
+        result["tags"] = extract_with_llm(query, vocabulary)
+        result["source"] = "llm"
+        count("tags.llm_fallbacks")
+
+    _query_cache.set(key, result, EMPTY_RESULT_TTL_S if result["source"] == "llm" and not result["tags"] else None)
+    logger.info(f"Query understanding ({result['source']}): tags={result['tags']}")
+    return result
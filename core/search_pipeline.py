@@ -1,35 +1,65 @@
 # core/search_pipeline.py
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import functools
 import logging
 import os
+import threading
 import time
-import cohere
 
-from typing import List, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
 
-from qdrant_client import models
+from core.query_understanding import canonical_tags, get_vocabulary, parse_constraints, understand_query
+from utils.chunking import count_tokens
+from utils.context_builder import build_context
+from utils.embedding_cache import get_embedding_cache
+from utils.llm_utils import get_embedding, get_openai, call_chat, call_chat_stream
+from utils.prompts import RESEARCH_PROMPT
+from utils.report_utils import format_report
+from utils.rerankers import RERANKER, get_reranker
+from utils.response_cache import CachedResponse, get_response_cache
+from utils.tracing import Timer, Trace, count, trace
+from utils.vector_store import SearchHit, get_vector_store
 
-from utils.llm_utils import get_embedding, call_chat, safe_json_parse, clean_rag_document
-from utils.prompts import QUERY_TAGGING_PROMPT, RESEARCH_PROMPT
-from utils.vector_store import get_qdrant_client
+if TYPE_CHECKING:
+    from qdrant_client import models
 
 # === CONFIG ===
 COLLECTION_NAME = "ecommerce-products"
 EMBEDDING_MODEL = "text-embedding-3-small"
 LLM_MODEL = "gpt-4.1-mini"
-COHERE_MODEL = "rerank-v3.5"
-COHERE_KEY = os.getenv("COHERE_API_KEY")
+TOP_K = 5                    # results passed to the report
+RERANK_CANDIDATES = 20       # candidates retrieved for the reranker to choose TOP_K from
+HYBRID_SEARCH = os.getenv("SMARTFIND_HYBRID", "1") != "0"
+SECTION_SEARCH = os.getenv("SMARTFIND_SECTION_SEARCH", "1") != "0"
+WARM_UP = os.getenv("SMARTFIND_WARM_UP", "1") != "0"            # preload clients and caches before serving
+WARM_UP_QUERY = os.getenv("SMARTFIND_WARM_UP_QUERY", "")        # optional query retrieved once (opens API connections)
+
+# Threads running the blocking stages of the async pipelines (shared by all concurrent requests)
+WORKER_THREADS = int(os.getenv("SMARTFIND_WORKER_THREADS", "32"))
+
+# Per-stage timeouts for search_pipeline_async (seconds)
+TAGS_TIMEOUT_S = 2.0
+EMBEDDING_TIMEOUT_S = 10.0
+SEARCH_TIMEOUT_S = 10.0
+RERANK_TIMEOUT_S = 5.0
+REPORT_TIMEOUT_S = 60.0
 
 # === LOGGING ===
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("search_pipeline")
 
-# === INIT ===
-co = cohere.Client(COHERE_KEY)
-
 # === QUERY TAG PARSER ===
+@Timer("tags")
 def get_tags(query: str) -> List[str]:
     """
-    Extract structured metadata tags from the user's natural language query using an LLM.
+    Extract structured metadata tags from the user's natural language query.
+
+    Tags are resolved by the tiered query-understanding layer: a normalized-query TTL
+    cache, then a local extractor matching the tag vocabulary stored in Qdrant (plus
+    age/price/rating patterns), and only if that finds nothing, the LLM tagger.
 
     This is typically used to filter vector search results in Qdrant by product attributes
     such as category, age group, material, brand, or theme.
@@ -41,69 +71,110 @@ def get_tags(query: str) -> List[str]:
         List[str]: A list of extracted metadata tags (e.g., ['lego', '3+', 'plastic']).
     """
     logger.info(f"Extracting tags from query: '{query}'")
-    raw_response = call_chat(LLM_MODEL, QUERY_TAGGING_PROMPT, query)
-    return safe_json_parse(raw_response, key="tags", fallback="misc")
+    return understand_query(query)["tags"]
+
+
+@Timer("tags")
+def analyze_query(query: str) -> dict:
+    """
+    Extract tags plus typed constraints from the query.
+
+    Returns:
+        dict: `tags`, `price_min`, `price_max`, `min_rating`, `age_range` (see `understand_query`).
+    """
+    logger.info(f"Analyzing query: '{query}'")
+    return understand_query(query)
 
 
 # === Qdrant METADATA FILTER ===
-def build_metadata_filter(tags: List[str]) -> models.Filter:
+def build_metadata_filter(tags: List[str], constraints: Optional[dict] = None) -> models.Filter:
     """
-    Build a Qdrant-compatible metadata filter using extracted tags.
+    Build a Qdrant-compatible metadata filter using extracted tags and numeric constraints.
 
-    Each tag becomes a field condition matched against the 'tags' field in Qdrant payloads.
+    Each tag, in canonical form (`canonical_tag`, the form ingest stores), becomes a field
+    condition matched against the 'tags' field in Qdrant payloads (any tag may match).
+    Price and rating constraints become `must` range conditions on the 'price'/'rating'
+    payload fields, so products outside them are pruned before scoring.
 
     Args:
         tags (List[str]): List of tag strings (e.g., ['stem', 'toddler']).
+        constraints (dict, optional): `price_min`, `price_max`, `min_rating` as produced by `analyze_query`.
 
     Returns:
         models.Filter: A Qdrant filter to restrict vector search results to tagged items.
     """
-    logger.info(f"Building metadata filter for tags: {tags}")
+    from qdrant_client import models
+
+    constraints = constraints or {}
+    logger.info(f"Building metadata filter for tags: {tags}, price: "
+                f"{constraints.get('price_min')}-{constraints.get('price_max')}, min rating: {constraints.get('min_rating')}")
     conditions = [
-        models.FieldCondition(key="tags", match=models.MatchValue(value=tag.lower()))
-        for tag in tags if tag
+        models.FieldCondition(key="tags", match=models.MatchValue(value=tag))
+        for tag in canonical_tags(tags)
     ]
-    return models.Filter(should=conditions)
+
+    must = []
+    if constraints.get("price_min") is not None or constraints.get("price_max") is not None:
+        must.append(models.FieldCondition(
+            key="price", range=models.Range(gte=constraints.get("price_min"), lte=constraints.get("price_max"))
+        ))
+    if constraints.get("min_rating") is not None:
+        must.append(models.FieldCondition(key="rating", range=models.Range(gte=constraints["min_rating"])))
+
+    return models.Filter(should=conditions or None, must=must or None)
+
+
+def query_filter(analysis: dict) -> Optional[models.Filter]:
+    """Filter for an `analyze_query` result, or None when it carries neither tags nor constraints."""
+    has_constraints = any(analysis.get(key) is not None for key in ("price_min", "price_max", "min_rating"))
+    if not analysis.get("tags") and not has_constraints:
+        return None
+    return build_metadata_filter(analysis.get("tags", []), analysis)
 
 
 # === SEMANTIC SEARCH ===
-def semantic_search(query: str, filter_obj: models.Filter = None, top_k: int = 5) -> List[Tuple[str, float, str, float, float]]:
+@Timer("embedding")
+def embed_query(query: str) -> List[float]:
+    return get_embedding(query)
+
+
+def semantic_search(query: str, filter_obj: models.Filter = None, top_k: int = 5,
+                    query_vector: Optional[List[float]] = None,
+                    hybrid: bool = HYBRID_SEARCH, sections: bool = SECTION_SEARCH) -> List[SearchHit]:
     """
-    Perform hybrid vector search in Qdrant with optional metadata-based filtering.
+    Perform hybrid vector search with optional metadata-based filtering.
+
+    The search runs on the configured `VectorStore` backend (SMARTFIND_VECTOR_BACKEND):
+    Qdrant by default, or the in-process NumPy index for small catalogs and tests.
+
+    On Qdrant, when `hybrid` is set and the collection carries BM25 sparse vectors, the
+    dense and sparse candidates are retrieved in one request and merged with reciprocal-rank
+    fusion, so exact brand/model-number matches surface even when the embedding misses them.
+    When `sections` is set and ingest indexed section chunks, the search runs over those
+    chunks instead and each product is scored by its best-matching section.
 
     Args:
         query (str): The user's query string.
         filter_obj (models.Filter, optional): Qdrant metadata filter (default: None).
         top_k (int): Number of top results to return (default: 5).
+        query_vector (List[float], optional): Precomputed query embedding; embedded here if omitted.
+        hybrid (bool): Fuse BM25 sparse retrieval with the dense search when available.
+        sections (bool): Search section chunks with per-product max-sim when available.
 
     Returns:
-        List[Tuple]: Each tuple contains:
-            (cleaned_document, qdrant_score, reviews, price, rating)
+        List[SearchHit]: Hits carrying only the display payload fields (cleaned summary,
+            review snippet, price, rating, tags); raw documents are never transferred.
     """
-    logger.info(f"Searching Qdrant for query: '{query}'")
-    try:
-        qdrant = get_qdrant_client(collection=COLLECTION_NAME)
-        results = qdrant.search(
-            collection_name=COLLECTION_NAME,
-            query_vector=get_embedding(query),
-            query_filter=filter_obj,
-            limit=top_k
-        )
-        return [
-            (
-                clean_rag_document(hit.payload.get("document", "N/A")), # TODO: fix cleanup before indexing into Qdrant
-                hit.score,
-                hit.payload.get("reviews", ""),
-                hit.payload.get("price", 0.0),
-                hit.payload.get("rating", 0.0)
-            )
-            for hit in results
-        ]
-    finally:
-        qdrant.close()
+    store = get_vector_store(collection=COLLECTION_NAME)
+    logger.info(f"Searching {store.name} for query: '{query}'")
+    dense = query_vector if query_vector is not None else embed_query(query)
+    with Timer("search"):
+        hits = store.search(query, dense, filter_obj, top_k, hybrid=hybrid, sections=sections)
+    count("search.results", len(hits))
+    return hits
 
 # === SEMANTIC SEARCH WITHOUT TAG FILTERING ===
-def semantic_search_without_tags(query: str, top_k: int = 5) -> List[Tuple[str, float, str, float, float]]:
+def semantic_search_without_tags(query: str, top_k: int = 5) -> List[SearchHit]:
     """
     Perform pure vector-based semantic search without any metadata filtering.
 
@@ -112,113 +183,467 @@ def semantic_search_without_tags(query: str, top_k: int = 5) -> List[Tuple[str,
         top_k (int): Number of results to retrieve.
 
     Returns:
-        List[Tuple]: Each tuple contains:
-            (document, qdrant_score, reviews, price, rating)
+        List[SearchHit]: Retrieved products ordered by vector score.
     """
     logger.info(f"Performing semantic-only search (no metadata filtering) for query: '{query}'")
     return semantic_search(query=query, filter_obj=None, top_k=top_k)
 
-# === COHERE RERANKER ===
-def rerank_with_cohere(query: str, docs: List[Tuple]) -> List[Tuple]:
+# === RERANKING ===
+@Timer("rerank")
+def rerank(query: str, docs: List[SearchHit], reranker: Optional[str] = None, top_k: int = TOP_K) -> List[SearchHit]:
     """
-    Re-rank a list of retrieved documents using Cohere's Rerank API.
+    Re-rank retrieved documents with the configured reranker and keep the best `top_k`.
 
     Args:
         query (str): The user's query.
-        docs (List[Tuple]): A list of result tuples from Qdrant:
-            (document, qdrant_score, reviews, price, rating)
+        docs (List[SearchHit]): Hits from `semantic_search`.
+        reranker (str, optional): 'cohere' or 'features' (default: SMARTFIND_RERANKER).
+        top_k (int): Number of results to keep after reranking.
 
     Returns:
-        List[Tuple]: Same tuples, reordered and extended with Cohere relevance score:
-            (document, qdrant_score, reviews, price, rating, cohere_score)
+        List[SearchHit]: Reordered hits with `rerank_score` set.
     """
-    logger.info(f"Applying Cohere Reranking to {len(docs)} documents")
-    start = time.perf_counter()
-
-    try:
-        texts = [doc[0] for doc in docs]
-
-        response = co.rerank(
-            query=query,
-            documents=texts,
-            model=COHERE_MODEL,
-            top_n=len(texts)
-        )
-
-        if len(response.results) != len(docs):
-            logger.warning("⚠️ Cohere returned fewer results than expected. Falling back to original.")
-            return docs
-
-        reranked = [
-            (*docs[r.index], r.relevance_score)
-            for r in response.results
-        ]
+    reranker_impl = get_reranker(reranker)
+    logger.info(f"Applying {reranker_impl.name} reranking to {len(docs)} documents")
+    reranked = reranker_impl.rerank(query, docs)[:top_k]
 
-        def score_key(entry):
-            return entry[5] if len(entry) > 5 else entry[1]
+    logger.info("📊 Top 5 Reranked Results:")
+    for i, hit in enumerate(reranked[:5]):
+        logger.info(f"{i+1}. Score={hit.rerank_score:.4f} | Price=${hit.price:.2f} | Rating={hit.rating:.1f}")
+    return reranked
 
-        reranked = sorted(reranked, key=score_key, reverse=True)
 
-        logger.info("📊 Top 5 Reranked Results:")
-        for i, (doc, _, _, price, rating, coh_score) in enumerate(reranked[:5]):
-            logger.info(f"{i+1}. Score={coh_score:.4f} | Price=${price:.2f} | Rating={rating:.1f}")
-
-        elapsed = time.perf_counter() - start
-        logger.info(f"✅ Cohere reranking complete in {elapsed:.2f}s")
+# === COHERE RERANKER ===
+def rerank_with_cohere(query: str, docs: List[SearchHit]) -> List[SearchHit]:
+    """
+    Re-rank a list of retrieved documents using Cohere's Rerank API.
 
-        return reranked
+    Args:
+        query (str): The user's query.
+        docs (List[SearchHit]): Hits from `semantic_search`.
 
-    except Exception as e:
-        logger.warning(f"⚠️ Cohere reranking failed: {e}")
-        return docs
+    Returns:
+        List[SearchHit]: Same hits, reordered, with the Cohere relevance score in `rerank_score`.
+    """
+    return rerank(query, docs, reranker="cohere", top_k=len(docs))
 
 # === PLANNER + SUMMARIZER ===
+@Timer("report")
 def generate_summary_report(query: str, docs: list) -> str:
     """
     Generate a markdown-formatted product comparison report using LLM summarization.
 
     Args:
         query (str): Original user query.
-        docs (list): List of ranked result tuples, including cohere_score if available.
+        docs (list): Ranked `SearchHit`s, including rerank_score if available.
 
     Returns:
         str: Markdown-formatted analysis and recommendations.
     """
     logger.info(f"Generating summary report for query: '{query}'")
-    context = "\n\n---\n\n".join([
-        f"Product Description: {doc}\nUser Reviews: {reviews}\nPrice: {price}\nRating: {rating}\nVector Score: {vector_score}\nCohere Score: {cohere_score}"
-        for doc, vector_score, reviews, price, rating, cohere_score in docs
-    ])
-    user = f"User Query: {query}\n\nProducts:\n{context}"
+    return call_chat(LLM_MODEL, RESEARCH_PROMPT, build_report_prompt(query, docs))
+
+
+@Timer("report")
+def generate_summary_report_stream(query: str, docs: list) -> Iterator[str]:
+    """
+    Streaming variant of `generate_summary_report`: yields markdown deltas as the LLM produces them.
+    """
+    logger.info(f"Streaming summary report for query: '{query}'")
+    yield from call_chat_stream(LLM_MODEL, RESEARCH_PROMPT, build_report_prompt(query, docs))
+
+
+@Timer("context")
+def build_report_prompt(query: str, docs: list) -> str:
+    """
+    Assemble the user message for RESEARCH_PROMPT from the ranked results.
+
+    The products section is token-budgeted (`utils.context_builder`, SMARTFIND_REPORT_CONTEXT_TOKENS):
+    each product keeps its header plus its most query-relevant description sentences and
+    deduplicated reviews, so prompt size and report latency do not grow with listing length.
+    """
+    context = build_context(query, docs)
+    count("report.context_tokens", count_tokens(context))
+    count("report.context_bytes", len(context.encode("utf-8")))
+    return f"User Query: {query}\n\nProducts:\n{context}"
+
+# === RESPONSE CACHE ===
+def response_options(user_query: str, use_reranker: bool, use_tags: bool) -> dict:
+    """
+    Everything besides the query embedding that a cached response must match: pipeline
+    options, models, and the locally parsed price/rating/age constraints, so that
+    "lego under $50" never serves the answer to "lego under $30".
+    """
+    constraints = parse_constraints(user_query)
+    constraints.pop("spans", None)
+    return {
+        "use_tags": use_tags,
+        "use_reranker": use_reranker,
+        "reranker": RERANKER if use_reranker else None,
+        "hybrid": HYBRID_SEARCH,
+        "sections": SECTION_SEARCH,
+        "top_k": TOP_K,
+        "embedding_model": EMBEDDING_MODEL,
+        "llm_model": LLM_MODEL,
+        **constraints,
+    }
+
+
+def cached_response(user_query: str, query_vector: List[float], options: dict) -> Optional[CachedResponse]:
+    cache = get_response_cache(COLLECTION_NAME)
+    return cache.get(user_query, query_vector, options) if cache else None
+
+
+def store_response(user_query: str, query_vector: List[float], options: dict, docs: List[SearchHit], report: str):
+    """Cache a completed response; empty results and failed reports ('{}' from `call_chat`) are not kept."""
+    cache = get_response_cache(COLLECTION_NAME)
+    if cache and docs and report.strip() not in ("", "{}"):
+        cache.put(user_query, query_vector, options, docs, report)
 
-    return call_chat(LLM_MODEL, RESEARCH_PROMPT, user)
 
 # === END-TO-END PIPELINE ===
 def search_pipeline(user_query: str, use_reranker: bool = False, use_tags: bool = True) -> str:
     """
     Full end-to-end pipeline for semantic product search with optional metadata filtering and reranking.
 
+    The query is embedded first; a cached response for the same or a near-identical query
+    with the same options (`utils.response_cache`, SMARTFIND_RESPONSE_CACHE) is returned
+    without tagging, searching or calling the LLM.
+
     Args:
         user_query (str): The user's product search question.
-        use_reranker (bool): Whether to apply Cohere reranking after vector search.
+        use_reranker (bool): Whether to rerank vector search candidates (SMARTFIND_RERANKER).
         use_tags (bool): Whether to extract metadata tags and apply filtering.
 
     Returns:
         str: Markdown-formatted ranked result report.
     """
-    tags = get_tags(user_query) if use_tags else []
+    return search_pipeline_results(user_query, use_reranker=use_reranker, use_tags=use_tags)[1]
+
+
+def search_pipeline_results(user_query: str, use_reranker: bool = False, use_tags: bool = True,
+                            report: bool = True) -> Tuple[List[SearchHit], Optional[str]]:
+    """
+    `search_pipeline` returning the ranked hits along with the report, for API clients.
+
+    Args:
+        report (bool): Generate (or fetch from the response cache) the LLM report; when
+            False only retrieval runs and the report is None.
+
+    Returns:
+        Tuple[List[SearchHit], Optional[str]]: Ranked hits and the markdown report.
+    """
+    options = response_options(user_query, use_reranker, use_tags)
+    query_vector = embed_query(user_query)
+    cached = cached_response(user_query, query_vector, options)
+    if cached:
+        return cached.hits, cached.report if report else None
+    docs = retrieve(user_query, use_reranker=use_reranker, use_tags=use_tags, query_vector=query_vector)
+    if not report:
+        return docs, None
+    text = generate_summary_report(user_query, docs)
+    store_response(user_query, query_vector, options, docs, text)
+    return docs, text
+
+
+def search_pipeline_with_trace(user_query: str, use_reranker: bool = False,
+                               use_tags: bool = True) -> Tuple[str, Trace]:
+    """
+    `search_pipeline` plus the request's `Trace`: per-stage spans (tags, embedding, search,
+    rerank, report and the LLM calls inside them), token/byte counts and cache hits.
+
+    Other entry points (async, streaming) are traced the same way by running them inside
+    `with utils.tracing.trace() as t:`.
+
+    Returns:
+        Tuple[str, Trace]: The markdown report and the trace (`trace.to_dict()` is JSON-ready).
+    """
+    with trace("search_pipeline") as request_trace:
+        report = search_pipeline(user_query, use_reranker=use_reranker, use_tags=use_tags)
+    logger.info(f"⏱️ {request_trace}")
+    return report, request_trace
+
+
+def retrieve(user_query: str, use_reranker: bool = False, use_tags: bool = True,
+             query_vector: Optional[List[float]] = None) -> List[SearchHit]:
+    """
+    Retrieval half of the pipeline: tags/constraints -> filtered vector search -> optional reranking.
 
-    filter_obj = build_metadata_filter(tags) if tags else None
-    docs = semantic_search(user_query, filter_obj)
+    Returns:
+        List[SearchHit]: Ranked hits (with `rerank_score` when reranked).
+    """
+    filter_obj = query_filter(analyze_query(user_query)) if use_tags else None
+    docs = semantic_search(user_query, filter_obj, top_k=RERANK_CANDIDATES if use_reranker else TOP_K,
+                           query_vector=query_vector)
 
     if use_reranker:
-        docs = rerank_with_cohere(user_query, docs)
+        docs = rerank(user_query, docs)
+    return docs
+
+
+# === STREAMING PIPELINE ===
+ANALYSIS_HEADER = "\n\n---\n\n## 🧠 SmartFind Analysis\n\n"
+
+
+def search_pipeline_stream(user_query: str, use_reranker: bool = False, use_tags: bool = True) -> Iterator[str]:
+    """
+    Streaming variant of `search_pipeline` yielding progressively longer markdown.
+
+    The first yield is the ranked product list (`format_report`) as soon as retrieval is
+    done; each following yield appends the LLM analysis received so far.
+
+    A cached response is yielded complete in one step; a fresh one is cached once the
+    analysis has streamed to the end.
+
+    Yields:
+        str: The full markdown to display at this point of the stream.
+    """
+    options = response_options(user_query, use_reranker, use_tags)
+    query_vector = embed_query(user_query)
+    cached = cached_response(user_query, query_vector, options)
+    if cached:
+        yield format_report(user_query, cached.hits) + ANALYSIS_HEADER + cached.report
+        return
+    docs = retrieve(user_query, use_reranker=use_reranker, use_tags=use_tags, query_vector=query_vector)
+    if not docs:
+        return
+    markdown = format_report(user_query, docs) + ANALYSIS_HEADER
+    yield markdown
+    analysis = ""
+    for delta in generate_summary_report_stream(user_query, docs):
+        analysis += delta
+        yield markdown + analysis
+    store_response(user_query, query_vector, options, docs, analysis)
+
+# === ASYNC END-TO-END PIPELINE ===
+_worker_pool: Optional[ThreadPoolExecutor] = None
+_worker_pool_lock = threading.Lock()
+
+
+def get_worker_pool() -> ThreadPoolExecutor:
+    """Thread pool (WORKER_THREADS) for the blocking stages of every async request."""
+    global _worker_pool
+    if _worker_pool is None:
+        with _worker_pool_lock:
+            if _worker_pool is None:
+                _worker_pool = ThreadPoolExecutor(max_workers=WORKER_THREADS, thread_name_prefix="smartfind")
+    return _worker_pool
+
+
+async def to_worker(func: Callable, *args, **kwargs):
+    """`asyncio.to_thread` on the shared worker pool: runs `func` with the caller's context (trace)."""
+    context = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(
+        get_worker_pool(), functools.partial(context.run, func, *args, **kwargs)
+    )
+
+
+async def run_stage(name: str, func: Callable, *args, timeout: float, **kwargs):
+    """
+    Run a blocking pipeline stage on the worker pool with a timeout.
+
+    On timeout the awaiting coroutine is cancelled and `asyncio.TimeoutError` raised; the
+    underlying HTTP call cannot be interrupted, so its thread finishes in the background
+    and the result is discarded.
+    """
+    start = time.perf_counter()
+    try:
+        return await asyncio.wait_for(to_worker(func, *args, **kwargs), timeout=timeout)
+    finally:
+        logger.info(f"⏱️ Stage '{name}' finished in {time.perf_counter() - start:.3f}s")
+
+
+async def search_pipeline_async(user_query: str, use_reranker: bool = False, use_tags: bool = True) -> str:
+    """
+    Async variant of `search_pipeline` that overlaps independent stages.
+
+    Tag extraction and query embedding run concurrently. A tagger that fails or exceeds
+    TAGS_TIMEOUT_S degrades to a search filtered only by the locally parsed price/rating
+    constraints, and a reranker that exceeds
+    RERANK_TIMEOUT_S keeps the vector ranking. Failures in embedding, search or report
+    generation propagate to the caller.
+
+    With the response cache enabled, tag extraction still starts alongside the embedding
+    and is cancelled when the cache answers.
+
+    Args:
+        user_query (str): The user's product search question.
+        use_reranker (bool): Whether to rerank vector search candidates (SMARTFIND_RERANKER).
+        use_tags (bool): Whether to extract metadata tags and apply filtering.
 
-    report = generate_summary_report(user_query, docs)
+    Returns:
+        str: Markdown-formatted ranked result report.
+    """
+    options, query_vector, cached, tags_task = await cached_response_async(user_query, use_reranker, use_tags)
+    if cached:
+        return cached.report
+    docs = await retrieve_async(user_query, use_reranker=use_reranker, use_tags=use_tags, query_vector=query_vector,
+                                tags_task=tags_task)
+    report = await run_stage("report", generate_summary_report, user_query, docs, timeout=REPORT_TIMEOUT_S)
+    if options is not None:
+        await to_worker(store_response, user_query, query_vector, options, docs, report)
     return report
 
+
+def start_tags_task(user_query: str) -> asyncio.Task:
+    return asyncio.create_task(run_stage("tags", analyze_query, user_query, timeout=TAGS_TIMEOUT_S))
+
+
+def discard_task(task: Optional[asyncio.Task]):
+    """Cancel a task nobody will await, without an unretrieved-exception warning if it already failed."""
+    if task is not None:
+        task.cancel()
+        task.add_done_callback(lambda done: done.cancelled() or done.exception())
+
+
+async def cached_response_async(user_query: str, use_reranker: bool, use_tags: bool) -> Tuple[
+        Optional[dict], Optional[List[float]], Optional[CachedResponse], Optional[asyncio.Task]]:
+    """
+    (options, query vector, cached response, running tags task) for the async pipelines;
+    all None when the response cache is disabled, leaving the fan-out to `retrieve_async`.
+
+    Tag extraction starts together with the embedding, so a cache miss keeps the two
+    concurrent; a hit (or a failed embedding) cancels it.
+    """
+    if get_response_cache(COLLECTION_NAME) is None:
+        return None, None, None, None
+    options = response_options(user_query, use_reranker, use_tags)
+    tags_task = start_tags_task(user_query) if use_tags else None
+    try:
+        query_vector = await run_stage("embedding", embed_query, user_query, timeout=EMBEDDING_TIMEOUT_S)
+        cached = await to_worker(cached_response, user_query, query_vector, options)
+    except BaseException:
+        discard_task(tags_task)
+        raise
+    if cached:
+        discard_task(tags_task)
+        tags_task = None
+    return options, query_vector, cached, tags_task
+
+
+async def retrieve_async(user_query: str, use_reranker: bool = False, use_tags: bool = True,
+                         query_vector: Optional[List[float]] = None,
+                         tags_task: Optional[asyncio.Task] = None) -> List[SearchHit]:
+    """
+    Async retrieval half of the pipeline with tagging and embedding fanned out concurrently.
+    `tags_task` is a tag extraction the caller already started (see `cached_response_async`).
+
+    Returns:
+        List[SearchHit]: Ranked hits (with `rerank_score` when reranked).
+    """
+    if use_tags and tags_task is None:
+        tags_task = start_tags_task(user_query)
+    embedding_task = None
+    if query_vector is None:
+        embedding_task = asyncio.create_task(run_stage("embedding", embed_query, user_query, timeout=EMBEDDING_TIMEOUT_S))
+
+    try:
+        if embedding_task:
+            query_vector = await embedding_task
+    except BaseException:
+        discard_task(tags_task)
+        raise
+
+    filter_obj = None
+    if tags_task:
+        try:
+            filter_obj = query_filter(await tags_task)
+        except (asyncio.TimeoutError, Exception) as e:
+            # The regex constraints are local and instant, so keep them even without tags
+            logger.warning(f"⚠️ Tag extraction unavailable ({type(e).__name__}: {e}); searching without tag filter")
+            filter_obj = query_filter({"tags": [], **parse_constraints(user_query)})
+    docs = await run_stage("search", semantic_search, user_query, filter_obj,
+                           top_k=RERANK_CANDIDATES if use_reranker else TOP_K,
+                           query_vector=query_vector, timeout=SEARCH_TIMEOUT_S)
+
+    if use_reranker:
+        try:
+            docs = await run_stage("rerank", rerank, user_query, docs, timeout=RERANK_TIMEOUT_S)
+        except asyncio.TimeoutError:
+            logger.warning(f"⚠️ Reranking exceeded {RERANK_TIMEOUT_S}s; keeping vector ranking")
+            docs = docs[:TOP_K]
+    return docs
+
+
+async def search_pipeline_stream_async(user_query: str, use_reranker: bool = False,
+                                       use_tags: bool = True) -> AsyncIterator[str]:
+    """
+    Async generator combining `retrieve_async` with a streamed LLM analysis, for UIs
+    that await partial results. Yields the same progressively longer markdown as
+    `search_pipeline_stream`; the analysis stops at REPORT_TIMEOUT_S, and only analyses
+    that complete in time are cached.
+    """
+    options, query_vector, cached, tags_task = await cached_response_async(user_query, use_reranker, use_tags)
+    if cached:
+        yield format_report(user_query, cached.hits) + ANALYSIS_HEADER + cached.report
+        return
+    docs = await retrieve_async(user_query, use_reranker=use_reranker, use_tags=use_tags, query_vector=query_vector,
+                                tags_task=tags_task)
+    if not docs:
+        return
+    markdown = format_report(user_query, docs) + ANALYSIS_HEADER
+    yield markdown
+    analysis = ""
+
+    deltas = generate_summary_report_stream(user_query, docs)
+    deadline = time.perf_counter() + REPORT_TIMEOUT_S
+    while True:
+        remaining = deadline - time.perf_counter()
+        try:
+            delta = await asyncio.wait_for(to_worker(next, deltas, None), timeout=max(remaining, 0.001))
+        except asyncio.TimeoutError:
+            logger.warning(f"⚠️ Report stream exceeded {REPORT_TIMEOUT_S}s; returning partial analysis")
+            yield markdown + analysis + "\n\n_⚠️ Analysis truncated (timed out)._"
+            return
+        if delta is None:
+            if options is not None:
+                await to_worker(store_response, user_query, query_vector, options, docs, analysis)
+            return
+        analysis += delta
+        yield markdown + analysis
+
+# === WARM-UP ===
+def warm_up(query: Optional[str] = WARM_UP_QUERY) -> Dict[str, Optional[float]]:
+    """
+    Do the first-request work ahead of serving: import the OpenAI SDK, open the Qdrant
+    client and read the collection layout, load the BM25 and tag vocabularies, open the
+    embedding and response caches, load the tokenizer and build the reranker client.
+    With `query`, also runs one retrieval so HTTP connections to the APIs are open.
+
+    Nothing here is required: clients and caches are otherwise created on first use. A
+    failing step is logged and reported as None, so a cold dependency never blocks startup.
+
+    Returns:
+        Dict[str, Optional[float]]: Seconds per step (None if it failed).
+    """
+    steps = [
+        ("openai", get_openai),
+        ("vector_store", lambda: get_vector_store(collection=COLLECTION_NAME).warm_up()),
+        ("tag_vocabulary", get_vocabulary),
+        ("embedding_cache", get_embedding_cache),
+        ("response_cache", lambda: get_response_cache(COLLECTION_NAME)),
+        ("tokenizer", lambda: count_tokens("warm up")),
+        ("reranker", lambda: getattr(get_reranker(), "client", None)),   # API rerankers build their client lazily
+    ]
+    if query:
+        steps.append(("retrieve", lambda: retrieve(query, use_reranker=True)))
+
+    timings: Dict[str, Optional[float]] = {}
+    start = time.perf_counter()
+    for name, step in steps:
+        step_start = time.perf_counter()
+        try:
+            step()
+            timings[name] = round(time.perf_counter() - step_start, 4)
+        except Exception as e:
+            logger.warning(f"⚠️ Warm-up step '{name}' failed: {type(e).__name__}: {e}")
+            timings[name] = None
+    logger.info(f"🔥 Warm-up finished in {time.perf_counter() - start:.2f}s: {timings}")
+    return timings
+
 # === CLI TEST ===
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
     q = "Find LEGO sets under $50 for kids aged 5–7"
     print("\n--- With Tag Filtering ---\n")
     print(search_pipeline(q, use_reranker=True, use_tags=True))
@@ -0,0 +1,274 @@
+# core/serving.py
+"""
+Headless HTTP/JSON search endpoint with admission control, for API clients and load
+tests without the Gradio UI:
+
+    POST /search   {"query": "...", "use_tags": true, "use_reranker": true, "report": true}
+                   -> {"query", "results": [SearchHit dicts], "report", "trace"}
+    GET  /health   -> Qdrant health check and admission counters
+    GET  /metrics  -> Prometheus text (see utils.tracing)
+
+At most MAX_CONCURRENT searches run at once; up to QUEUE_SIZE further requests wait
+for a slot, each for at most QUEUE_TIMEOUT_S. The limit is per process and shared with
+the Gradio UI (`get_admission_controller`). Anything beyond that is shed at once with
+503 and a Retry-After header, so overload shows up as fast rejections rather than
+ever-growing latency. Outgoing OpenAI/Cohere calls are paced separately by the shared
+rate limiter (utils.rate_limit).
+
+    python -m core.serving --port 8080 --concurrency 8 --queue-size 32
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+
+from contextlib import asynccontextmanager, contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import AsyncIterator, Iterator, Optional
+
+from core.search_pipeline import COLLECTION_NAME, search_pipeline_results, warm_up
+from utils.tracing import REGISTRY, count, record, render_prometheus, trace
+from utils.vector_store import check_qdrant_health
+
+logger = logging.getLogger("serving")
+
+# === CONFIG ===
+HTTP_PORT = int(os.getenv("SMARTFIND_HTTP_PORT", "0"))           # gradio_app also serves the JSON API here (0 = off)
+MAX_CONCURRENT = int(os.getenv("SMARTFIND_CONCURRENCY", "8"))    # searches running at once, UI and API together
+QUEUE_SIZE = int(os.getenv("SMARTFIND_QUEUE_SIZE", "32"))        # requests waiting for a slot before shedding
+QUEUE_TIMEOUT_S = float(os.getenv("SMARTFIND_QUEUE_TIMEOUT_S", "10"))
+RETRY_AFTER_S = 2                  # suggested to shed clients
+MAX_BODY_BYTES = 16 * 1024
+MAX_QUERY_CHARS = 500
+LISTEN_BACKLOG = 128
+
+
+class Overloaded(RuntimeError):
+    """The request was shed: every slot is busy and the queue is full or the wait timed out."""
+
+
+# === Admission Control ===
+class AdmissionController:
+    """
+    Bounded concurrency with a bounded, time-limited wait queue (thread-safe).
+
+    `slot()` admits a request when fewer than `max_concurrent` are running, otherwise
+    queues it (FIFO is not guaranteed) for up to `queue_timeout_s`; it raises `Overloaded`
+    when `queue_size` requests are already waiting or the wait times out. `slot_async()`
+    does the same for coroutines, waiting in a thread. Queue waits are observed as the
+    `queue` stage in the latency histograms.
+    """
+
+    def __init__(self, max_concurrent: int = MAX_CONCURRENT, queue_size: int = QUEUE_SIZE,
+                 queue_timeout_s: float = QUEUE_TIMEOUT_S):
+        self.max_concurrent = max_concurrent
+        self.queue_size = queue_size
+        self.queue_timeout_s = queue_timeout_s
+        self.running = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.shed = 0
+        self._cond = threading.Condition()
+
+    def _shed(self, reason: str):
+        self.shed += 1
+        count("serving.shed")
+        raise Overloaded(reason)
+
+    def acquire(self):
+        """Take a slot, waiting as described above; pair with `release()`."""
+        start = time.perf_counter()
+        with self._cond:
+            if self.running >= self.max_concurrent:
+                if self.waiting >= self.queue_size:
+                    self._shed(f"{self.running} running and {self.waiting} queued")
+                self.waiting += 1
+                deadline = time.monotonic() + self.queue_timeout_s
+                try:
+                    while self.running >= self.max_concurrent:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self._shed(f"no slot within {self.queue_timeout_s}s")
+                        self._cond.wait(remaining)
+                finally:
+                    self.waiting -= 1
+            self.running += 1
+            self.admitted += 1
+        record("queue", start, time.perf_counter() - start)
+
+    def release(self):
+        with self._cond:
+            self.running -= 1
+            self._cond.notify()
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    @asynccontextmanager
+    async def slot_async(self) -> AsyncIterator[None]:
+        acquired = asyncio.get_running_loop().run_in_executor(None, self.acquire)
+        try:
+            await asyncio.shield(acquired)
+        except asyncio.CancelledError:
+            # The waiting thread cannot be interrupted: give its slot back once it gets one
+            acquired.add_done_callback(lambda done: done.cancelled() or done.exception() or self.release())
+            raise
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {"running": self.running, "waiting": self.waiting, "admitted": self.admitted, "shed": self.shed}
+
+
+_admission: Optional[AdmissionController] = None
+_admission_lock = threading.Lock()
+
+
+def get_admission_controller() -> AdmissionController:
+    """Process-wide controller shared by the JSON API and the Gradio UI, so both draw on one MAX_CONCURRENT budget."""
+    global _admission
+    if _admission is None:
+        with _admission_lock:
+            if _admission is None:
+                _admission = AdmissionController()
+                REGISTRY.register_collector("admission", _admission.stats)
+    return _admission
+
+
+# === Search API ===
+def parse_search_request(body: dict) -> dict:
+    """Validated `search_pipeline_results` arguments from a JSON request body (ValueError if invalid)."""
+    if not isinstance(body, dict):
+        raise ValueError("request body must be a JSON object")
+    query = body.get("query")
+    if not isinstance(query, str) or not query.strip():
+        raise ValueError("'query' must be a non-empty string")
+    if len(query) > MAX_QUERY_CHARS:
+        raise ValueError(f"'query' is longer than {MAX_QUERY_CHARS} characters")
+    options = {"use_tags": True, "use_reranker": True, "report": True}
+    for key, default in options.items():
+        value = body.get(key, default)
+        if not isinstance(value, bool):
+            raise ValueError(f"'{key}' must be a boolean")
+        options[key] = value
+    return {"user_query": query.strip(), **options}
+
+
+def search_json(body: dict) -> dict:
+    """Run one search request and return the JSON response (hits, report and the request trace)."""
+    request = parse_search_request(body)
+    with trace("http_search") as request_trace:
+        hits, report = search_pipeline_results(**request)
+    return {
+        "query": request["user_query"],
+        "results": [hit.to_dict() for hit in hits],
+        "report": report,
+        "trace": request_trace.to_dict(),
+    }
+
+
+class SearchRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"    # keep-alive for load generators
+    admission: AdmissionController   # set by `serve_http`
+
+    def _send(self, status: int, body, content_type: str = "application/json", headers: Optional[dict] = None):
+        data = body.encode("utf-8") if isinstance(body, str) else json.dumps(body, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0]
+        if path == "/health":
+            health = check_qdrant_health(collection=COLLECTION_NAME)
+            self._send(200 if health["ok"] else 503, {**health, "admission": self.admission.stats()})
+        elif path == "/metrics":
+            self._send(200, render_prometheus(), "text/plain; version=0.0.4; charset=utf-8")
+        else:
+            self._send(404, {"error": "not found"})
+
+    def do_POST(self):
+        if self.path.split("?", 1)[0] != "/search":
+            self._send(404, {"error": "not found"})
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY_BYTES:
+            self.close_connection = True    # the unread body cannot be skipped on a kept-alive connection
+            self._send(413, {"error": f"body larger than {MAX_BODY_BYTES} bytes"})
+            return
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+            parse_search_request(body)
+        except ValueError as e:   # includes JSONDecodeError
+            self._send(400, {"error": str(e)})
+            return
+        try:
+            with self.admission.slot():
+                response = search_json(body)
+        except Overloaded as e:
+            self._send(503, {"error": f"overloaded: {e}"}, headers={"Retry-After": str(RETRY_AFTER_S)})
+        except Exception as e:
+            logger.exception("Search request failed")
+            self._send(500, {"error": f"{type(e).__name__}: {e}"})
+        else:
+            self._send(200, response)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class SearchServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = LISTEN_BACKLOG
+
+
+def serve_http(port: int = HTTP_PORT, host: str = "0.0.0.0", admission: Optional[AdmissionController] = None,
+               block: bool = False) -> SearchServer:
+    """
+    Serve the JSON API, one thread per connection, with searches admitted by `admission`
+    (default: the process-wide controller). Runs in a daemon thread unless `block` is set.
+    """
+    admission = admission or get_admission_controller()
+    handler = type("BoundSearchRequestHandler", (SearchRequestHandler,), {"admission": admission})
+    server = SearchServer((host, port), handler)
+    if admission is not _admission:
+        REGISTRY.register_collector("admission", admission.stats)
+    logger.info(f"🌐 Serving search API on http://{host}:{server.server_port}/search "
+                f"({admission.max_concurrent} concurrent, queue {admission.queue_size})")
+    if block:
+        server.serve_forever()
+    else:
+        threading.Thread(target=server.serve_forever, name="search-api", daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=HTTP_PORT or 8080)
+    parser.add_argument("--concurrency", type=int, default=MAX_CONCURRENT)
+    parser.add_argument("--queue-size", type=int, default=QUEUE_SIZE)
+    parser.add_argument("--queue-timeout", type=float, default=QUEUE_TIMEOUT_S)
+    parser.add_argument("--no-warm-up", action="store_true")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    if not args.no_warm_up:
+        warm_up()
+    serve_http(args.port, args.host, AdmissionController(args.concurrency, args.queue_size, args.queue_timeout),
+               block=True)
@@ -1,17 +1,33 @@
+import logging
+
 import gradio as gr
-from core.search_pipeline import search_pipeline
+from core.search_pipeline import WARM_UP, search_pipeline_stream_async, warm_up
+from core.serving import HTTP_PORT, MAX_CONCURRENT, QUEUE_SIZE, Overloaded, get_admission_controller, serve_http
+from utils.index_artifact import INDEX_ARTIFACT, import_artifact
+from utils.tracing import METRICS_PORT, serve_metrics
 
 # === MAIN FUNCTION ===
-def run_search(query, use_tags):
+async def run_search(query, use_tags):
     try:
-        markdown_response = search_pipeline(query, use_reranker=True, use_tags=use_tags)
+        markdown_response = ""
+        async with get_admission_controller().slot_async():
+            async for markdown_response in search_pipeline_stream_async(query, use_reranker=True, use_tags=use_tags):
+                yield markdown_response
 
         if not markdown_response or len(markdown_response.strip()) < 10:
-            return "⚠️ No results found. Try refining your query."
-
-        return markdown_response
+            yield "⚠️ No results found. Try refining your query."
+    except Overloaded:
+        yield "⏳ Too many searches are running right now. Please try again in a few seconds."
     except Exception as e:
-        return f"❌ Search failed: {e}"
+        yield f"❌ Search failed: {e}"
+
+async def run_smartfind_search(query):
+    async for markdown in run_search(query, use_tags=True):
+        yield markdown
+
+async def run_semantic_search(query):
+    async for markdown in run_search(query, use_tags=False):
+        yield markdown
 
 # === UI COMPONENTS ===
 with gr.Blocks(title="SmartFind AI") as demo:
@@ -36,14 +52,37 @@ with gr.Blocks(title="SmartFind AI") as demo:
             query_input_smart = gr.Textbox(label="Your Query", placeholder="e.g., LEGO sets under $50 for kids aged 5–7")
             run_btn_smart = gr.Button("Run SmartFind Search")
             output_smart = gr.Markdown(label="Search Results")
-            run_btn_smart.click(fn=lambda q: run_search(q, use_tags=True), inputs=query_input_smart, outputs=output_smart)
+            run_btn_smart.click(fn=run_smartfind_search, inputs=query_input_smart, outputs=output_smart)
 
         with gr.TabItem("🧠 Pure Semantic (no Tags)"):
             query_input_semantic = gr.Textbox(label="Your Query", placeholder="e.g., LEGO sets under $50 for kids aged 5–7")
             run_btn_semantic = gr.Button("Run Semantic Search")
             output_semantic = gr.Markdown(label="Search Results")
-            run_btn_semantic.click(fn=lambda q: run_search(q, use_tags=False), inputs=query_input_semantic, outputs=output_semantic)
+            run_btn_semantic.click(fn=run_semantic_search, inputs=query_input_semantic, outputs=output_semantic)
+
+# Searches take a slot from the admission controller shared with the JSON API, so UI and API
+# together run at most MAX_CONCURRENT; beyond QUEUE_SIZE waiting users, new requests are rejected
+demo.queue(default_concurrency_limit=MAX_CONCURRENT, max_size=QUEUE_SIZE)
 
 # === LAUNCH ===
-if __name__ == "__main__":
+def launch():
+    """
+    Serve the UI after preloading clients and caches (SMARTFIND_WARM_UP=0 to skip), plus
+    the headless JSON API when SMARTFIND_HTTP_PORT is set. With SMARTFIND_INDEX_ARTIFACT,
+    that prebuilt index is imported first (a no-op when it is already live). Neither server
+    accepts queries before the import and warm-up have finished.
+    """
+    logging.basicConfig(level=logging.INFO)
+    if METRICS_PORT:
+        serve_metrics(METRICS_PORT)
+    if INDEX_ARTIFACT:
+        import_artifact(INDEX_ARTIFACT)
+    if WARM_UP:
+        warm_up()
+    if HTTP_PORT:
+        serve_http(HTTP_PORT)
     demo.launch(server_name="0.0.0.0", server_port=7860, share=False)
+
+
+if __name__ == "__main__":
+    launch()
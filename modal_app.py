@@ -12,4 +12,4 @@ secrets = modal.Secret.from_dotenv()
 @modal.web_server(port=7860)
 def run():
     import gradio_app
-    gradio_app.demo.launch(server_name="0.0.0.0", server_port=7860, share=False)
+    gradio_app.launch()
@@ -0,0 +1,35 @@
+import pytest
+
+from benchmarks.api_fixtures import stub_chat, stub_embedding
+from core.feature_extraction_pipeline import run_feature_extraction
+from core.ingest_pipeline import run_ingest
+
+CATALOG_PATH = "./benchmarks/fixtures/catalog.csv"
+COLLECTION = "ecommerce-products"
+
+
+def embed(texts, model="text-embedding-3-small"):
+    return [stub_embedding(text) for text in texts]
+
+
+def chat(model, system_prompt, user_input, temperature=0.3):
+    return stub_chat(system_prompt, user_input)
+
+
+@pytest.fixture(scope="session")
+def ingest():
+    """`run_ingest` into `client` with stubbed OpenAI calls and every sidecar file under `workdir`."""
+    def run(client, rag_path, workdir, **kwargs):
+        return run_ingest(rag_path, COLLECTION, client=client, embed_fn=embed, chat_fn=chat,
+                          manifest_path=str(workdir / "manifest.sqlite"),
+                          vocabulary_path=str(workdir / "bm25_vocabulary.json"),
+                          tag_anchors_path=str(workdir / "tag_anchors.npz"), **kwargs)
+    return run
+
+
+@pytest.fixture(scope="session")
+def rag_path(tmp_path_factory):
+    """RAG dataset built from the fixture catalog."""
+    path = str(tmp_path_factory.mktemp("rag") / "rag_docs.parquet")
+    run_feature_extraction(CATALOG_PATH, path)
+    return path
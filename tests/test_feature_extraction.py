@@ -0,0 +1,23 @@
+import os
+import pytest
+
+import core.feature_extraction_pipeline as feature_extraction
+
+CATALOG_PATH = "./benchmarks/fixtures/catalog.csv"
+
+
+def test_failed_run_keeps_previous_output(tmp_path, monkeypatch):
+    output_path = str(tmp_path / "rag_docs.parquet")
+    stats = feature_extraction.run_feature_extraction(CATALOG_PATH, output_path, max_workers=1)
+    size = os.path.getsize(output_path)
+
+    def failing_prepare(chunk):
+        raise RuntimeError("chunk failed")
+
+    monkeypatch.setattr(feature_extraction, "prepare_chunk", failing_prepare)
+    with pytest.raises(RuntimeError):
+        feature_extraction.run_feature_extraction(CATALOG_PATH, output_path, max_workers=1)
+
+    assert os.path.getsize(output_path) == size
+    assert os.listdir(tmp_path) == ["rag_docs.parquet"]
+    assert len(feature_extraction.read_rag_dataset(output_path)) == stats["rows_out"]
@@ -0,0 +1,37 @@
+import pytest
+
+from qdrant_client import QdrantClient
+
+from utils.index_artifact import export_artifact, import_artifact
+from utils.vector_store import collection_aliases, sections_collection_name
+
+COLLECTION = "ecommerce-products"
+
+
+@pytest.fixture(scope="module")
+def artifact(tmp_path_factory, ingest, rag_path):
+    """Artifact exported from a fresh ingest of the fixture catalog."""
+    workdir = tmp_path_factory.mktemp("source")
+    client = QdrantClient(":memory:")
+    ingest(client, rag_path, workdir)
+    path = str(workdir / "artifact")
+    manifest = export_artifact(path, COLLECTION, client, manifest_path=str(workdir / "manifest.sqlite"),
+                               vocabulary_path=str(workdir / "bm25_vocabulary.json"))
+    return path, manifest
+
+
+def test_incremental_ingest_after_import_writes_through_alias(artifact, ingest, rag_path, tmp_path):
+    path, manifest = artifact
+    client = QdrantClient(":memory:")
+    import_artifact(path, COLLECTION, client=client, manifest_path=str(tmp_path / "manifest.sqlite"),
+                    vocabulary_path=str(tmp_path / "bm25_vocabulary.json"))
+    target = f"{COLLECTION}-{manifest['artifact_id']}"
+    products = manifest["parts"]["products"]["points"]
+
+    stats = ingest(client, rag_path, tmp_path, incremental=True)
+
+    names = {collection.name for collection in client.get_collections().collections}
+    assert COLLECTION not in names and sections_collection_name(COLLECTION) not in names
+    assert collection_aliases(client)[COLLECTION] == target
+    assert stats["skipped"] == products and stats["docs"] == 0
+    assert client.count(collection_name=COLLECTION).count == products
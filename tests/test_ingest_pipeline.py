@@ -0,0 +1,35 @@
+import pandas as pd
+
+from qdrant_client import QdrantClient
+
+from core.feature_extraction_pipeline import read_rag_dataset
+from core.ingest_pipeline import point_id
+from utils.sparse_encoder import SPARSE_VECTOR_NAME, BM25Encoder
+
+COLLECTION = "ecommerce-products"
+
+
+def test_incremental_run_keeps_bm25_length_normalization(ingest, rag_path, tmp_path):
+    client = QdrantClient(":memory:")
+    ingest(client, rag_path, tmp_path, sections=False)
+    vocabulary_path = str(tmp_path / "bm25_vocabulary.json")
+    avg_doc_len = BM25Encoder.load(vocabulary_path).avg_doc_len
+
+    # New, much longer listings would shift the average document length
+    df = read_rag_dataset(rag_path)
+    added = df.head(5).assign(
+        uniq_id=[f"new-{i}" for i in range(5)],
+        rag_document=df.head(5)["rag_document"] + " extra spec detail" * 200,
+    )
+    grown_path = str(tmp_path / "rag_grown.parquet")
+    pd.concat([df, added]).to_parquet(grown_path, index=False)
+
+    stats = ingest(client, grown_path, tmp_path, incremental=True, sections=False)
+    encoder = BM25Encoder.load(vocabulary_path)
+
+    assert stats["skipped"] == len(df) and stats["docs"] == len(added)
+    assert encoder.avg_doc_len == avg_doc_len
+    assert encoder.n_docs == len(df) + len(added)
+    row = df.iloc[0].to_dict()
+    stored = client.retrieve(COLLECTION, [point_id(row)], with_vectors=[SPARSE_VECTOR_NAME])[0]
+    assert stored.vector[SPARSE_VECTOR_NAME] == encoder.encode_document(row["rag_document"])
@@ -0,0 +1,50 @@
+import pytest
+
+from core.query_understanding import TagVocabulary, canonical_tag, parse_constraints, tokenize
+
+
+@pytest.mark.parametrize("query, age_range", [
+    ("Find LEGO sets under $50 for kids aged 5–7", (5, 7)),
+    ("gifts for ages 8-12", (8, 12)),
+    ("toys for 5-7 year olds", (5, 7)),
+    ("toys 5-7", (5, 7)),
+    ("Show toys for 8-year-olds rated above 4.5 stars", (8, 8)),
+    ("toys for 3+", (3, None)),
+    ("science kits for ages 14+", (14, None)),
+    ("toys for 6-12 months", (0, 1)),
+])
+def test_age_range(query, age_range):
+    assert parse_constraints(query)["age_range"] == age_range
+
+
+@pytest.mark.parametrize("query", [
+    "puzzles 500-1000 pieces",
+    "games for 2 to 4 players",
+    "dolls 10-12 inches",
+    "1000+ piece puzzle",
+])
+def test_counts_are_not_ages(query):
+    assert parse_constraints(query)["age_range"] is None
+
+
+def test_star_rating_is_not_an_age():
+    constraints = parse_constraints("Find STEM kits for 3-year-olds with 4+ star reviews")
+    assert constraints["min_rating"] == 4.0 and constraints["age_range"] == (3, 3)
+
+
+@pytest.mark.parametrize("tag, expected", [
+    ("5 - 7 Years", "5-7"),
+    ("Ages 3+", "3+"),
+    ("  STEM. ", "stem"),
+    ("Building  Blocks", "building blocks"),
+    (None, ""),
+])
+def test_canonical_tag(tag, expected):
+    assert canonical_tag(tag) == expected
+
+
+def test_vocabulary_prefers_longest_match_and_singular_fallback():
+    vocabulary = TagVocabulary(["Building", "Building Blocks", "Puzzle", "STEM"])
+    assert vocabulary.match(tokenize("stem building blocks and puzzles")) == ["stem", "building blocks", "puzzle"]
+    assert vocabulary.match(tokenize("building a robot")) == ["building"]
+    assert "Building Blocks" in vocabulary and "robot" not in vocabulary
@@ -0,0 +1,41 @@
+import pytest
+
+from core.query_understanding import parse_constraints
+from core.search_pipeline import build_metadata_filter
+
+
+def price_condition(query: str):
+    constraints = parse_constraints(query)
+    metadata_filter = build_metadata_filter([], constraints)
+    return next((condition.range for condition in metadata_filter.must or [] if condition.key == "price"), None)
+
+
+@pytest.mark.parametrize("query, low, high", [
+    ("Find LEGO sets under $50 for kids aged 5-7", None, 50.0),
+    ("STEM kits for kids between $30 and $60", 30.0, 60.0),
+    ("board games over £20", 20.0, None),
+    ("lego under 30 dollars", None, 30.0),
+    ("price under 40 for a puzzle", None, 40.0),
+    ("toys for a budget of up to 25", None, 25.0),
+])
+def test_price_bounds_with_currency_or_price_word(query, low, high):
+    price = price_condition(query)
+    assert (price.gte, price.lte) == (low, high)
+
+
+@pytest.mark.parametrize("query", [
+    "toys for kids under 5",
+    "gifts for toddlers under 3",
+    "dolls up to 12 inches",
+    "toys for kids between 5 and 7",
+    "puzzle within 2 days",
+])
+def test_bare_numbers_are_not_prices(query):
+    assert price_condition(query) is None
+
+
+def test_rating_and_tags_without_price():
+    metadata_filter = build_metadata_filter(["STEM", "3+"], parse_constraints("STEM kits with 4+ star reviews"))
+    assert [condition.match.value for condition in metadata_filter.should] == ["stem", "3+"]
+    assert [condition.key for condition in metadata_filter.must] == ["rating"]
+    assert metadata_filter.must[0].range.gte == 4.0
@@ -0,0 +1,55 @@
+import asyncio
+import time
+
+import pytest
+
+from core.serving import AdmissionController, Overloaded
+
+
+def wait_for(condition, timeout_s=2.0):
+    deadline = time.monotonic() + timeout_s
+    while not condition():
+        assert time.monotonic() < deadline, "condition not reached"
+        time.sleep(0.01)
+
+
+def test_sheds_when_queue_is_full():
+    controller = AdmissionController(max_concurrent=1, queue_size=0, queue_timeout_s=1.0)
+    with controller.slot():
+        with pytest.raises(Overloaded):
+            controller.acquire()
+    assert controller.stats()["shed"] == 1 and controller.running == 0
+
+
+def test_sheds_after_queue_timeout():
+    controller = AdmissionController(max_concurrent=1, queue_size=1, queue_timeout_s=0.05)
+    with controller.slot():
+        start = time.monotonic()
+        with pytest.raises(Overloaded):
+            controller.acquire()
+        assert time.monotonic() - start >= 0.05
+    assert controller.waiting == 0 and controller.stats()["shed"] == 1
+    with controller.slot():
+        assert controller.running == 1
+
+
+def test_cancelled_async_waiter_gives_its_slot_back():
+    controller = AdmissionController(max_concurrent=1, queue_size=1, queue_timeout_s=2.0)
+
+    async def scenario():
+        async def waiter():
+            async with controller.slot_async():
+                pytest.fail("cancelled waiter must not run")
+
+        controller.acquire()
+        task = asyncio.create_task(waiter())
+        while controller.waiting == 0:
+            await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        controller.release()
+        await asyncio.get_running_loop().run_in_executor(None, wait_for, lambda: controller.running == 0)
+
+    asyncio.run(scenario())
+    assert controller.admitted == 2 and controller.running == 0 and controller.waiting == 0
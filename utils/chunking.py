@@ -0,0 +1,123 @@
+import re
+
+from functools import lru_cache
+from typing import List, NamedTuple
+
+# === CONFIG ===
+WORDS_PER_TOKEN = 0.75         # rough English ratio used to budget without a tokenizer
+TOKENIZER_ENCODING = "o200k_base"     # gpt-4.1 family; used when tiktoken is installed
+EMBEDDING_ENCODING = "cl100k_base"    # text-embedding-3-*; their 8191-token input limit is counted in it
+# Without tiktoken, hard limits also cap characters: spec tables, SKUs and numbers can run
+# at about 2 characters per token, far more tokens than WORDS_PER_TOKEN predicts.
+FALLBACK_CHARS_PER_TOKEN = 2.0
+SECTION_MAX_TOKENS = 256       # per-embedding budget for one section chunk
+SECTION_OVERLAP_TOKENS = 32    # words repeated between consecutive windows of a long section
+MAX_CHUNKS_PER_SECTION = 4     # caps embedding cost for very long descriptions/reviews
+
+# rag_document headings (see feature_extraction_pipeline.build_rag_documents) -> section name
+SECTION_HEADINGS = {
+    "product name": "title",
+    "description": "description",
+    "product information": "specs",
+}
+HEADING_PATTERN = re.compile(r"^###\s+(.+?)\s*$", re.MULTILINE)
+
+
+class Section(NamedTuple):
+    section: str     # title | description | specs | reviews
+    index: int       # window number within the section
+    text: str
+
+
+@lru_cache(maxsize=4)
+def _tokenizer(encoding: str = TOKENIZER_ENCODING):
+    try:
+        import tiktoken
+        return tiktoken.get_encoding(encoding)
+    except Exception:      # not installed, or the encoding cannot be downloaded
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """Exact token count with tiktoken when available, else the WORDS_PER_TOKEN estimate."""
+    tokenizer = _tokenizer()
+    if tokenizer is not None:
+        return len(tokenizer.encode(str(text), disallowed_special=()))
+    return int(len(str(text).split()) / WORDS_PER_TOKEN + 0.5)
+
+
+def truncate_tokens(text: str, max_tokens: int, encoding: str = TOKENIZER_ENCODING, strict: bool = False) -> str:
+    """
+    Cut a document to at most `max_tokens` tokens of `encoding` on a word boundary.
+
+    Exact with tiktoken. Without it the WORDS_PER_TOKEN estimate is used; with `strict`
+    (hard model limits such as the embedding input cap) the text is also cut to
+    FALLBACK_CHARS_PER_TOKEN characters per token, so dense text cannot overshoot.
+    """
+    text = str(text)
+    tokenizer = _tokenizer(encoding)
+    if tokenizer is not None:
+        tokens = tokenizer.encode(text, disallowed_special=())
+        if len(tokens) <= max_tokens:
+            return text
+        cut = tokenizer.decode(tokens[:max_tokens])
+        return cut.rpartition(" ")[0] or cut     # drop the word cut in half
+    words = text.split()
+    max_words = int(max_tokens * WORDS_PER_TOKEN)
+    max_chars = int(max_tokens * FALLBACK_CHARS_PER_TOKEN) if strict else len(text)
+    if len(words) <= max_words and len(text) <= max_chars:
+        return text
+    cut = " ".join(words[:max_words])
+    if len(cut) > max_chars:
+        cut = cut[:max_chars + 1].rpartition(" ")[0] or cut[:max_chars]
+    return cut
+
+
+def token_windows(text: str, max_tokens: int = SECTION_MAX_TOKENS, overlap_tokens: int = SECTION_OVERLAP_TOKENS,
+                  max_windows: int = MAX_CHUNKS_PER_SECTION) -> List[str]:
+    """Split text into at most `max_windows` overlapping word windows of roughly `max_tokens` tokens."""
+    words = str(text).split()
+    size = max(1, int(max_tokens * WORDS_PER_TOKEN))
+    step = max(1, size - int(overlap_tokens * WORDS_PER_TOKEN))
+    windows = []
+    for start in range(0, len(words), step):
+        windows.append(" ".join(words[start:start + size]))
+        if start + size >= len(words) or len(windows) == max_windows:
+            break
+    return windows
+
+
+def parse_sections(doc: str) -> List[tuple]:
+    """(section, body) pairs from a markdown RAG document, in document order."""
+    matches = list(HEADING_PATTERN.finditer(doc))
+    sections = []
+    for i, match in enumerate(matches):
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(doc)
+        body = doc[match.end():end].strip()
+        if body:
+            sections.append((SECTION_HEADINGS.get(match.group(1).lower(), "other"), body))
+    if not matches and doc.strip():
+        sections.append(("description", doc.strip()))
+    return sections
+
+
+def split_sections(doc: str, reviews: str = "", product_name: str = "") -> List[Section]:
+    """
+    Split a product into independently embedded chunks: its title, description, specs
+    and customer reviews, each cut into bounded token windows.
+
+    Non-title chunks are prefixed with the product name so every embedding knows which
+    product it describes.
+    """
+    parsed = parse_sections(doc)
+    name = product_name or next((body for section, body in parsed if section == "title"), "")
+    if str(reviews).strip():
+        parsed.append(("reviews", str(reviews).strip()))
+
+    chunks, counts = [], {}
+    for section, body in parsed:
+        prefix = "" if section == "title" or not name else f"{name}\n"
+        for window in token_windows(body):
+            chunks.append(Section(section, counts.get(section, 0), prefix + window))
+            counts[section] = counts.get(section, 0) + 1
+    return chunks
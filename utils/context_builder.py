@@ -0,0 +1,199 @@
+import logging
+import math
+import os
+import re
+import numpy as np
+
+from collections import Counter
+from typing import Dict, List, Sequence, Tuple
+
+from utils.chunking import count_tokens, truncate_tokens
+from utils.sparse_encoder import BM25_B, BM25_K1, get_bm25_encoder, tokenize
+from utils.vector_store import SearchHit
+
+logger = logging.getLogger("context_builder")
+
+# === CONFIG ===
+CONTEXT_MAX_TOKENS = int(os.getenv("SMARTFIND_REPORT_CONTEXT_TOKENS", "2000"))   # all products together
+PRODUCT_MIN_TOKENS = 120         # floor per product when many products share the budget
+DESCRIPTION_SHARE = 0.6          # of a product's budget after its header; reviews get the rest
+MAX_REVIEWS_PER_PRODUCT = 4
+MAX_REVIEW_CANDIDATES = 20       # reviews per product scored before selection
+DUPLICATE_SIMILARITY = 0.8       # TF-IDF cosine above which two reviews count as the same opinion
+DUPLICATE_OVERLAP = 0.8          # word-set Jaccard above which two reviews count as copies
+MIN_UNIT_TOKENS = 4              # shorter fragments ("Great!", "5.0") carry no evidence
+
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9\"'(])|\n+")
+REVIEW_SEPARATOR = re.compile(r"\s+\|\s+")
+
+
+def split_sentences(text: str) -> List[str]:
+    """Sentences and lines of a product summary, markdown headings dropped."""
+    sentences = []
+    for part in SENTENCE_BOUNDARY.split(str(text or "")):
+        part = " ".join(part.split())
+        if part and not part.startswith("#"):
+            sentences.append(part)
+    return sentences
+
+
+def split_reviews(text: str) -> List[str]:
+    """
+    Individual reviews from the `customer_reviews` field, where reviews are separated by
+    ' | ' and each is 'title // rating // date // author // text'; kept as 'title: text'.
+    """
+    reviews = []
+    for part in REVIEW_SEPARATOR.split(str(text or "").strip()):
+        fields = [" ".join(field.split()) for field in part.split("//")]
+        fields = [field for field in fields if field]
+        if not fields:
+            continue
+        review = f"{fields[0]}: {fields[-1]}" if len(fields) >= 4 else " ".join(fields)
+        reviews.append(review.rstrip(" …"))
+    return reviews
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+
+def _terms(text: str) -> List[str]:
+    """BM25 tokens with plurals folded ("kids" matches "kid")."""
+    return [token[:-1] if len(token) > 3 and token.endswith("s") and not token.endswith("ss") else token
+            for token in tokenize(text)]
+
+
+def score_units(query: str, units: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    BM25 relevance of each unit to the query, plus L2-normalized TF-IDF vectors of the
+    units for near-duplicate detection. IDF comes from the catalog's BM25 vocabulary
+    when ingest built one (terms it lacks, and every term without one, fall back to the
+    IDF over `units`), so scoring is local and costs no API call.
+    """
+    unit_terms = [_terms(unit) for unit in units]
+    vocabulary: Dict[str, int] = {}
+    for terms in unit_terms:
+        for term in terms:
+            vocabulary.setdefault(term, len(vocabulary))
+    local_df = Counter(term for terms in unit_terms for term in set(terms))
+    encoder = get_bm25_encoder()
+
+    def idf(term: str) -> float:
+        if encoder is not None and term in encoder.term_index:
+            return encoder.idf(encoder.term_index[term])
+        df = local_df.get(term, 0)
+        return math.log(1 + (len(units) - df + 0.5) / (df + 0.5))
+
+    idfs = np.array([idf(term) for term in vocabulary], dtype=np.float32)
+    tf = np.zeros((len(units), len(vocabulary)), dtype=np.float32)
+    for row, terms in enumerate(unit_terms):
+        for term, n in Counter(terms).items():
+            tf[row, vocabulary[term]] = n
+
+    lengths = tf.sum(axis=1, keepdims=True)
+    norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths / (lengths.mean() or 1))
+    query_columns = [vocabulary[term] for term in dict.fromkeys(_terms(query)) if term in vocabulary]
+    saturated = tf[:, query_columns] * (BM25_K1 + 1) / (tf[:, query_columns] + norm)
+    scores = saturated @ idfs[query_columns] if query_columns else np.zeros(len(units), dtype=np.float32)
+    return scores, _normalize(tf * idfs)
+
+
+def select_within_budget(units: Sequence[str], scores: Sequence[float], budget: int,
+                         keep_order: bool = True) -> List[str]:
+    """
+    Highest-scoring units whose token counts fit in `budget`. If even the best unit is too
+    long, it is cut to the budget. Returned in original order (`keep_order`) or by score.
+    """
+    chosen, used = [], 0
+    for i in sorted(range(len(units)), key=lambda i: scores[i], reverse=True):
+        tokens = count_tokens(units[i])
+        if used + tokens <= budget:
+            chosen.append(i)
+            used += tokens
+        elif not chosen and budget >= MIN_UNIT_TOKENS:
+            return [truncate_tokens(units[i], budget)]
+    if keep_order:
+        chosen.sort()
+    return [units[i] for i in chosen]
+
+
+def dedupe_reviews(reviews: List[str], vectors: np.ndarray, scores: np.ndarray,
+                   threshold: float = DUPLICATE_SIMILARITY, overlap: float = DUPLICATE_OVERLAP) -> List[int]:
+    """
+    Indices of reviews to keep, best first, skipping any whose TF-IDF vector or word set is too
+    similar to one already kept (templated and copy-pasted reviews).
+    """
+    kept: List[int] = []
+    kept_words: List[set] = []
+    for i in np.argsort(-scores):
+        words = set(reviews[i].lower().split())
+        if kept and (
+            float(np.max(vectors[kept] @ vectors[i])) >= threshold
+            or any(len(words & other) / (len(words | other) or 1) >= overlap for other in kept_words)
+        ):
+            continue
+        kept.append(int(i))
+        kept_words.append(words)
+    return kept
+
+
+def product_header(hit: SearchHit) -> str:
+    return (
+        f"Product Name: {hit.product_name}\nPrice: {hit.price}\nRating: {hit.rating}\n"
+        f"Vector Score: {hit.score}\n"
+        f"Rerank Score: {hit.rerank_score if hit.rerank_score is not None else 'N/A'}"
+    )
+
+
+def build_context(query: str, hits: Sequence[SearchHit], max_tokens: int = CONTEXT_MAX_TOKENS) -> str:
+    """
+    Products section of the report prompt, bounded to about `max_tokens` tokens.
+
+    Every product gets an equal share of the budget (at least PRODUCT_MIN_TOKENS): its
+    header (name, price, rating, scores) first, then the description sentences and the
+    reviews most relevant to the query, with near-identical reviews removed. Relevance is
+    BM25 against the query (`score_units`), computed locally, so building the context
+    makes no API calls. Descriptions keep their sentence order; reviews are listed most
+    relevant first.
+    """
+    if not hits:
+        return ""
+    sentences = [split_sentences(hit.document) for hit in hits]
+    reviews = [split_reviews(hit.reviews)[:MAX_REVIEW_CANDIDATES] for hit in hits]
+    units = list(dict.fromkeys(
+        unit for groups in (sentences, reviews) for group in groups for unit in group
+        if count_tokens(unit) >= MIN_UNIT_TOKENS
+    ))
+    similarity, vectors = score_units(query, units)
+    index = {unit: i for i, unit in enumerate(units)}
+
+    share = max(PRODUCT_MIN_TOKENS, max_tokens // len(hits))
+    blocks = []
+    for hit, product_sentences, product_reviews in zip(hits, sentences, reviews):
+        header = product_header(hit)
+        # header, field labels and the separator between products are part of the share
+        remaining = max(share - count_tokens(f"{header}\nProduct Description:\nUser Reviews:\n---"), 0)
+
+        product_sentences = [unit for unit in product_sentences if unit in index]
+        product_reviews = [unit for unit in product_reviews if unit in index]
+        if product_reviews:
+            rows = [index[unit] for unit in product_reviews]
+            keep = dedupe_reviews(product_reviews, vectors[rows], similarity[rows])[:MAX_REVIEWS_PER_PRODUCT]
+            product_reviews = [product_reviews[i] for i in keep]
+
+        review_budget = remaining - int(remaining * DESCRIPTION_SHARE) if product_reviews else 0
+        chosen_reviews = select_within_budget(product_reviews, [similarity[index[u]] for u in product_reviews],
+                                              review_budget, keep_order=False)
+        description_budget = remaining - sum(count_tokens(review) for review in chosen_reviews)
+        chosen_sentences = select_within_budget(product_sentences,
+                                                [similarity[index[u]] for u in product_sentences],
+                                                description_budget)
+        blocks.append(
+            f"{header}\nProduct Description: {' '.join(chosen_sentences)}\n"
+            f"User Reviews: {' | '.join(chosen_reviews) if chosen_reviews else 'N/A'}"
+        )
+    context = "\n\n---\n\n".join(blocks)
+    logger.info(f"Built report context for {len(hits)} products: {count_tokens(context)} tokens "
+                f"(budget {max(max_tokens, share * len(hits))})")
+    return context
@@ -0,0 +1,185 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+logger = logging.getLogger("embedding_cache")
+
+# === CONFIG ===
+CACHE_PATH = os.getenv("SMARTFIND_EMBEDDING_CACHE", "./data/embedding_cache.sqlite")
+MEMORY_MAX_ITEMS = int(os.getenv("SMARTFIND_EMBEDDING_CACHE_MEMORY_ITEMS", "4096"))
+DISK_MAX_ITEMS = int(os.getenv("SMARTFIND_EMBEDDING_CACHE_DISK_ITEMS", "500000"))
+EVICTION_SLACK = 0.1   # fraction of DISK_MAX_ITEMS freed per eviction pass
+
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace so trivially different inputs share a cache entry."""
+    return " ".join(str(text).split())
+
+
+def cache_key(model: str, text: str) -> str:
+    return hashlib.sha256(f"{model}\x00{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+
+# === Two-Tier Embedding Cache ===
+class EmbeddingCache:
+    """
+    Embedding cache keyed by (model, normalized text).
+
+    Tier 1 is an in-process LRU of recent vectors; tier 2 is a SQLite table of float32
+    blobs shared by every process on the machine (ingest jobs, Gradio workers). Both
+    tiers are size-bounded: the LRU drops its oldest entry, the disk tier deletes the
+    least recently accessed rows once it exceeds `disk_max_items`.
+    """
+
+    def __init__(self, path: Optional[str] = CACHE_PATH, memory_max_items: int = MEMORY_MAX_ITEMS,
+                 disk_max_items: int = DISK_MAX_ITEMS):
+        self.memory_max_items = memory_max_items
+        self.disk_max_items = disk_max_items
+        self._memory: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits_memory = 0
+        self._hits_disk = 0
+        self._misses = 0
+        self._evictions = 0
+
+        self._conn = None
+        if path:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "key TEXT PRIMARY KEY, model TEXT NOT NULL, vector BLOB NOT NULL, last_access REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_access ON embeddings (last_access)")
+            self._conn.commit()
+            self._disk_items = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    # --- memory tier ---
+    def _remember(self, key: str, vector: List[float]):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_max_items:
+            self._memory.popitem(last=False)
+
+    # --- public API ---
+    def get_many(self, model: str, texts: Sequence[str]) -> List[Optional[List[float]]]:
+        """Return cached vectors for `texts` (None where missing), promoting disk hits to memory."""
+        keys = [cache_key(model, text) for text in texts]
+        results: List[Optional[List[float]]] = [None] * len(keys)
+        with self._lock:
+            disk_lookup = {}
+            for i, key in enumerate(keys):
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    self._hits_memory += 1
+                    results[i] = vector
+                else:
+                    disk_lookup.setdefault(key, []).append(i)
+
+            if disk_lookup and self._conn is not None:
+                found = self._select(list(disk_lookup))
+                for key, vector in found.items():
+                    self._remember(key, vector)
+                    for i in disk_lookup[key]:
+                        results[i] = vector
+                    self._hits_disk += len(disk_lookup[key])
+                if found:
+                    self._conn.executemany(
+                        "UPDATE embeddings SET last_access = ? WHERE key = ?",
+                        [(time.time(), key) for key in found],
+                    )
+                    self._conn.commit()
+
+            self._misses += sum(1 for vector in results if vector is None)
+        return results
+
+    def get(self, model: str, text: str) -> Optional[List[float]]:
+        return self.get_many(model, [text])[0]
+
+    def put_many(self, model: str, texts: Sequence[str], vectors: Sequence[List[float]]):
+        """Store freshly computed vectors in both tiers."""
+        keys = [cache_key(model, text) for text in texts]
+        with self._lock:
+            for key, vector in zip(keys, vectors):
+                self._remember(key, list(vector))
+            if self._conn is None:
+                return
+            now = time.time()
+            cursor = self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, model, vector, last_access) VALUES (?, ?, ?, ?)",
+                [(key, model, array("f", vector).tobytes(), now) for key, vector in zip(keys, vectors)],
+            )
+            self._disk_items += max(cursor.rowcount, 0)
+            if self._disk_items > self.disk_max_items:
+                self._evict()
+            self._conn.commit()
+
+    def put(self, model: str, text: str, vector: List[float]):
+        self.put_many(model, [text], [vector])
+
+    def stats(self) -> dict:
+        """Hit/miss counters for both tiers since the cache was created."""
+        with self._lock:
+            lookups = self._hits_memory + self._hits_disk + self._misses
+            return {
+                "hits_memory": self._hits_memory,
+                "hits_disk": self._hits_disk,
+                "misses": self._misses,
+                "hit_rate": round((self._hits_memory + self._hits_disk) / lookups, 4) if lookups else 0.0,
+                "memory_items": len(self._memory),
+                "disk_items": self._disk_items if self._conn is not None else 0,
+                "evictions": self._evictions,
+            }
+
+    # --- disk tier ---
+    def _select(self, keys: List[str]) -> dict:
+        found = {}
+        for i in range(0, len(keys), 500):  # stay under SQLite's bound-parameter limit
+            batch = keys[i:i + 500]
+            rows = self._conn.execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(batch))})", batch
+            ).fetchall()
+            for key, blob in rows:
+                vector = array("f")
+                vector.frombytes(blob)
+                found[key] = vector.tolist()
+        return found
+
+    def _evict(self):
+        excess = self._disk_items - int(self.disk_max_items * (1 - EVICTION_SLACK))
+        self._conn.execute(
+            "DELETE FROM embeddings WHERE key IN (SELECT key FROM embeddings ORDER BY last_access LIMIT ?)",
+            (excess,),
+        )
+        self._disk_items = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        self._evictions += excess
+        logger.info(f"Evicted {excess} embeddings from disk cache ({self._disk_items} remaining)")
+
+
+# === Shared Instance ===
+_cache: Optional[EmbeddingCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """
+    Process-wide cache used by `get_embedding` / `get_embeddings`.
+    Set SMARTFIND_EMBEDDING_CACHE=off to keep only the in-memory tier.
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                path = None if CACHE_PATH.lower() in ("", "off", "none") else CACHE_PATH
+                _cache = EmbeddingCache(path=path)
+    return _cache
@@ -0,0 +1,471 @@
+import argparse
+import hashlib
+import json
+import logging
+import math
+import os
+import shutil
+import time
+import numpy as np
+
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from utils.index_manifest import MANIFEST_PATH, IndexManifest, content_hash, read_version
+from utils.sparse_encoder import SPARSE_VECTOR_NAME, VOCABULARY_PATH, reload_bm25_encoder
+from utils.vector_store import (
+    DISPLAY_PAYLOAD_FIELDS, EMBEDDING_DIMS, PAYLOAD_INDEXES, SECTION_PAYLOAD_INDEXES, CollectionProfile,
+    QdrantVectorStore, collection_aliases, ensure_collection, ensure_payload_indexes, get_qdrant_client,
+    is_embedded, sections_collection_name, swap_aliases
+)
+
+logger = logging.getLogger("index_artifact")
+
+# === CONFIG ===
+ARTIFACT_FORMAT = 1
+INDEX_ARTIFACT = os.getenv("SMARTFIND_INDEX_ARTIFACT", "")     # artifact gradio_app.launch() imports on start
+EMBEDDING_MODEL = "text-embedding-3-small"    # model queries are embedded with (core.search_pipeline)
+SCROLL_BATCH_SIZE = 1000
+UPLOAD_BATCH_SIZE = 256
+INDEXING_THRESHOLD = 20_000     # Qdrant's default, restored after a bulk upload with indexing paused
+INDEX_WAIT_S = 1800             # longest wait for the server to finish indexing before the swap
+WARM_UP_QUERIES = 32            # stored vectors searched on the new collection before it goes live
+KEEP_COLLECTIONS = 2            # imported collections kept per alias (live + previous, for rollback)
+HASH_CHUNK_BYTES = 1 << 20
+NUMERIC_FIELDS = ("price", "rating")
+
+
+class IncompatibleArtifact(ValueError):
+    """The artifact cannot be served by this deployment (format, model, dims, layout or missing files)."""
+
+
+# === Manifest ===
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_CHUNK_BYTES), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def read_manifest(path: str) -> dict:
+    manifest_file = Path(path) / "manifest.json"
+    if not manifest_file.exists():
+        raise IncompatibleArtifact(f"No index artifact at {path} (manifest.json missing)")
+    return json.loads(manifest_file.read_text())
+
+
+def verify_files(path: str, manifest: dict):
+    """Check every file against the SHA-256 recorded at export (IncompatibleArtifact on mismatch)."""
+    root = Path(path)
+    for name, digest in manifest["files"].items():
+        if not (root / name).exists():
+            raise IncompatibleArtifact(f"{name} is missing from {path}")
+        if file_sha256(root / name) != digest:
+            raise IncompatibleArtifact(f"{name} in {path} does not match its manifest hash")
+
+
+def check_compatibility(manifest: dict, client=None, collection: Optional[str] = None,
+                        embedding_model: str = EMBEDDING_MODEL, allow_layout_change: bool = False) -> List[str]:
+    """
+    Reasons the artifact cannot replace `collection` here, as IncompatibleArtifact; returns warnings.
+
+    Queries must be embedded with the artifact's model, and the vectors must be a Matryoshka
+    prefix of it. If the live collection has other dims or quantization, other processes
+    would keep searching with their cached layout, so that needs `allow_layout_change`
+    (and a restart of every other search process).
+    """
+    problems, warnings = [], []
+    if manifest.get("format", 0) > ARTIFACT_FORMAT:
+        problems.append(f"format {manifest.get('format')} is newer than supported ({ARTIFACT_FORMAT})")
+    if manifest.get("embedding_model") != embedding_model:
+        problems.append(f"embedded with '{manifest.get('embedding_model')}', queries use '{embedding_model}'")
+    if not 0 < manifest.get("dims", 0) <= EMBEDDING_DIMS:
+        problems.append(f"{manifest.get('dims')} dims is not a prefix of the {EMBEDDING_DIMS}-dim query embeddings")
+    if "products" not in manifest.get("parts", {}):
+        problems.append("no products part")
+    if any(part.get("sparse") for part in manifest.get("parts", {}).values()) and not manifest.get("bm25_vocabulary"):
+        problems.append("sparse vectors without the BM25 vocabulary they were encoded with")
+
+    if client is not None and collection and client.collection_exists(collection):
+        profile = collection_profile(client, collection)
+        live = (profile["dims"], profile["quantization"])
+        new = (manifest.get("dims"), manifest.get("profile", {}).get("quantization"))
+        if live != new:
+            message = f"layout changes from {live[0]} dims/{live[1]} to {new[0]} dims/{new[1]}"
+            if allow_layout_change:
+                warnings.append(f"{message}; restart every other search process after the swap")
+            else:
+                problems.append(f"{message} (pass allow_layout_change and restart other search processes)")
+    if problems:
+        raise IncompatibleArtifact("Incompatible index artifact: " + "; ".join(problems))
+    for warning in warnings:
+        logger.warning(f"⚠️ {warning}")
+    return warnings
+
+
+# === Export ===
+def collection_profile(client, collection: str) -> dict:
+    """`CollectionProfile` fields of an existing collection."""
+    from qdrant_client import models
+
+    config = client.get_collection(collection).config
+    vectors = config.params.vectors
+    vectors = vectors.get("", next(iter(vectors.values()))) if isinstance(vectors, dict) else vectors
+    quantization = vectors.quantization_config or config.quantization_config
+    hnsw = vectors.hnsw_config or config.hnsw_config
+    return CollectionProfile(
+        dims=vectors.size,
+        quantization=None if quantization is None else (
+            "binary" if isinstance(quantization, models.BinaryQuantization) else "int8"),
+        on_disk=bool(vectors.on_disk),
+        hnsw_m=hnsw.m,
+        hnsw_ef_construct=hnsw.ef_construct,
+    )._asdict()
+
+
+def _export_part(client, collection: str, root: Path, display_fields: Optional[List[str]]) -> dict:
+    """
+    Dump one collection: normalized dense vectors into a memory-mapped `vectors.npy`, BM25
+    vectors as CSR arrays, and payloads as Parquet. With `display_fields`, those go to
+    `payload.parquet` (the NumPy index layout) and the rest to `documents.parquet`.
+    """
+    import pandas as pd
+    from utils.numpy_store import normalize_rows
+
+    root.mkdir(parents=True)
+    total = client.count(collection_name=collection, exact=True).count
+    vectors, dims, row, offset = None, 0, 0, None
+    records, indptr, indices, values = [], [0], [], []
+    while True:
+        points, offset = client.scroll(collection_name=collection, limit=SCROLL_BATCH_SIZE, offset=offset,
+                                       with_payload=True, with_vectors=True)
+        for point in points:
+            named = point.vector if isinstance(point.vector, dict) else {"": point.vector}
+            if vectors is None:
+                dims = len(named[""])
+                vectors = np.lib.format.open_memmap(root / "vectors.npy", mode="w+", dtype=np.float32,
+                                                    shape=(total, dims))
+            vectors[row] = normalize_rows(np.asarray([named[""]], dtype=np.float32))[0]
+            sparse = named.get(SPARSE_VECTOR_NAME)
+            if sparse is not None:
+                indices.extend(sparse.indices)
+                values.extend(sparse.values)
+            indptr.append(len(indices))
+            records.append({"id": str(point.id), **(point.payload or {})})
+            row += 1
+        if offset is None:
+            break
+    if vectors is None:
+        vectors = np.lib.format.open_memmap(root / "vectors.npy", mode="w+", dtype=np.float32, shape=(0, 0))
+    vectors.flush()
+    del vectors
+
+    has_sparse = bool(indices)
+    if has_sparse:
+        np.save(root / "sparse_indptr.npy", np.asarray(indptr, dtype=np.int64))
+        np.save(root / "sparse_indices.npy", np.asarray(indices, dtype=np.uint32))
+        np.save(root / "sparse_values.npy", np.asarray(values, dtype=np.float32))
+
+    frame = pd.DataFrame.from_records(records)
+    if "id" not in frame:
+        frame["id"] = pd.Series(dtype=str)
+    for field in NUMERIC_FIELDS:
+        if field in frame:
+            frame[field] = pd.to_numeric(frame[field], errors="coerce")
+    if display_fields is not None:
+        for field in display_fields:
+            if field not in frame:
+                frame[field] = None
+        frame[["id", *display_fields]].to_parquet(root / "payload.parquet", index=False)
+        rest = [column for column in frame.columns if column not in ("id", *display_fields)]
+        if rest:
+            frame[["id", *rest]].to_parquet(root / "documents.parquet", index=False)
+    else:
+        frame.to_parquet(root / "payload.parquet", index=False)
+    meta = {"collection": collection, "points": row, "dims": dims, "sparse": has_sparse, "ivf_lists": 0,
+            "built_at": time.strftime("%Y-%m-%dT%H:%M:%S")}
+    (root / "meta.json").write_text(json.dumps(meta, indent=2))
+    return meta
+
+
+def export_artifact(path: str, collection: str = "ecommerce-products", client=None,
+                    manifest_path: str = MANIFEST_PATH, vocabulary_path: str = VOCABULARY_PATH,
+                    embedding_model: str = EMBEDDING_MODEL) -> dict:
+    """
+    Write `collection` (and its section collection, if any) as a versioned index artifact.
+
+    Layout of `path`: `manifest.json`, `bm25_vocabulary.json` and one directory per part
+    (`products`, `sections`) with `vectors.npy`, `payload.parquet`, optional
+    `documents.parquet` and `sparse_*.npy`. The manifest records the embedding model, dims,
+    collection profile, tag vocabulary, ingest version, a hash over every product's
+    content hash and the SHA-256 of every file. `products/` is also a valid NumPy index
+    (`SMARTFIND_NUMPY_INDEX`).
+    """
+    qdrant = client or get_qdrant_client(collection=collection)
+    start = time.perf_counter()
+    target = Path(path)
+    tmp = target.with_name(f"{target.name}.tmp-{os.getpid()}")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+
+    parts = {"products": _export_part(qdrant, collection, tmp / "products", DISPLAY_PAYLOAD_FIELDS)}
+    sections = sections_collection_name(collection)
+    if qdrant.collection_exists(sections) and qdrant.count(collection_name=sections, exact=False).count:
+        parts["sections"] = _export_part(qdrant, sections, tmp / "sections", None)
+    if any(part["sparse"] for part in parts.values()) and Path(vocabulary_path).exists():
+        shutil.copyfile(vocabulary_path, tmp / "bm25_vocabulary.json")
+
+    import pandas as pd
+    payload = pd.read_parquet(tmp / "products" / "payload.parquet", columns=["id", "tags"])
+    tags = Counter(tag for product_tags in payload["tags"] if product_tags is not None for tag in product_tags)
+    hashes = _content_hashes(tmp / "products")
+    files = {
+        file.relative_to(tmp).as_posix(): file_sha256(file)
+        for file in sorted(tmp.rglob("*")) if file.is_file()
+    }
+    manifest = {
+        "format": ARTIFACT_FORMAT,
+        "collection": collection,
+        "artifact_id": content_hash(*files.values())[:12],
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "embedding_model": embedding_model,
+        "dims": parts["products"]["dims"],
+        "profile": collection_profile(qdrant, collection),
+        "index_version": read_version(collection, manifest_path),
+        "catalog_hash": content_hash(*sorted(f"{pid}:{digest}" for pid, digest in hashes)),
+        "parts": {name: {key: part[key] for key in ("points", "dims", "sparse")} for name, part in parts.items()},
+        "bm25_vocabulary": "bm25_vocabulary.json" if (tmp / "bm25_vocabulary.json").exists() else None,
+        "tag_vocabulary": dict(tags.most_common()),
+        "files": files,
+    }
+    (tmp / "manifest.json").write_text(json.dumps(manifest, indent=2))
+    shutil.rmtree(target, ignore_errors=True)
+    os.replace(tmp, target)
+    logger.info(f"✅ Exported '{collection}' ({manifest['parts']}) to {path} as artifact "
+                f"{manifest['artifact_id']} in {time.perf_counter() - start:.2f}s")
+    return manifest
+
+
+def _content_hashes(part: Path) -> List[Tuple[str, str]]:
+    import pandas as pd
+
+    if not (part / "documents.parquet").exists():
+        return []
+    frame = pd.read_parquet(part / "documents.parquet")
+    if "content_hash" not in frame:
+        return []
+    return [(pid, digest) for pid, digest in zip(frame["id"], frame["content_hash"]) if isinstance(digest, str)]
+
+
+# === Import ===
+def _payload(record: dict) -> dict:
+    """Parquet row -> Qdrant payload (arrays to lists, NaN to None, NumPy scalars to Python)."""
+    payload = {}
+    for key, value in record.items():
+        if key == "id":
+            continue
+        if isinstance(value, np.ndarray):
+            value = value.tolist()
+        elif isinstance(value, np.generic):
+            value = value.item()
+        if isinstance(value, float) and math.isnan(value):
+            value = None
+        payload[key] = value
+    return payload
+
+
+def _import_part(client, collection: str, root: Path, profile: CollectionProfile, server: bool,
+                 payload_indexes: Dict[str, str]) -> int:
+    """Create `collection` and upload a part, reading vectors and sparse arrays memory-mapped."""
+    import pandas as pd
+    from qdrant_client import models
+
+    ensure_collection(client, collection, profile)
+    if server:
+        # Bulk load without building HNSW segment by segment; indexing runs once at the end
+        client.update_collection(collection, optimizers_config=models.OptimizersConfigDiff(indexing_threshold=0))
+        ensure_payload_indexes(client, collection, payload_indexes)
+
+    vectors = np.load(root / "vectors.npy", mmap_mode="r")
+    frame = pd.read_parquet(root / "payload.parquet")
+    if (root / "documents.parquet").exists():
+        frame = frame.join(pd.read_parquet(root / "documents.parquet").drop(columns="id"))
+    sparse = None
+    if (root / "sparse_indptr.npy").exists():
+        sparse = tuple(np.load(root / f"sparse_{name}.npy", mmap_mode="r") for name in ("indptr", "indices", "values"))
+
+    for start in range(0, len(frame), UPLOAD_BATCH_SIZE):
+        records = frame.iloc[start:start + UPLOAD_BATCH_SIZE].to_dict(orient="records")
+        points = []
+        for row, record in enumerate(records, start):
+            dense = vectors[row].tolist()
+            vector = dense
+            if sparse is not None:
+                indptr, indices, values = sparse
+                lo, hi = int(indptr[row]), int(indptr[row + 1])
+                vector = {"": dense, SPARSE_VECTOR_NAME: models.SparseVector(
+                    indices=indices[lo:hi].tolist(), values=values[lo:hi].tolist()
+                )}
+            points.append(models.PointStruct(id=record["id"], vector=vector, payload=_payload(record)))
+        client.upsert(collection_name=collection, points=points, wait=True)
+
+    if server:
+        client.update_collection(
+            collection, optimizers_config=models.OptimizersConfigDiff(indexing_threshold=INDEXING_THRESHOLD)
+        )
+    return len(frame)
+
+
+def _wait_until_indexed(client, collection: str, timeout_s: float = INDEX_WAIT_S):
+    from qdrant_client import models
+
+    deadline = time.monotonic() + timeout_s
+    while client.get_collection(collection).status != models.CollectionStatus.GREEN:
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"'{collection}' was not indexed within {timeout_s}s")
+        time.sleep(1.0)
+
+
+def _warm_up(client, collection: str, root: Path, sections: bool):
+    """Search the new collection with stored vectors, so its index and payload pages are hot before the swap."""
+    vectors = np.load(root / "vectors.npy", mmap_mode="r")
+    if not len(vectors):
+        return
+    rows = np.random.default_rng(0).choice(len(vectors), min(WARM_UP_QUERIES, len(vectors)), replace=False)
+    store = QdrantVectorStore(collection, client=client)
+    store.warm_up()
+    queries = [np.asarray(vectors[row], dtype=np.float32).tolist() for row in sorted(rows)]
+    store.search_batch([""] * len(queries), queries, top_k=10)
+    if sections:
+        store.search_batch([""] * len(queries), queries, top_k=10, sections=True)
+
+
+def _prune(client, history: List[str], keep: int) -> List[str]:
+    """Drop imported collections beyond the newest `keep` in `history` (oldest first); returns what is left."""
+    for name in history[:-keep] if keep > 0 else history:
+        for target in (name, sections_collection_name(name)):
+            if client.collection_exists(target):
+                client.delete_collection(target)
+        logger.info(f"🗑️ Dropped old imported collection '{name}'")
+    return history[-keep:] if keep > 0 else []
+
+
+def import_artifact(path: str, collection: Optional[str] = None, client=None, verify: bool = True,
+                    warm_up: bool = True, replace_collection: bool = False, allow_layout_change: bool = False,
+                    manifest_path: str = MANIFEST_PATH, vocabulary_path: str = VOCABULARY_PATH,
+                    keep: int = KEEP_COLLECTIONS) -> dict:
+    """
+    Serve an index artifact under `collection` (default: the one it was exported from)
+    without ingesting.
+
+    The artifact is loaded into its own collection `<collection>-<artifact_id>` (plus
+    `-sections`), warmed up with searches, and only then do the aliases `<collection>` and
+    `<collection>-sections` move to it in one request, so searches switch catalogs
+    atomically and never see a half-loaded or cold collection. Re-importing the active
+    artifact is a no-op; re-importing a previous one that is still kept (`keep`) only
+    moves the aliases back. Afterwards the BM25 vocabulary is installed, and the ingest
+    manifest takes the artifact's content hashes and version, which invalidates response
+    caches and lets `--incremental` ingest continue from the imported catalog.
+
+    A collection that was ingested directly under the alias name has to be deleted before
+    the alias can take its name (`replace_collection`); that first switch is not atomic.
+    """
+    start = time.perf_counter()
+    manifest = read_manifest(path)
+    collection = collection or manifest["collection"]
+    qdrant = client or get_qdrant_client(collection=collection)
+    target = f"{collection}-{manifest['artifact_id']}"
+    names = {part: target if part == "products" else sections_collection_name(target) for part in manifest["parts"]}
+    # The section alias is removed when the artifact has no sections, so searches skip them
+    targets = {collection: target, sections_collection_name(collection): names.get("sections")}
+    aliases = collection_aliases(qdrant)
+    stats = {"collection": target, "artifact_id": manifest["artifact_id"], "loaded": False}
+    if all(aliases.get(alias) == name for alias, name in targets.items()):
+        logger.info(f"Artifact {manifest['artifact_id']} is already live as '{collection}'")
+        return {**stats, "elapsed_s": round(time.perf_counter() - start, 2)}
+    check_compatibility(manifest, qdrant, collection, allow_layout_change=allow_layout_change)
+    if verify:
+        verify_files(path, manifest)
+
+    legacy = [alias for alias in targets if alias not in aliases and qdrant.collection_exists(alias)]
+    if legacy and not replace_collection:
+        raise IncompatibleArtifact(f"{legacy} are collections, not aliases; pass replace_collection to delete "
+                                   "them and serve the artifact under their names")
+
+    server = not is_embedded(qdrant)
+    root = Path(path)
+    loaded = all(
+        qdrant.collection_exists(name)
+        and qdrant.count(collection_name=name, exact=True).count == manifest["parts"][part]["points"]
+        for part, name in names.items()
+    )
+    if not loaded:
+        profile = CollectionProfile(**manifest["profile"])
+        for part, name in names.items():
+            if qdrant.collection_exists(name):
+                qdrant.delete_collection(name)
+            indexes = PAYLOAD_INDEXES if part == "products" else SECTION_PAYLOAD_INDEXES
+            _import_part(qdrant, name, root / part, profile, server, indexes)
+        stats["loaded"] = True
+    if server:
+        for name in names.values():
+            _wait_until_indexed(qdrant, name)
+    if warm_up:
+        _warm_up(qdrant, target, root / "products", "sections" in names)
+
+    for alias in legacy:
+        logger.warning(f"⚠️ Deleting collection '{alias}' so the alias can take its name")
+        qdrant.delete_collection(alias)
+    swap_aliases(qdrant, targets)
+
+    if manifest.get("bm25_vocabulary"):
+        tmp = f"{vocabulary_path}.tmp"
+        Path(vocabulary_path).parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(root / manifest["bm25_vocabulary"], tmp)
+        os.replace(tmp, vocabulary_path)
+        reload_bm25_encoder(vocabulary_path)
+    index_manifest = IndexManifest(manifest_path)
+    index_manifest.replace(collection, _content_hashes(root / "products"),
+                           manifest.get("index_version") or manifest["artifact_id"])
+    history = [name for name in json.loads(index_manifest.get_meta(collection, "imports") or "[]") if name != target]
+    index_manifest.set_meta(collection, "imports", json.dumps(_prune(qdrant, history + [target], keep)))
+    index_manifest.close()
+
+    stats["elapsed_s"] = round(time.perf_counter() - start, 2)
+    logger.info(f"✅ Artifact {manifest['artifact_id']} is live as '{collection}' -> '{target}' "
+                f"({manifest['parts']['products']['points']} products) in {stats['elapsed_s']}s")
+    return stats
+
+
+# === CLI EXECUTION ===
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    parser = argparse.ArgumentParser(description="Export, verify or import a prebuilt index artifact")
+    parser.add_argument("action", choices=["export", "verify", "import"])
+    parser.add_argument("--path", required=True, help="Artifact directory")
+    parser.add_argument("--collection", default=None, help="Collection/alias (default: ecommerce-products on "
+                                                           "export, the exported one on import)")
+    parser.add_argument("--no-verify", action="store_true", help="Skip file hash checks on import")
+    parser.add_argument("--no-warm-up", action="store_true")
+    parser.add_argument("--replace-collection", action="store_true",
+                        help="Delete a directly ingested collection so the alias can take its name")
+    parser.add_argument("--allow-layout-change", action="store_true",
+                        help="Accept other dims/quantization than the live collection (restart other searchers)")
+    parser.add_argument("--keep", type=int, default=KEEP_COLLECTIONS)
+    args = parser.parse_args()
+
+    if args.action == "export":
+        result = export_artifact(args.path, args.collection or "ecommerce-products")
+        result = {key: value for key, value in result.items() if key not in ("files", "tag_vocabulary")}
+    elif args.action == "verify":
+        result = read_manifest(args.path)
+        check_compatibility(result)
+        verify_files(args.path, result)
+        result = {"ok": True, "artifact_id": result["artifact_id"], "parts": result["parts"]}
+    else:
+        result = import_artifact(args.path, args.collection, verify=not args.no_verify, warm_up=not args.no_warm_up,
+                                 replace_collection=args.replace_collection,
+                                 allow_layout_change=args.allow_layout_change, keep=args.keep)
+    print(json.dumps(result, indent=2))
@@ -0,0 +1,165 @@
+import hashlib
+import logging
+import sqlite3
+import threading
+import uuid
+
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+logger = logging.getLogger("index_manifest")
+
+MANIFEST_PATH = "./data/ingest_manifest.sqlite"
+
+
+# === Content Hashing ===
+def content_hash(*parts) -> str:
+    """
+    Stable SHA-256 over the given parts (document text, payload fields, model names).
+    Any change in a part changes the hash, which marks the row for re-indexing.
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part if part is not None else "").encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+# === Index Manifest ===
+class IndexManifest:
+    """
+    Sidecar SQLite manifest of what has been indexed into each Qdrant collection.
+
+    Stores one content hash per point id, written as each upsert chunk lands, so an
+    interrupted ingest can resume by skipping rows that are already current. A version
+    token is bumped after every completed run so downstream caches can detect re-ingests.
+    """
+
+    def __init__(self, path: str = MANIFEST_PATH):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS points ("
+            "collection TEXT NOT NULL, point_id TEXT NOT NULL, content_hash TEXT NOT NULL, "
+            "PRIMARY KEY (collection, point_id))"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS meta (collection TEXT NOT NULL, key TEXT NOT NULL, value TEXT, "
+            "PRIMARY KEY (collection, key))"
+        )
+        self._conn.commit()
+
+    def hashes(self, collection: str) -> Dict[str, str]:
+        """Return {point_id: content_hash} for everything recorded in the collection."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT point_id, content_hash FROM points WHERE collection = ?", (collection,)
+            ).fetchall()
+        return dict(rows)
+
+    def record(self, collection: str, entries: Iterable[Tuple[str, str]]):
+        """Checkpoint (point_id, content_hash) pairs that were successfully upserted."""
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO points (collection, point_id, content_hash) VALUES (?, ?, ?)",
+                [(collection, point_id, digest) for point_id, digest in entries],
+            )
+            self._conn.commit()
+
+    def replace(self, collection: str, entries: Iterable[Tuple[str, str]], version: str):
+        """Swap in a complete index (e.g. an imported artifact): its hashes and version, in one transaction."""
+        with self._lock:
+            self._conn.execute("DELETE FROM points WHERE collection = ?", (collection,))
+            self._conn.executemany(
+                "INSERT INTO points (collection, point_id, content_hash) VALUES (?, ?, ?)",
+                [(collection, point_id, digest) for point_id, digest in entries],
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta (collection, key, value) VALUES (?, 'version', ?)", (collection, version)
+            )
+            self._conn.commit()
+
+    def remove(self, collection: str, point_ids: Iterable[str]):
+        with self._lock:
+            self._conn.executemany(
+                "DELETE FROM points WHERE collection = ? AND point_id = ?",
+                [(collection, point_id) for point_id in point_ids],
+            )
+            self._conn.commit()
+
+    def get_meta(self, collection: str, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM meta WHERE collection = ? AND key = ?", (collection, key)
+            ).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, collection: str, key: str, value: str):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta (collection, key, value) VALUES (?, ?, ?)",
+                (collection, key, value),
+            )
+            self._conn.commit()
+
+    def version(self, collection: str) -> Optional[str]:
+        """Version token of the last completed ingest run, or None if never completed."""
+        return self.get_meta(collection, "version")
+
+    def bump_version(self, collection: str) -> str:
+        version = uuid.uuid4().hex
+        self.set_meta(collection, "version", version)
+        return version
+
+    def rebuild_from_collection(self, client, collection: str, batch_size: int = 1000) -> int:
+        """
+        Repopulate the manifest from the `content_hash` stored in Qdrant payloads,
+        e.g. after the sidecar file was lost or when moving to a new machine.
+        """
+        entries, offset = [], None
+        while True:
+            records, offset = client.scroll(
+                collection_name=collection,
+                limit=batch_size,
+                offset=offset,
+                with_payload=["content_hash"],
+                with_vectors=False,
+            )
+            entries.extend(
+                (str(record.id), record.payload.get("content_hash"))
+                for record in records if record.payload and record.payload.get("content_hash")
+            )
+            if offset is None:
+                break
+        self.record(collection, entries)
+        logger.info(f"Rebuilt manifest for '{collection}' from {len(entries)} Qdrant payloads")
+        return len(entries)
+
+    def stale_ids(self, collection: str, seen_ids: Set[str]) -> Set[str]:
+        return set(self.hashes(collection)) - seen_ids
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def read_version(collection: str, path: str = MANIFEST_PATH) -> Optional[str]:
+    """
+    `IndexManifest.version` read without creating the manifest (search processes only read it).
+    None if the file does not exist or the collection never completed an ingest.
+    """
+    if not Path(path).exists():
+        return None
+    conn = sqlite3.connect(f"file:{Path(path).resolve()}?mode=ro", uri=True, timeout=5)
+    try:
+        row = conn.execute(
+            "SELECT value FROM meta WHERE collection = ? AND key = 'version'", (collection,)
+        ).fetchone()
+    except sqlite3.OperationalError:
+        return None
+    finally:
+        conn.close()
+    return row[0] if row else None
@@ -1,28 +1,110 @@
 import os
 import re
 import json
-import openai
 import logging
+import threading
 
-from typing import List
+from typing import Iterator, List
 from dotenv import load_dotenv
 
-# Load API keys from .env
+from utils.embedding_cache import get_embedding_cache
+from utils.rate_limit import call_api
+from utils.tracing import REGISTRY, Timer, count
+
+# Load API keys (and SMARTFIND_* / QDRANT_* settings read by other modules) from .env
 load_dotenv()
-openai.api_key = os.getenv("OPENAI_API_KEY")
 
-# Logger setup
+# Logger setup (handlers are configured by the entry points)
 logger = logging.getLogger("llm_utils")
-logging.basicConfig(level=logging.INFO)
+
+REGISTRY.register_collector("embedding_cache", lambda: get_embedding_cache().stats())
+
+_openai = None
+_openai_lock = threading.Lock()
+
+
+def get_openai():
+    """
+    The `openai` module with the API key set, imported on first use: the SDK takes about
+    0.4s to import, which would otherwise be paid by every process that imports this module.
+
+    The SDK's own retries are disabled; requests go through `call_api`, which retries
+    under the shared rate limit instead.
+    """
+    global _openai
+    if _openai is None:
+        with _openai_lock:
+            if _openai is None:
+                import openai
+                openai.api_key = os.getenv("OPENAI_API_KEY")
+                openai.max_retries = 0
+                _openai = openai
+    return _openai
+
+
+def count_usage(kind: str, usage):
+    """Record OpenAI token usage (`prompt_tokens`, plus `completion_tokens` for chat) on the active trace."""
+    if usage is None:
+        return
+    count(f"{kind}.prompt_tokens", getattr(usage, "prompt_tokens", 0) or 0)
+    count(f"{kind}.completion_tokens", getattr(usage, "completion_tokens", 0) or 0)
+
 
 # === Embedding Utility ===
+@Timer("llm.embedding")
 def get_embedding(text: str, model: str = "text-embedding-3-small") -> List[float]:
+    cache = get_embedding_cache()
+    cached = cache.get(model, text)
+    if cached is not None:
+        count("embedding_cache.hits")
+        return cached
+    count("embedding_cache.misses")
     try:
-        response = openai.embeddings.create(input=text, model=model)
-        return response.data[0].embedding
+        count("embedding.input_bytes", len(text.encode("utf-8")))
+        response = call_api("openai", lambda: get_openai().embeddings.create(input=text, model=model))
+        count_usage("embedding", response.usage)
+        embedding = response.data[0].embedding
+        cache.put(model, text, embedding)
+        return embedding
     except Exception as e:
         logger.warning(f"[Embedding Error] {e}")
-        return [0.0] * 1536   # Fallback vector
+        return [0.0] * 1536   # Fallback vector (never cached)
+
+
+# === Batch Embedding Utility ===
+@Timer("llm.embedding_batch")
+def get_embeddings(texts: List[str], model: str = "text-embedding-3-small") -> List[List[float]]:
+    """
+    Embed several texts with a single multi-input embeddings request.
+
+    Texts already in the embedding cache are served from it and only the misses are
+    sent to the API. If the batch request fails (e.g. one oversized input), falls back
+    to embedding each text on its own so a single bad row does not zero out the whole batch.
+    """
+    if not texts:
+        return []
+    cache = get_embedding_cache()
+    embeddings = cache.get_many(model, texts)
+    missing = [i for i, vector in enumerate(embeddings) if vector is None]
+    count("embedding_cache.hits", len(texts) - len(missing))
+    count("embedding_cache.misses", len(missing))
+    if not missing:
+        return embeddings
+
+    missing_texts = [texts[i] for i in missing]
+    try:
+        count("embedding.input_bytes", sum(len(text.encode("utf-8")) for text in missing_texts))
+        response = call_api("openai", lambda: get_openai().embeddings.create(input=missing_texts, model=model))
+        count_usage("embedding", response.usage)
+        fetched = [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+        cache.put_many(model, missing_texts, fetched)
+    except Exception as e:
+        logger.warning(f"[Batch Embedding Error] {e} — retrying {len(missing_texts)} inputs one by one")
+        fetched = [get_embedding(text, model=model) for text in missing_texts]
+
+    for i, vector in zip(missing, fetched):
+        embeddings[i] = vector
+    return embeddings
 
 
 # === Safe JSON Parse Utility ===
@@ -42,22 +124,59 @@ def safe_json_parse(content: str, key: str = "tags", fallback: str = "misc") ->
 
 
 # === Chat Completion Wrapper ===
+@Timer("llm.chat")
 def call_chat(model: str, system_prompt: str, user_input: str, temperature: float = 0.3) -> str:
     try:
-        response = openai.chat.completions.create(
+        count("chat.input_bytes", len(system_prompt.encode("utf-8")) + len(user_input.encode("utf-8")))
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_input}
+        ]
+        response = call_api("openai", lambda: get_openai().chat.completions.create(
             model=model,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_input}
-            ],
+            messages=messages,
             temperature=temperature
-        )
-        return response.choices[0].message.content.strip()
+        ))
+        count_usage("chat", response.usage)
+        content = response.choices[0].message.content.strip()
+        count("chat.output_bytes", len(content.encode("utf-8")))
+        return content
     except Exception as e:
         logger.error(f"[ChatCompletion Error] {e}")
         return "{}"  # Return empty JSON as fallback
 
 
+# === Streaming Chat Completion Wrapper ===
+@Timer("llm.chat_stream")
+def call_chat_stream(model: str, system_prompt: str, user_input: str, temperature: float = 0.3) -> Iterator[str]:
+    """
+    Streaming counterpart of `call_chat`: yields content deltas as the model produces them.
+    Opening the stream is retried like any request; an error after the first delta simply
+    ends the stream (after logging), so callers keep whatever arrived.
+    """
+    try:
+        count("chat.input_bytes", len(system_prompt.encode("utf-8")) + len(user_input.encode("utf-8")))
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_input}
+        ]
+        stream = call_api("openai", lambda: get_openai().chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            stream=True,
+            stream_options={"include_usage": True}
+        ))
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                count("chat.output_bytes", len(chunk.choices[0].delta.content.encode("utf-8")))
+                yield chunk.choices[0].delta.content
+            if getattr(chunk, "usage", None):
+                count_usage("chat", chunk.usage)
+    except Exception as e:
+        logger.error(f"[ChatCompletion Stream Error] {e}")
+
+
 # === Build Markdown RAG Document ===
 def build_rag_document(row) -> str:
     """
@@ -77,26 +196,3 @@ def build_rag_document(row) -> str:
         sections.append(f"### Product Information\n{info}")
 
     return "\n\n".join(sections)
-
-# === Clean RAG Document ===
-def clean_rag_document(doc: str) -> str:
-    """
-    Cleans noisy JavaScript and Amazon-specific clutter from product RAG documents.
-    """
-    # Remove embedded JavaScript snippets
-    doc = re.sub(r"amznJQ\.onReady\([\s\S]*?\)\);", "", doc)
-    doc = re.sub(r"\(function\(\$.*?\}\)\(\$.*?\);", "", doc)
-    
-    # Remove redundant 'Customer Reviews' JS junk
-    doc = re.sub(r"Customer Reviews[\s\S]+?(?:\d+ out of 5 stars|See all reviews)", "", doc)
-
-    # Remove Amazon popover configs and trailing JS
-    doc = re.sub(r"window\.reviewHistPopoverConfig[\s\S]*?onCacheUpdateReselect_average_customer_reviews.*?\);", "", doc)
-
-    # Remove stray HTML/JS tail
-    doc = re.sub(r"(Feedback\s+Would you like to update product info.*)", "", doc)
-
-    # Collapse excessive spacing
-    doc = re.sub(r"\n{2,}", "\n\n", doc).strip()
-
-    return doc
@@ -0,0 +1,330 @@
+import argparse
+import json
+import logging
+import os
+import time
+import numpy as np
+import pandas as pd
+
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from qdrant_client import models
+
+from utils.vector_store import (
+    DISPLAY_PAYLOAD_FIELDS, SECTIONS_SUFFIX, SearchHit, VectorStore, get_qdrant_client
+)
+
+logger = logging.getLogger("numpy_store")
+
+# === CONFIG ===
+NUMPY_INDEX_PATH = os.getenv("SMARTFIND_NUMPY_INDEX", "./data/numpy_index")
+IVF_PROBES = int(os.getenv("SMARTFIND_IVF_PROBES", "8"))    # inverted lists scanned per query
+QUERY_BLOCK_SIZE = 256         # queries scored per matrix multiply in batched search
+SCROLL_BATCH_SIZE = 1000
+KMEANS_ITERATIONS = 20
+KMEANS_SAMPLE_SIZE = 50_000    # rows used to train IVF centroids
+NUMERIC_FIELDS = ("price", "rating")
+
+
+# === Clustering ===
+def kmeans(vectors: np.ndarray, k: int, iterations: int = KMEANS_ITERATIONS, seed: int = 0,
+           sample_size: int = KMEANS_SAMPLE_SIZE) -> np.ndarray:
+    """
+    Spherical k-means (cosine) on L2-normalized rows; returns normalized (k, dims) centroids.
+
+    Trains on a random sample of at most `sample_size` rows; empty clusters are re-seeded
+    from random rows so all `k` centroids stay in use.
+    """
+    rng = np.random.default_rng(seed)
+    sample = vectors if len(vectors) <= sample_size else vectors[rng.choice(len(vectors), sample_size, replace=False)]
+    sample = np.asarray(sample, dtype=np.float32)
+    k = min(k, len(sample))
+    centroids = sample[rng.choice(len(sample), k, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = np.argmax(sample @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, sample)
+        counts = np.bincount(assignment, minlength=k)
+        empty = counts == 0
+        sums[empty] = sample[rng.choice(len(sample), int(empty.sum()))]
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        centroids = sums / np.where(norms == 0, 1, norms)
+    return centroids.astype(np.float32)
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return (matrix / np.where(norms == 0, 1, norms)).astype(np.float32)
+
+
+# === NumPy Backend ===
+class NumpyVectorStore(VectorStore):
+    """
+    In-process exact (or IVF) cosine search over a memory-mapped float32 matrix.
+
+    Rows are L2-normalized at build time, so a query is one matrix-vector product;
+    batches of queries are one matrix-matrix product per QUERY_BLOCK_SIZE queries, and
+    top-k uses `argpartition` instead of a full sort. Qdrant filters are translated into a
+    boolean row mask (tags via an inverted index, price/rating via NaN-aware ranges).
+    With IVF lists, only the rows of the `probes` closest centroids are scored.
+    Dense-only: `hybrid` and `sections` are ignored.
+    """
+
+    name = "numpy"
+
+    def __init__(self, vectors: np.ndarray, ids: List[str], payload: pd.DataFrame,
+                 centroids: Optional[np.ndarray] = None, list_order: Optional[np.ndarray] = None,
+                 list_offsets: Optional[np.ndarray] = None, probes: int = IVF_PROBES, meta: Optional[dict] = None):
+        self.vectors = vectors
+        self.ids = ids
+        self.payload = payload.reset_index(drop=True)
+        self.centroids = centroids
+        self.list_order = list_order
+        self.list_offsets = list_offsets
+        self.probes = probes
+        self.meta = meta or {}
+        self.dims = vectors.shape[1]
+        self.numeric = {
+            field: self.payload[field].to_numpy(dtype=np.float64, na_value=np.nan)
+            for field in NUMERIC_FIELDS if field in self.payload
+        }
+        self.records = self.payload.to_dict(orient="records")
+        self.tag_index: Dict[str, np.ndarray] = {}
+        for row, tags in enumerate(self.payload.get("tags", [])):
+            for tag in tags if tags is not None else ():
+                self.tag_index.setdefault(str(tag).lower(), []).append(row)
+        self.tag_index = {tag: np.asarray(rows, dtype=np.int64) for tag, rows in self.tag_index.items()}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    # --- persistence ---
+    @classmethod
+    def load(cls, path: str = NUMPY_INDEX_PATH, collection: Optional[str] = None, probes: int = IVF_PROBES
+             ) -> "NumpyVectorStore":
+        root = Path(path)
+        if not (root / "vectors.npy").exists():
+            raise FileNotFoundError(f"No NumPy index at {path}; build one with `python -m utils.numpy_store`")
+        meta = json.loads((root / "meta.json").read_text())
+        if collection and meta.get("collection") != collection:
+            logger.warning(f"⚠️ NumPy index at {path} was built from '{meta.get('collection')}', not '{collection}'")
+        payload = pd.read_parquet(root / "payload.parquet")
+        ivf = {}
+        if (root / "ivf_centroids.npy").exists():
+            ivf = {
+                "centroids": np.load(root / "ivf_centroids.npy"),
+                "list_order": np.load(root / "ivf_order.npy", mmap_mode="r"),
+                "list_offsets": np.load(root / "ivf_offsets.npy"),
+            }
+        store = cls(np.load(root / "vectors.npy", mmap_mode="r"), payload["id"].tolist(), payload,
+                    probes=probes, meta=meta, **ivf)
+        logger.info(f"Loaded NumPy index with {len(store)} vectors ({store.dims} dims"
+                    f"{f', {len(store.centroids)} IVF lists' if store.centroids is not None else ''}) from {path}")
+        return store
+
+    # --- filtering ---
+    def filter_mask(self, filter_obj: Optional[models.Filter]) -> Optional[np.ndarray]:
+        """Boolean row mask equivalent to a Qdrant `Filter` (must / should / must_not), or None for no filter."""
+        if filter_obj is None:
+            return None
+        mask = np.ones(len(self), dtype=bool)
+        for condition in _as_list(filter_obj.must):
+            mask &= self._condition_mask(condition)
+        should = _as_list(filter_obj.should)
+        if should:
+            any_match = np.zeros(len(self), dtype=bool)
+            for condition in should:
+                any_match |= self._condition_mask(condition)
+            mask &= any_match
+        for condition in _as_list(filter_obj.must_not):
+            mask &= ~self._condition_mask(condition)
+        return mask
+
+    def _condition_mask(self, condition) -> np.ndarray:
+        if isinstance(condition, models.Filter):
+            return self.filter_mask(condition)
+        if isinstance(condition, models.FieldCondition):
+            if condition.match is not None:
+                match = condition.match
+                if isinstance(match, models.MatchValue):
+                    return self._match(condition.key, [match.value])
+                if isinstance(match, models.MatchAny):
+                    return self._match(condition.key, list(match.any))
+            elif condition.range is not None and condition.key in self.numeric:
+                column, bounds = self.numeric[condition.key], condition.range
+                mask = ~np.isnan(column)
+                with np.errstate(invalid="ignore"):
+                    if bounds.gte is not None:
+                        mask &= column >= bounds.gte
+                    if bounds.gt is not None:
+                        mask &= column > bounds.gt
+                    if bounds.lte is not None:
+                        mask &= column <= bounds.lte
+                    if bounds.lt is not None:
+                        mask &= column < bounds.lt
+                return mask
+        raise ValueError(f"Unsupported filter condition for the NumPy backend: {condition!r}")
+
+    def _match(self, key: str, values: list) -> np.ndarray:
+        mask = np.zeros(len(self), dtype=bool)
+        if key == "tags":
+            for value in values:
+                rows = self.tag_index.get(str(value).lower())
+                if rows is not None:
+                    mask[rows] = True
+            return mask
+        if key in self.payload:
+            return self.payload[key].isin(values).to_numpy()
+        return mask
+
+    # --- search ---
+    def search_batch(self, queries, vectors, filters=None, top_k=5, hybrid=False, sections=False):
+        if not len(self):
+            return [[] for _ in vectors]
+        # Matryoshka truncation + normalization in one step (fit_dims on the whole batch)
+        matrix = normalize_rows(np.asarray(vectors, dtype=np.float32)[:, :self.dims])
+        masks = [self.filter_mask(filter_obj) for filter_obj in (filters or [None] * len(matrix))]
+        if self.centroids is not None:
+            results = [self._search_ivf(vector, mask, top_k) for vector, mask in zip(matrix, masks)]
+        else:
+            results = []
+            for start in range(0, len(matrix), QUERY_BLOCK_SIZE):
+                block = matrix[start:start + QUERY_BLOCK_SIZE]
+                scores = block @ self.vectors.T
+                for row, mask in zip(scores, masks[start:start + QUERY_BLOCK_SIZE]):
+                    results.append(self._top_k(row, np.arange(len(self)), mask, top_k))
+        return [[self._hit(row, score) for row, score in result] for result in results]
+
+    def _search_ivf(self, vector: np.ndarray, mask: Optional[np.ndarray], top_k: int):
+        probes = min(self.probes, len(self.centroids))
+        lists = np.argpartition(-(self.centroids @ vector), probes - 1)[:probes]
+        rows = np.concatenate([self.list_order[self.list_offsets[i]:self.list_offsets[i + 1]] for i in lists])
+        result = self._top_k(self.vectors[rows] @ vector, rows, mask, top_k)
+        if len(result) < top_k and mask is not None:
+            # The probed lists held too few matching rows; fall back to exact search over the filter
+            rows = np.flatnonzero(mask)
+            result = self._top_k(self.vectors[rows] @ vector, rows, None, top_k)
+        return result
+
+    @staticmethod
+    def _top_k(scores: np.ndarray, rows: np.ndarray, mask: Optional[np.ndarray], top_k: int):
+        if mask is not None:
+            keep = mask[rows]
+            scores, rows = scores[keep], rows[keep]
+        if not len(scores):
+            return []
+        k = min(top_k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(rows[i]), float(scores[i])) for i in top]
+
+    def _hit(self, row: int, score: float) -> SearchHit:
+        record = self.records[row]
+        return SearchHit(
+            id=self.ids[row],
+            score=score,
+            product_name=record["product_name"] or "",
+            document=record["summary"] or "",
+            reviews=record["review_snippet"] or "",
+            price=_number(record["price"]),
+            rating=_number(record["rating"]),
+            tags=[str(tag) for tag in (record["tags"] if record["tags"] is not None else [])],
+        )
+
+
+def _as_list(conditions) -> list:
+    if conditions is None:
+        return []
+    return conditions if isinstance(conditions, list) else [conditions]
+
+
+def _number(value) -> float:
+    return 0.0 if value is None or pd.isna(value) else float(value)
+
+
+# === Index Build ===
+def build_numpy_index(client=None, collection: str = "ecommerce-products", path: str = NUMPY_INDEX_PATH,
+                      ivf_lists: int = 0) -> dict:
+    """
+    Export a Qdrant collection's dense vectors and display payload into a NumPy index.
+
+    Vectors are normalized and written straight into a memory-mapped `vectors.npy`, so the
+    export never holds the whole matrix in RAM. With `ivf_lists > 0`, spherical k-means
+    centroids and the rows of each inverted list are stored as well.
+    """
+    qdrant = client or get_qdrant_client(collection=collection)
+    if collection.endswith(SECTIONS_SUFFIX):
+        raise ValueError("Build the NumPy index from the product collection, not its section collection")
+    start = time.perf_counter()
+    root = Path(path)
+    root.mkdir(parents=True, exist_ok=True)
+    total = qdrant.count(collection_name=collection, exact=True).count
+    dims = None
+    vectors = None
+    records, row, offset = [], 0, None
+    while True:
+        points, offset = qdrant.scroll(
+            collection_name=collection, limit=SCROLL_BATCH_SIZE, offset=offset,
+            with_payload=DISPLAY_PAYLOAD_FIELDS, with_vectors=True,
+        )
+        for point in points:
+            dense = point.vector.get("") if isinstance(point.vector, dict) else point.vector
+            if vectors is None:
+                dims = len(dense)
+                vectors = np.lib.format.open_memmap(root / "vectors.tmp.npy", mode="w+", dtype=np.float32,
+                                                    shape=(total, dims))
+            vectors[row] = normalize_rows(np.asarray([dense], dtype=np.float32))[0]
+            payload = point.payload or {}
+            records.append({"id": str(point.id), **{field: payload.get(field) for field in DISPLAY_PAYLOAD_FIELDS}})
+            row += 1
+        if offset is None:
+            break
+    if vectors is None:
+        dims = 0
+        vectors = np.lib.format.open_memmap(root / "vectors.tmp.npy", mode="w+", dtype=np.float32, shape=(0, 0))
+    vectors.flush()
+    del vectors
+    os.replace(root / "vectors.tmp.npy", root / "vectors.npy")
+
+    payload = pd.DataFrame.from_records(records, columns=["id", *DISPLAY_PAYLOAD_FIELDS])
+    for field in NUMERIC_FIELDS:
+        payload[field] = pd.to_numeric(payload[field], errors="coerce")
+    payload.to_parquet(root / "payload.parquet", index=False)
+
+    for name in ("ivf_centroids.npy", "ivf_order.npy", "ivf_offsets.npy"):
+        (root / name).unlink(missing_ok=True)
+    if ivf_lists and row:
+        matrix = np.load(root / "vectors.npy", mmap_mode="r")
+        centroids = kmeans(matrix, ivf_lists)
+        assignment = np.concatenate([
+            np.argmax(matrix[i:i + 65536] @ centroids.T, axis=1) for i in range(0, row, 65536)
+        ])
+        order = np.argsort(assignment, kind="stable")
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(assignment, minlength=len(centroids)))])
+        np.save(root / "ivf_centroids.npy", centroids)
+        np.save(root / "ivf_order.npy", order.astype(np.int64))
+        np.save(root / "ivf_offsets.npy", offsets.astype(np.int64))
+
+    meta = {
+        "collection": collection,
+        "points": row,
+        "dims": dims,
+        "ivf_lists": int(ivf_lists) if ivf_lists and row else 0,
+        "built_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    (root / "meta.json").write_text(json.dumps(meta, indent=2))
+    logger.info(f"✅ Exported {row} vectors from '{collection}' to {path} in {time.perf_counter() - start:.2f}s")
+    return meta
+
+
+# === CLI EXECUTION ===
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    parser = argparse.ArgumentParser(description="Export a Qdrant collection into the in-process NumPy search index")
+    parser.add_argument("--collection", default="ecommerce-products")
+    parser.add_argument("--path", default=NUMPY_INDEX_PATH)
+    parser.add_argument("--ivf-lists", type=int, default=0, help="Inverted lists for IVF search (0 = exact search)")
+    args = parser.parse_args()
+
+    print(json.dumps(build_numpy_index(collection=args.collection, path=args.path, ivf_lists=args.ivf_lists), indent=2))
@@ -0,0 +1,159 @@
+import logging
+import os
+import random
+import threading
+import time
+
+from typing import Callable, Dict, Optional, TypeVar
+
+from utils.tracing import REGISTRY, count
+
+logger = logging.getLogger("rate_limit")
+
+# === CONFIG ===
+# Requests per second allowed per provider, shared by every thread of the process (0 = unlimited).
+# Divide the account limit by the number of worker processes.
+API_RATES = {
+    "openai": float(os.getenv("SMARTFIND_OPENAI_RPS", "50")),
+    "cohere": float(os.getenv("SMARTFIND_COHERE_RPS", "10")),
+}
+BURST_SECONDS = 1.0          # bucket capacity = rate * BURST_SECONDS (at least one request)
+ACQUIRE_TIMEOUT_S = float(os.getenv("SMARTFIND_RATE_LIMIT_WAIT_S", "30"))   # longest wait for a request slot
+MAX_RETRIES = int(os.getenv("SMARTFIND_API_RETRIES", "4"))
+BACKOFF_BASE_S = 0.5
+BACKOFF_MAX_S = 20.0
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+# SDK exception classes worth retrying that carry no status code (OpenAI and Cohere SDKs, httpx)
+RETRYABLE_ERRORS = {"APIConnectionError", "APITimeoutError", "RateLimitError", "TooManyRequestsError",
+                    "ServiceUnavailableError", "InternalServerError", "ConnectError", "ReadTimeout",
+                    "ConnectTimeout", "RemoteProtocolError", "TimeoutError", "ConnectionError"}
+
+T = TypeVar("T")
+
+
+class RateLimitTimeout(RuntimeError):
+    """No request slot became free within the acquire timeout."""
+
+
+# === Token Bucket ===
+class TokenBucket:
+    """
+    Thread-safe token bucket: refills at `rate` tokens per second up to `capacity`.
+    A rate of 0 disables the limit.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate * BURST_SECONDS)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.waited_s = 0.0
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, tokens: float = 1.0, timeout: Optional[float] = ACQUIRE_TIMEOUT_S) -> bool:
+        """Take `tokens`, sleeping until they are available; False if that would exceed `timeout`."""
+        if self.rate <= 0:
+            return True
+        start = time.monotonic()
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    self.waited_s += now - start
+                    return True
+                wait = (tokens - self._tokens) / self.rate
+            if timeout is not None and now + wait - start > timeout:
+                return False
+            time.sleep(wait)
+
+    def penalize(self, seconds: float):
+        """Drain the bucket so no request goes out for `seconds` (provider asked us to back off)."""
+        if self.rate <= 0:
+            return
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self._tokens, 0.0) - seconds * self.rate
+
+
+_buckets: Dict[str, TokenBucket] = {}
+_buckets_lock = threading.Lock()
+
+
+def get_bucket(api: str) -> TokenBucket:
+    """Process-wide bucket for a provider (rate from API_RATES)."""
+    if api not in _buckets:
+        with _buckets_lock:
+            if api not in _buckets:
+                _buckets[api] = TokenBucket(API_RATES.get(api, 0.0))
+    return _buckets[api]
+
+
+REGISTRY.register_collector("rate_limit", lambda: {
+    f"{api}_wait_seconds": round(bucket.waited_s, 3) for api, bucket in list(_buckets.items())
+})
+
+
+# === Retry Scheduler ===
+def status_code(error: Exception) -> Optional[int]:
+    code = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    return code if isinstance(code, int) else None
+
+
+def is_retryable(error: Exception) -> bool:
+    """Rate limits, server errors, timeouts and dropped connections; not auth or bad-request errors."""
+    code = status_code(error)
+    if code is not None:
+        return code in RETRYABLE_STATUS
+    return type(error).__name__ in RETRYABLE_ERRORS or isinstance(error, (TimeoutError, ConnectionError))
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    """Seconds from a Retry-After header on the error's response, if the provider sent one."""
+    headers = getattr(error, "headers", None) or getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        value = headers.get("retry-after") or headers.get("Retry-After")
+        return float(value) if value is not None else None
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, base_s: float = BACKOFF_BASE_S, max_s: float = BACKOFF_MAX_S) -> float:
+    """Full-jitter exponential backoff: uniform in [0, min(max_s, base_s * 2**attempt)]."""
+    return random.uniform(0, min(max_s, base_s * 2 ** attempt))
+
+
+def call_api(api: str, func: Callable[[], T], retries: int = MAX_RETRIES) -> T:
+    """
+    Call `func` (one provider request) under the provider's rate limit, retrying
+    retryable failures with jittered exponential backoff.
+
+    Every attempt takes a token from the shared bucket, so retries also respect the
+    limit. A 429 drains the bucket for the Retry-After period (or the backoff delay),
+    pausing all threads instead of only the one that was throttled. Non-retryable
+    errors, and the last error once retries are exhausted, are raised to the caller.
+    """
+    bucket = get_bucket(api)
+    for attempt in range(retries + 1):
+        if not bucket.acquire():
+            count(f"{api}.rate_limit_timeouts")
+            raise RateLimitTimeout(f"No {api} request slot within {ACQUIRE_TIMEOUT_S}s")
+        try:
+            return func()
+        except Exception as e:
+            if attempt == retries or not is_retryable(e):
+                raise
+            delay = retry_after(e) or backoff_delay(attempt)
+            count(f"{api}.retries")
+            logger.warning(f"⚠️ {api} request failed ({type(e).__name__}: {e}); "
+                           f"retry {attempt + 1}/{retries} in {delay:.2f}s")
+            if status_code(e) == 429 and bucket.rate > 0:
+                count(f"{api}.throttled")
+                bucket.penalize(delay)   # the next acquire waits it out, together with every other thread
+            else:
+                time.sleep(delay)
@@ -2,35 +2,33 @@ def format_report(query: str, results: list) -> str:
     """
     Format a ranked list of product documents into a markdown SmartFind research report.
 
-    Each tuple must be:
-      (doc, original_score, reviews, price, rating [, cohere_score])
+    Each result is a `SearchHit`; reranked hits are ordered and labelled by their rerank score.
     """
-    # Sort by reranked cohere_score if available, else fallback to vector_score
-    def score_key(entry):
-        return entry[5] if len(entry) > 5 else entry[1]  # cohere or original
-
-    results = sorted(results, key=score_key, reverse=True)
+    # Sort by reranked score if available, else fallback to vector_score
+    results = sorted(results, key=lambda hit: hit.final_score, reverse=True)
 
     # Build blocks
     blocks = []
-    for i, item in enumerate(results):
-        doc, vec_score, reviews, price, rating, *rest = item
-        coh_score = rest[0] if rest else None
-
+    for i, hit in enumerate(results):
         title = (
             "🏆 Top Recommendation" if i == 0 else
             f"🔹 Alternative #{i+1}"
         )
 
-        score_line = f"**Relevance Score:** {coh_score:.4f}" if coh_score else f"**Vector Score:** {vec_score:.4f}"
+        score_line = (
+            f"**Relevance Score:** {hit.rerank_score:.4f}" if hit.rerank_score is not None
+            else f"**Vector Score:** {hit.score:.4f}"
+        )
+        name_line = f"**{hit.product_name.strip()}**  \n" if hit.product_name else ""
 
         blocks.append(
             f"### {title}\n\n"
+            f"{name_line}"
             f"{score_line}  \n"
-            f"**Price:** ${price:.2f}  \n"
-            f"**Rating:** {rating:.1f} ⭐  \n\n"
-            f"**Product Description:**\n{doc.strip()}\n\n"
-            f"**User Reviews:**\n{reviews.strip() if reviews else 'N/A'}"
+            f"**Price:** ${hit.price:.2f}  \n"
+            f"**Rating:** {hit.rating:.1f} ⭐  \n\n"
+            f"**Product Description:**\n{hit.document.strip()}\n\n"
+            f"**User Reviews:**\n{hit.reviews.strip() if hit.reviews else 'N/A'}"
         )
 
     markdown = f"## 🔍 SmartFind Research Report\n\n### Query\n> {query.strip()}\n\n---\n\n" + "\n\n---\n\n".join(blocks)
@@ -0,0 +1,212 @@
+import logging
+import math
+import os
+import threading
+import time
+import numpy as np
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence
+
+from utils.chunking import truncate_tokens
+from utils.rate_limit import call_api
+from utils.sparse_encoder import get_bm25_encoder, tokenize
+from utils.vector_store import SearchHit
+
+logger = logging.getLogger("rerankers")
+
+# === CONFIG ===
+RERANKER = os.getenv("SMARTFIND_RERANKER", "cohere")    # "cohere" | "features"
+COHERE_MODEL = "rerank-v3.5"
+MAX_DOC_TOKENS = 512           # per-document budget sent to any reranker
+COHERE_RETRIES = 1             # few: a failed request falls back to the local scorer anyway
+
+
+# === Reranker Interface ===
+class Reranker:
+    """
+    Scores retrieved candidates against a query.
+
+    Candidates are `SearchHit`s; `rerank` returns copies carrying the new score in
+    `rerank_score`, sorted by it.
+    Subclasses implement `score_batch`, which scores several (query, candidates)
+    pairs in one call so batch jobs can amortize model/network overhead.
+    """
+
+    name = "base"
+
+    def score_batch(self, queries: Sequence[str], candidate_lists: Sequence[Sequence[SearchHit]]) -> List[List[float]]:
+        raise NotImplementedError
+
+    def score(self, query: str, docs: Sequence[SearchHit]) -> List[float]:
+        return self.score_batch([query], [docs])[0]
+
+    def rerank_batch(self, queries: Sequence[str],
+                     candidate_lists: Sequence[Sequence[SearchHit]]) -> List[List[SearchHit]]:
+        start = time.perf_counter()
+        score_lists = self.score_batch(queries, candidate_lists)
+        reranked = [
+            sorted((hit.with_rerank_score(score) for hit, score in zip(docs, scores)),
+                   key=lambda hit: hit.rerank_score, reverse=True)
+            for docs, scores in zip(candidate_lists, score_lists)
+        ]
+        logger.info(f"✅ {self.name} reranked {sum(len(docs) for docs in candidate_lists)} candidates "
+                    f"for {len(queries)} queries in {time.perf_counter() - start:.3f}s")
+        return reranked
+
+    def rerank(self, query: str, docs: Sequence[SearchHit]) -> List[SearchHit]:
+        if not docs:
+            return []
+        return self.rerank_batch([query], [docs])[0]
+
+
+# === Local Feature-Based Reranker ===
+class FeatureReranker(Reranker):
+    """
+    CPU reranker that needs no network or model download.
+
+    Builds one feature matrix for all candidates of all queries and scores them with a
+    single matrix-vector product. Features: retrieval score, IDF-weighted query term
+    coverage of the (truncated) document, of the product title and of the product tags,
+    rating, and whether the product has reviews.
+
+    The retrieval score is min-max scaled within each candidate list: dense cosines
+    (~0.3-0.8) and hybrid RRF scores (~0.016-0.033) live on different scales, and the
+    weights should mean the same for both.
+    """
+
+    name = "features"
+    FEATURES = ("vector_score", "term_coverage", "title_coverage", "tag_coverage", "rating", "has_reviews")
+    WEIGHTS = np.array([1.0, 0.8, 0.6, 0.3, 0.15, 0.05], dtype=np.float32)
+
+    def __init__(self, weights: Optional[Sequence[float]] = None, max_doc_tokens: int = MAX_DOC_TOKENS):
+        self.weights = np.asarray(weights, dtype=np.float32) if weights is not None else self.WEIGHTS
+        self.max_doc_tokens = max_doc_tokens
+
+    @staticmethod
+    def term_weights(terms: List[str]) -> np.ndarray:
+        """BM25 IDF of each query term from the ingest vocabulary (1.0 when unknown or no vocabulary)."""
+        encoder = get_bm25_encoder()
+        if encoder is None:
+            return np.ones(len(terms), dtype=np.float32)
+        return np.array([
+            encoder.idf(encoder.term_index[term]) if term in encoder.term_index else 1.0 for term in terms
+        ], dtype=np.float32)
+
+    def features(self, query: str, docs: Sequence[SearchHit]) -> np.ndarray:
+        query_terms = list(dict.fromkeys(tokenize(query)))
+        term_weights = self.term_weights(query_terms)
+        total_weight = float(term_weights.sum()) or 1.0
+
+        def coverage(terms: set) -> float:
+            if not query_terms:
+                return 0.0
+            present = np.array([term in terms for term in query_terms], dtype=np.float32)
+            return float(present @ term_weights) / total_weight
+
+        rows = np.zeros((len(docs), len(self.FEATURES)), dtype=np.float32)
+        for i, hit in enumerate(docs):
+            text = truncate_tokens(hit.document, self.max_doc_tokens)
+            title = hit.product_name or text.split("\n\n", 1)[0]
+            rows[i] = (
+                hit.score or 0.0,
+                coverage(set(tokenize(text))),
+                coverage(set(tokenize(title))),
+                coverage({token for tag in hit.tags for token in tokenize(tag)}),
+                (hit.rating or 0.0) / 5.0,
+                1.0 if hit.reviews else 0.0,
+            )
+        if len(rows):
+            scores = rows[:, 0]
+            spread = float(scores.max() - scores.min())
+            rows[:, 0] = (scores - scores.min()) / spread if spread > 0 else 1.0
+        return rows
+
+    def score_batch(self, queries: Sequence[str], candidate_lists: Sequence[Sequence[SearchHit]]) -> List[List[float]]:
+        matrices = [self.features(query, docs) for query, docs in zip(queries, candidate_lists)]
+        if not matrices:
+            return []
+        scores = np.concatenate(matrices) @ self.weights
+        splits = np.cumsum([len(m) for m in matrices])[:-1]
+        return [part.tolist() for part in np.split(scores, splits)]
+
+
+# === Cohere Reranker ===
+class CohereReranker(Reranker):
+    """
+    Cohere Rerank API. Documents are truncated to the token budget before upload and
+    queries in a batch are sent concurrently, under the shared Cohere rate limit. If a
+    request still fails after COHERE_RETRIES retries, that query falls back to the local
+    feature reranker (with a warning) instead of returning the raw order.
+    """
+
+    name = "cohere"
+
+    def __init__(self, model: str = COHERE_MODEL, max_doc_tokens: int = MAX_DOC_TOKENS,
+                 fallback: Optional[Reranker] = None):
+        self.model = model
+        self.max_doc_tokens = max_doc_tokens
+        self.fallback = fallback or FeatureReranker(max_doc_tokens=max_doc_tokens)
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    import cohere
+                    self._client = cohere.Client(os.getenv("COHERE_API_KEY"))
+        return self._client
+
+    def _score_one(self, query: str, docs: Sequence[SearchHit]) -> List[float]:
+        try:
+            documents = [truncate_tokens(hit.document, self.max_doc_tokens) for hit in docs]
+            response = call_api("cohere", lambda: self.client.rerank(
+                query=query,
+                documents=documents,
+                model=self.model,
+                top_n=len(docs),
+                request_options={"max_retries": 0},   # retried by call_api under the shared rate limit
+            ), retries=COHERE_RETRIES)
+            if len(response.results) != len(docs):
+                raise ValueError(f"expected {len(docs)} results, got {len(response.results)}")
+            scores = [0.0] * len(docs)
+            for result in response.results:
+                scores[result.index] = result.relevance_score
+            return scores
+        except Exception as e:
+            logger.warning(f"⚠️ Cohere reranking failed ({e}); using {self.fallback.name} reranker instead")
+            return self.fallback.score(query, docs)
+
+    def score_batch(self, queries: Sequence[str], candidate_lists: Sequence[Sequence[SearchHit]]) -> List[List[float]]:
+        if len(queries) == 1:
+            return [self._score_one(queries[0], candidate_lists[0])]
+        with ThreadPoolExecutor(max_workers=min(8, len(queries))) as pool:
+            return list(pool.map(self._score_one, queries, candidate_lists))
+
+
+# === Registry ===
+RERANKERS = {
+    "cohere": CohereReranker,
+    "features": FeatureReranker,
+}
+_instances: Dict[str, Reranker] = {}
+
+
+def get_reranker(name: Optional[str] = None) -> Reranker:
+    """Shared reranker instance by name (defaults to SMARTFIND_RERANKER)."""
+    name = name or RERANKER
+    if name not in RERANKERS:
+        raise ValueError(f"Unknown reranker '{name}'. Choose from: {sorted(RERANKERS)}")
+    if name not in _instances:
+        _instances[name] = RERANKERS[name]()
+    return _instances[name]
+
+
+def ndcg_at_k(ranked_relevance: Sequence[float], k: int) -> float:
+    """NDCG@k for graded relevance labels listed in ranked order."""
+    def dcg(values):
+        return sum(rel / math.log2(i + 2) for i, rel in enumerate(values[:k]))
+    ideal = dcg(sorted(ranked_relevance, reverse=True))
+    return dcg(list(ranked_relevance)) / ideal if ideal > 0 else 0.0
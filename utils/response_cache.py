@@ -0,0 +1,229 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import numpy as np
+
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from utils.embedding_cache import normalize_text
+from utils.index_manifest import MANIFEST_PATH, read_version
+from utils.tracing import REGISTRY, count
+from utils.vector_store import SearchHit
+
+logger = logging.getLogger("response_cache")
+
+# === CONFIG ===
+RESPONSE_CACHE_PATH = os.getenv("SMARTFIND_RESPONSE_CACHE", "./data/response_cache.sqlite")   # "off" disables
+SIMILARITY_THRESHOLD = float(os.getenv("SMARTFIND_RESPONSE_CACHE_SIMILARITY", "0.95"))  # query embedding cosine
+RESPONSE_TTL_S = float(os.getenv("SMARTFIND_RESPONSE_CACHE_TTL_S", str(6 * 3600)))
+MAX_ITEMS = int(os.getenv("SMARTFIND_RESPONSE_CACHE_ITEMS", "5000"))
+EVICTION_SLACK = 0.1      # fraction of MAX_ITEMS freed per eviction pass
+VERSION_CHECK_S = 5.0     # how often the collection version is re-read from the ingest manifest
+
+
+class CachedResponse(NamedTuple):
+    query: str              # the query the entry was stored for
+    hits: List[SearchHit]
+    report: str
+    similarity: float       # 1.0 for an exact (normalized) match
+
+
+def options_key(options: dict) -> str:
+    return json.dumps(options, sort_keys=True, default=str)
+
+
+def _unit(vector: Sequence[float]) -> np.ndarray:
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+# === Semantic Response Cache ===
+class ResponseCache:
+    """
+    Ranked results and LLM reports of earlier searches, looked up by query similarity.
+
+    An entry is served when it was stored with the same options (collection, models,
+    use_tags, use_reranker, parsed price/rating/age constraints...) and either the same
+    normalized query or a query embedding with cosine >= `threshold`. Entries expire after
+    `ttl_s`, the least recently served ones are evicted beyond `max_items`, and every entry
+    carries the collection version of the ingest manifest, so a completed re-ingest makes
+    all earlier entries unreachable (they are deleted on the next write).
+
+    Entries live in a SQLite table in WAL mode shared by every process on the machine
+    (Gradio workers). Each process keeps a matrix of the stored query embeddings per
+    options key and reloads it when `PRAGMA data_version` reports another process's write.
+    """
+
+    def __init__(self, path: str = RESPONSE_CACHE_PATH, collection: str = "",
+                 threshold: float = SIMILARITY_THRESHOLD, ttl_s: float = RESPONSE_TTL_S,
+                 max_items: int = MAX_ITEMS, manifest_path: str = MANIFEST_PATH):
+        self.collection = collection
+        self.threshold = threshold
+        self.ttl_s = ttl_s
+        self.max_items = max_items
+        self.manifest_path = manifest_path
+        self._lock = threading.Lock()
+        self._index: Dict[Tuple[str, str], Tuple[np.ndarray, np.ndarray]] = {}   # (options, version) -> (ids, vectors)
+        self._data_version = None
+        self._version: Optional[str] = None
+        self._version_read_at = float("-inf")
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "id INTEGER PRIMARY KEY, collection TEXT NOT NULL, version TEXT NOT NULL, options TEXT NOT NULL, "
+            "normalized TEXT NOT NULL, query TEXT NOT NULL, vector BLOB, hits TEXT NOT NULL, report TEXT NOT NULL, "
+            "created_at REAL NOT NULL, last_access REAL NOT NULL, UNIQUE (collection, version, options, normalized))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_access ON responses (last_access)")
+        self._conn.commit()
+
+    # --- invalidation ---
+    def version(self) -> str:
+        """Collection version of the last completed ingest ('' before the first one)."""
+        now = time.monotonic()
+        if now - self._version_read_at > VERSION_CHECK_S:
+            self._version = read_version(self.collection, self.manifest_path) or ""
+            self._version_read_at = now
+        return self._version
+
+    def _sync(self):
+        """Drop the in-memory embedding matrices if another connection wrote since the last check."""
+        data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if data_version != self._data_version:
+            self._index.clear()
+            self._data_version = data_version
+
+    def _vectors(self, options: str, version: str) -> Tuple[np.ndarray, np.ndarray]:
+        key = (options, version)
+        if key not in self._index:
+            rows = self._conn.execute(
+                "SELECT id, vector FROM responses WHERE collection = ? AND version = ? AND options = ? "
+                "AND vector IS NOT NULL AND created_at >= ?",
+                (self.collection, version, options, time.time() - self.ttl_s),
+            ).fetchall()
+            ids = np.array([row[0] for row in rows], dtype=np.int64)
+            vectors = np.stack([np.frombuffer(row[1], dtype=np.float32) for row in rows]) if rows else np.zeros((0, 0), np.float32)
+            self._index[key] = (ids, vectors)
+        return self._index[key]
+
+    # --- public API ---
+    def get(self, query: str, query_vector: Optional[Sequence[float]], options: dict) -> Optional[CachedResponse]:
+        """Cached response for `query` under `options`, or None."""
+        options, version = options_key(options), self.version()
+        oldest = time.time() - self.ttl_s
+        with self._lock:
+            self._sync()
+            row = self._conn.execute(
+                "SELECT id, query, hits, report FROM responses WHERE collection = ? AND version = ? "
+                "AND options = ? AND normalized = ? AND created_at >= ?",
+                (self.collection, version, options, normalize_text(query).lower(), oldest),
+            ).fetchone()
+            similarity = 1.0
+            if row is None and query_vector is not None:
+                ids, vectors = self._vectors(options, version)
+                if len(ids):
+                    similarities = vectors @ _unit(query_vector)
+                    best = int(np.argmax(similarities))
+                    if similarities[best] >= self.threshold:
+                        similarity = float(similarities[best])
+                        row = self._conn.execute(
+                            "SELECT id, query, hits, report FROM responses WHERE id = ? AND created_at >= ?",
+                            (int(ids[best]), oldest),
+                        ).fetchone()
+            if row is None:
+                self._misses += 1
+                count("response_cache.misses")
+                return None
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE id = ?", (time.time(), row[0]))
+            self._conn.commit()
+            self._hits += 1
+        count("response_cache.hits")
+        logger.info(f"Response cache hit for '{query}' (stored for '{row[1]}', similarity {similarity:.3f})")
+        return CachedResponse(row[1], [SearchHit(**hit) for hit in json.loads(row[2])], row[3], similarity)
+
+    def put(self, query: str, query_vector: Optional[Sequence[float]], options: dict,
+            hits: Sequence[SearchHit], report: str):
+        """Store the ranked hits and report of a completed search."""
+        options, version, now = options_key(options), self.version(), time.time()
+        vector = _unit(query_vector).tobytes() if query_vector is not None else None
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (collection, version, options, normalized, query, vector, hits, "
+                "report, created_at, last_access) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (self.collection, version, options, normalize_text(query).lower(), query, vector,
+                 json.dumps([hit.to_dict() for hit in hits], default=str), report, now, now),
+            )
+            self._evict(version)
+            self._conn.commit()
+            self._index.pop((options, version), None)   # own writes do not change data_version
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+            self._index.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+                "items": self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0],
+                "evictions": self._evictions,
+            }
+
+    def _evict(self, version: str):
+        """Delete entries of older collection versions, expired entries, then the least recently served."""
+        removed = self._conn.execute(
+            "DELETE FROM responses WHERE (collection = ? AND version != ?) OR created_at < ?",
+            (self.collection, version, time.time() - self.ttl_s),
+        ).rowcount
+        items = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        if items > self.max_items:
+            excess = items - int(self.max_items * (1 - EVICTION_SLACK))
+            self._conn.execute(
+                "DELETE FROM responses WHERE id IN (SELECT id FROM responses ORDER BY last_access LIMIT ?)",
+                (excess,),
+            )
+            removed += excess
+        if removed:
+            self._evictions += removed
+            logger.info(f"Evicted {removed} cached responses")
+
+
+# === Shared Instance ===
+_caches: Dict[str, ResponseCache] = {}
+_cache_lock = threading.Lock()
+
+
+def get_response_cache(collection: str) -> Optional[ResponseCache]:
+    """
+    Process-wide response cache for `collection` used by the search pipelines, or None
+    when SMARTFIND_RESPONSE_CACHE=off.
+    """
+    if RESPONSE_CACHE_PATH.lower() in ("", "off", "none"):
+        return None
+    if collection not in _caches:
+        with _cache_lock:
+            if collection not in _caches:
+                _caches[collection] = ResponseCache(RESPONSE_CACHE_PATH, collection=collection)
+    return _caches[collection]
+
+
+REGISTRY.register_collector("response_cache", lambda: {
+    key: sum(cache.stats()[key] for cache in list(_caches.values()))
+    for key in ("hits", "misses", "evictions")
+})
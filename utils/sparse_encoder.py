@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import json
+import logging
+import math
+import os
+import re
+import time
+
+from collections import Counter
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from qdrant_client.http.models import SparseVector
+
+logger = logging.getLogger("sparse_encoder")
+
+# === CONFIG ===
+VOCABULARY_PATH = os.getenv("SMARTFIND_BM25_VOCABULARY", "./data/bm25_vocabulary.json")
+SPARSE_VECTOR_NAME = "bm25"
+VOCABULARY_CHECK_S = 5.0       # how often searches check the vocabulary file for a newer version
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Keeps brand/model tokens such as "lego", "10698", "k'nex" -> "k", "nex"; dashes/dots stay inside tokens ("5-7", "1.5")
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[.\-][a-z0-9]+)*")
+STOPWORDS = frozenset("""
+a an and are as at be but by for from has have in into is it its of on or that the their this to was were will with
+you your our we they them product name description information
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in TOKEN_PATTERN.findall(str(text).lower()) if token not in STOPWORDS]
+
+
+# === BM25 Sparse Encoder ===
+class BM25Encoder:
+    """
+    Local BM25 weighting expressed as Qdrant sparse vectors.
+
+    Documents are encoded with the saturated, length-normalized term frequency and
+    queries with the IDF of each term, so the sparse dot product Qdrant computes is the
+    BM25 score. Term indices are append-only: refitting on a new catalog keeps existing
+    indices stable, so already-indexed documents stay valid. IDF only enters at query
+    time; the one statistic baked into stored document vectors is `avg_doc_len`.
+    """
+
+    def __init__(self, k1: float = BM25_K1, b: float = BM25_B):
+        self.k1 = k1
+        self.b = b
+        self.term_index: Dict[str, int] = {}
+        self.doc_freq: Dict[int, int] = {}
+        self.n_docs = 0
+        self.avg_doc_len = 0.0
+
+    def fit(self, docs: Iterable[str], refit_length: bool = True) -> "BM25Encoder":
+        """
+        Recompute document frequencies and average length over `docs` (streamed once).
+        With `refit_length=False` a previously fitted `avg_doc_len` is kept, so vectors of
+        documents that are not re-encoded stay comparable with new ones.
+        """
+        doc_freq: Counter = Counter()
+        n_docs, total_len = 0, 0
+        for doc in docs:
+            tokens = tokenize(doc)
+            n_docs += 1
+            total_len += len(tokens)
+            for term in set(tokens):
+                if term not in self.term_index:
+                    self.term_index[term] = len(self.term_index)
+                doc_freq[self.term_index[term]] += 1
+        self.doc_freq = dict(doc_freq)
+        if refit_length or not self.avg_doc_len:
+            self.avg_doc_len = total_len / n_docs if n_docs else 0.0
+        self.n_docs = n_docs
+        logger.info(f"Fitted BM25 vocabulary: {len(self.term_index)} terms over {n_docs} documents")
+        return self
+
+    def idf(self, index: int) -> float:
+        df = self.doc_freq.get(index, 0)
+        return math.log(1 + (self.n_docs - df + 0.5) / (df + 0.5))
+
+    def encode_document(self, text: str) -> SparseVector:
+        tokens = tokenize(text)
+        doc_len = len(tokens) or 1
+        norm = self.k1 * (1 - self.b + self.b * doc_len / (self.avg_doc_len or doc_len))
+        weights: List[Tuple[int, float]] = []
+        for term, tf in Counter(tokens).items():
+            index = self.term_index.get(term)
+            if index is not None:
+                weights.append((index, tf * (self.k1 + 1) / (tf + norm)))
+        return _sparse(weights)
+
+    def encode_query(self, text: str) -> SparseVector:
+        weights = [
+            (self.term_index[term], self.idf(self.term_index[term]))
+            for term in dict.fromkeys(tokenize(text)) if term in self.term_index
+        ]
+        return _sparse(weights)
+
+    # --- persistence ---
+    def save(self, path: str = VOCABULARY_PATH):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        state = {
+            "k1": self.k1,
+            "b": self.b,
+            "n_docs": self.n_docs,
+            "avg_doc_len": self.avg_doc_len,
+            "terms": {term: [index, self.doc_freq.get(index, 0)] for term, index in self.term_index.items()},
+        }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str = VOCABULARY_PATH) -> "BM25Encoder":
+        with open(path) as f:
+            state = json.load(f)
+        encoder = cls(k1=state["k1"], b=state["b"])
+        encoder.n_docs = state["n_docs"]
+        encoder.avg_doc_len = state["avg_doc_len"]
+        for term, (index, df) in state["terms"].items():
+            encoder.term_index[term] = index
+            if df:
+                encoder.doc_freq[index] = df
+        return encoder
+
+
+def _sparse(weights: List[Tuple[int, float]]) -> SparseVector:
+    from qdrant_client.http.models import SparseVector
+
+    weights.sort()
+    return SparseVector(indices=[index for index, _ in weights], values=[value for _, value in weights])
+
+
+_encoder: Optional[BM25Encoder] = None
+_encoder_mtime: Optional[int] = None
+_encoder_checked_at = float("-inf")
+
+
+def get_bm25_encoder(path: str = VOCABULARY_PATH) -> Optional[BM25Encoder]:
+    """
+    Process-wide encoder loaded from the persisted vocabulary, or None if ingest never built
+    one. The file is re-read when it changes (checked every VOCABULARY_CHECK_S), so a
+    re-ingest or an index import reaches running searches.
+    """
+    global _encoder, _encoder_mtime, _encoder_checked_at
+    now = time.monotonic()
+    if _encoder is None or now - _encoder_checked_at > VOCABULARY_CHECK_S:
+        _encoder_checked_at = now
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return _encoder
+        if mtime != _encoder_mtime:
+            _encoder, _encoder_mtime = BM25Encoder.load(path), mtime
+    return _encoder
+
+
+def reload_bm25_encoder(path: str = VOCABULARY_PATH) -> Optional[BM25Encoder]:
+    """Re-read the vocabulary now instead of at the next periodic check."""
+    global _encoder_checked_at
+    _encoder_checked_at = float("-inf")
+    return get_bm25_encoder(path)
@@ -0,0 +1,152 @@
+import json
+import logging
+import math
+import os
+import numpy as np
+
+from concurrent.futures import Executor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+
+from utils.numpy_store import kmeans, normalize_rows
+from utils.tracing import count
+
+logger = logging.getLogger("tagging")
+
+# === CONFIG ===
+TAG_ANCHORS_PATH = os.getenv("SMARTFIND_TAG_ANCHORS", "./data/tag_anchors.npz")
+LABEL_RATIO = float(os.getenv("SMARTFIND_TAG_LABEL_RATIO", "0.05"))   # share of new products sent to the LLM
+MIN_LABELS = 10                # anchors labelled per round at least, so small batches still cover their categories
+MIN_ANCHOR_SIMILARITY = 0.6    # products less similar than this to every anchor get new anchors
+NEIGHBORS = 5                  # anchors voting on each product's tags
+# Similarity-weighted share of the votes a tag needs. Kept low: search filters match any
+# query tag, so a missing tag hides a product while an extra one only widens the candidates.
+MIN_TAG_SHARE = 0.25
+MAX_TAGS = 8                   # same cap as PRODUCT_TAGGING_PROMPT
+FALLBACK_TAG = "misc"
+
+
+# === Bulk Tagger ===
+class BulkTagger:
+    """
+    Tags a catalog with a few LLM calls by propagating the tags of labelled "anchor"
+    products to their nearest neighbours in embedding space.
+
+    For each batch, products whose cosine to every anchor is below `min_similarity` are
+    clustered with spherical k-means (`label_ratio` of them, at least MIN_LABELS); the
+    product closest to each centroid (the medoid) is tagged by `label_fn` and becomes an
+    anchor. Every product in the batch then gets the tags carried by at least `min_share`
+    of the similarity-weighted votes of its `neighbors` nearest anchors, as one matrix
+    product over the batch; anchors keep their own tags. Beyond MIN_LABELS per batch, at most
+    `label_ratio` of the products reach the LLM, and later batches (or runs, see `save`/`load`) only pay
+    for regions of the catalog no anchor covers yet.
+    """
+
+    def __init__(self, label_fn: Callable[[str], List[str]], label_ratio: float = LABEL_RATIO,
+                 min_similarity: float = MIN_ANCHOR_SIMILARITY, neighbors: int = NEIGHBORS,
+                 min_share: float = MIN_TAG_SHARE, max_tags: int = MAX_TAGS, dims: Optional[int] = None):
+        self.label_fn = label_fn
+        self.label_ratio = label_ratio
+        self.min_similarity = min_similarity
+        self.neighbors = neighbors
+        self.min_share = min_share
+        self.max_tags = max_tags
+        self.anchors = np.zeros((0, dims or 0), dtype=np.float32)
+        self.anchor_tags: List[List[str]] = []
+        self.vocabulary: Dict[str, int] = {}
+        self._incidence = np.zeros((0, 0), dtype=np.float32)   # (anchors, vocabulary) 0/1
+        self.labelled = 0          # label_fn calls made by this instance
+
+    def __len__(self) -> int:
+        return len(self.anchor_tags)
+
+    def add_anchors(self, vectors: np.ndarray, tags: Sequence[List[str]]):
+        """Add labelled products (normalized embeddings and their tags) as anchors."""
+        if not len(tags):
+            return
+        vectors = normalize_rows(np.asarray(vectors, dtype=np.float32))
+        self.anchors = vectors if not len(self) else np.vstack([self.anchors, vectors])
+        for product_tags in tags:
+            self.anchor_tags.append(list(product_tags))
+            for tag in product_tags:
+                self.vocabulary.setdefault(tag, len(self.vocabulary))
+        self._incidence = np.zeros((len(self), len(self.vocabulary)), dtype=np.float32)
+        for row, product_tags in enumerate(self.anchor_tags):
+            self._incidence[row, [self.vocabulary[tag] for tag in product_tags]] = 1.0
+
+    def tag(self, docs: Sequence[str], embeddings: Sequence[Sequence[float]],
+            executor: Optional[Executor] = None) -> List[List[str]]:
+        """Tags for every document, labelling new anchors first where the batch is not covered."""
+        if not len(docs):
+            return []
+        vectors = normalize_rows(np.asarray(embeddings, dtype=np.float32))
+        if len(self) and self.anchors.shape[1] != vectors.shape[1]:
+            raise ValueError(f"Tag anchors have {self.anchors.shape[1]} dims, embeddings have {vectors.shape[1]}")
+
+        similarity = vectors @ self.anchors.T if len(self) else np.zeros((len(docs), 0), dtype=np.float32)
+        best = similarity.max(axis=1) if len(self) else np.full(len(docs), -np.inf)
+        uncovered = np.flatnonzero(best < self.min_similarity)
+        own_tags: Dict[int, List[str]] = {}
+        if len(uncovered):
+            clusters = min(len(uncovered), max(MIN_LABELS, math.ceil(len(uncovered) * self.label_ratio)))
+            centroids = kmeans(vectors[uncovered], clusters)
+            medoids = np.unique(uncovered[np.argmax(vectors[uncovered] @ centroids.T, axis=0)])
+            docs_to_label = [docs[row] for row in medoids]
+            labels = list(executor.map(self.label_fn, docs_to_label) if executor else map(self.label_fn, docs_to_label))
+            self.labelled += len(medoids)
+            count("tagging.llm_labels", len(medoids))
+            labelled = [(row, tags) for row, tags in zip(medoids, labels) if tags]
+            own_tags = dict(labelled)
+            self.add_anchors(vectors[[row for row, _ in labelled]], [tags for _, tags in labelled])
+            similarity = vectors @ self.anchors.T if len(self) else similarity
+            logger.info(f"Labelled {len(medoids)} anchors for {len(uncovered)} uncovered products "
+                        f"({len(self)} anchors, {len(self.vocabulary)} tags)")
+
+        tags = self.propagate(similarity)
+        for row, product_tags in own_tags.items():
+            tags[row] = product_tags
+        return tags
+
+    def propagate(self, similarity: np.ndarray) -> List[List[str]]:
+        """Weighted kNN vote over the anchors, given the (products, anchors) cosine matrix."""
+        if not len(self):
+            return [[FALLBACK_TAG] for _ in range(len(similarity))]
+        k = min(self.neighbors, len(self))
+        nearest = np.argpartition(-similarity, k - 1, axis=1)[:, :k]
+        weights = np.zeros_like(similarity)
+        np.put_along_axis(weights, nearest, np.clip(np.take_along_axis(similarity, nearest, axis=1), 1e-6, None), axis=1)
+        shares = (weights @ self._incidence) / weights.sum(axis=1, keepdims=True)
+
+        names = np.array(list(self.vocabulary), dtype=object)
+        closest = np.argmax(similarity, axis=1)
+        results = []
+        for row, row_shares in enumerate(shares):
+            order = np.argsort(-row_shares)[:self.max_tags]
+            chosen = [str(names[i]) for i in order if row_shares[i] >= self.min_share]
+            results.append(chosen or self.anchor_tags[closest[row]][:self.max_tags])
+        return results
+
+    # --- persistence ---
+    def save(self, path: str = TAG_ANCHORS_PATH, **meta):
+        """Write anchors, their tags and `meta` (e.g. the models that produced them) to one .npz file."""
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        tmp = f"{path}.tmp.npz"
+        np.savez(tmp, anchors=self.anchors, tags=np.array(json.dumps(self.anchor_tags)),
+                 meta=np.array(json.dumps(meta, sort_keys=True)))
+        os.replace(tmp, path)
+
+    def load(self, path: str = TAG_ANCHORS_PATH, **meta) -> bool:
+        """
+        Add the anchors saved at `path` if they were saved with the same `meta`.
+        Returns False (keeping no anchors) when the file is missing or incompatible.
+        """
+        if not Path(path).exists():
+            return False
+        with np.load(path) as data:
+            saved_meta = json.loads(str(data["meta"]))
+            if saved_meta != json.loads(json.dumps(meta, sort_keys=True)):
+                logger.info(f"Ignoring tag anchors at {path}: saved for {saved_meta}, not {meta}")
+                return False
+            self.add_anchors(data["anchors"], json.loads(str(data["tags"])))
+        logger.info(f"Loaded {len(self)} tag anchors from {path}")
+        return True
@@ -0,0 +1,305 @@
+import contextvars
+import functools
+import inspect
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Callable, Dict, Iterator, List, NamedTuple, Optional
+
+if TYPE_CHECKING:
+    from http.server import ThreadingHTTPServer
+
+logger = logging.getLogger("tracing")
+
+# === CONFIG ===
+METRICS_PORT = int(os.getenv("SMARTFIND_METRICS_PORT", "0"))    # serve /metrics on this port (0 = off)
+METRIC_PREFIX = "smartfind"
+# Stage latency histogram buckets (seconds): fine below 100 ms for Qdrant/cache hits, coarse for LLM calls
+LATENCY_BUCKETS_S = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+# === Per-Request Trace ===
+class Span(NamedTuple):
+    stage: str
+    start_s: float       # offset from the start of the trace
+    duration_s: float
+    error: Optional[str]
+
+
+class Trace:
+    """
+    Timings and counters of one request.
+
+    Every `Timer` that runs while the trace is active (see `trace`) appends a span, and
+    every `count` adds to its counters: tokens and bytes sent to OpenAI, cache hits and
+    misses, results returned. Worker threads started with `asyncio.to_thread` inherit the
+    trace; plain thread pools do not.
+    """
+
+    def __init__(self, name: str):
+        self.id = uuid.uuid4().hex
+        self.name = name
+        self.started_at = time.time()
+        self.duration_s: Optional[float] = None
+        self.spans: List[Span] = []
+        self.counts: Dict[str, float] = {}
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def add_span(self, stage: str, start: float, duration_s: float, error: Optional[str] = None):
+        with self._lock:
+            self.spans.append(Span(stage, round(start - self._start, 6), round(duration_s, 6), error))
+
+    def add(self, key: str, value: float = 1):
+        with self._lock:
+            self.counts[key] = self.counts.get(key, 0) + value
+
+    def stage_seconds(self) -> Dict[str, float]:
+        """Total time per stage (stages may nest, e.g. `search` includes `llm.embedding`)."""
+        totals: Dict[str, float] = {}
+        for span in self.spans:
+            totals[span.stage] = round(totals.get(span.stage, 0.0) + span.duration_s, 6)
+        return totals
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "name": self.name,
+            "started_at": self.started_at,
+            "duration_s": self.duration_s,
+            "stages": self.stage_seconds(),
+            "spans": [span._asdict() for span in sorted(self.spans, key=lambda span: span.start_s)],
+            "counts": dict(self.counts),
+        }
+
+    def __repr__(self):
+        stages = ", ".join(f"{stage}={seconds:.3f}s" for stage, seconds in self.stage_seconds().items())
+        return f"Trace({self.name}, {self.duration_s or 0:.3f}s: {stages})"
+
+
+_current_trace: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar("smartfind_trace", default=None)
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+@contextmanager
+def trace(name: str = "request") -> Iterator[Trace]:
+    """Collect spans and counters of everything run inside the block into a new `Trace`."""
+    active = Trace(name)
+    token = _current_trace.set(active)
+    error = None
+    try:
+        yield active
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        _current_trace.reset(token)
+        active.duration_s = round(time.perf_counter() - active._start, 6)
+        REGISTRY.observe(name, active.duration_s, error)
+
+
+# === Stage Timer ===
+class Timer:
+    """
+    Times a pipeline stage, as a context manager or a decorator.
+
+    Each run is observed in the stage latency histogram and, inside a `trace`, recorded
+    as a span. Decorated generator functions are timed until the generator is exhausted
+    or closed, so streaming stages include the time spent producing every chunk.
+
+        with Timer("search"):
+            ...
+
+        @Timer("llm.chat")
+        def call_chat(...): ...
+    """
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        self._start = 0.0
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        record(self.stage, self._start, time.perf_counter() - self._start, exc_type.__name__ if exc_type else None)
+        return False
+
+    def __call__(self, func: Callable) -> Callable:
+        stage = self.stage
+        if inspect.isgeneratorfunction(func):
+            @functools.wraps(func)
+            def timed_generator(*args, **kwargs):
+                with Timer(stage):
+                    yield from func(*args, **kwargs)
+            return timed_generator
+
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            with Timer(stage):
+                return func(*args, **kwargs)
+        return timed
+
+
+def record(stage: str, start: float, duration_s: float, error: Optional[str] = None):
+    """Observe a stage duration measured elsewhere (`start` is a `time.perf_counter()` value)."""
+    REGISTRY.observe(stage, duration_s, error)
+    active = _current_trace.get()
+    if active is not None:
+        active.add_span(stage, start, duration_s, error)
+
+
+def count(key: str, value: float = 1):
+    """Add to a counter (tokens, bytes, cache hits...) globally and on the active trace."""
+    if not value:
+        return
+    REGISTRY.increment(key, value)
+    active = _current_trace.get()
+    if active is not None:
+        active.add(key, value)
+
+
+# === Metrics Registry ===
+def metric_name(key: str) -> str:
+    return f"{METRIC_PREFIX}_" + re.sub(r"[^a-zA-Z0-9_]", "_", key)
+
+
+class MetricsRegistry:
+    """
+    Process-wide stage latency histograms, error counts and counters, rendered in the
+    Prometheus text exposition format (scrape it and alert on `histogram_quantile(0.95, ...)`).
+
+    Components with their own statistics (caches) register a collector returning gauge
+    values, read at scrape time.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS_S):
+        self.buckets = tuple(buckets)
+        self._histograms: Dict[str, list] = {}      # stage -> [bucket counts..., +Inf count, sum]
+        self._errors: Dict[str, int] = {}
+        self._counters: Dict[str, float] = {}
+        self._collectors: Dict[str, Callable[[], Dict[str, float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage: str, seconds: float, error: Optional[str] = None):
+        with self._lock:
+            histogram = self._histograms.setdefault(stage, [0] * (len(self.buckets) + 1) + [0.0])
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    histogram[i] += 1
+            histogram[len(self.buckets)] += 1
+            histogram[-1] += seconds
+            if error:
+                self._errors[stage] = self._errors.get(stage, 0) + 1
+
+    def increment(self, key: str, value: float = 1):
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def register_collector(self, name: str, collector: Callable[[], Dict[str, float]]):
+        self._collectors[name] = collector
+
+    def snapshot(self) -> dict:
+        """Counts, mean and bucket-interpolated p50/p95 per stage, plus counters."""
+        with self._lock:
+            histograms = {stage: list(values) for stage, values in self._histograms.items()}
+            counters = dict(self._counters)
+        stages = {}
+        for stage, values in histograms.items():
+            total = values[len(self.buckets)]
+            stages[stage] = {
+                "count": total,
+                "mean_s": round(values[-1] / total, 6) if total else None,
+                "p50_s": self._quantile(values, 0.5),
+                "p95_s": self._quantile(values, 0.95),
+                "errors": self._errors.get(stage, 0),
+            }
+        return {"stages": stages, "counters": counters}
+
+    def _quantile(self, values: list, q: float) -> Optional[float]:
+        total = values[len(self.buckets)]
+        if not total:
+            return None
+        rank, lower, below = q * total, 0.0, 0
+        for bound, cumulative in zip(self.buckets, values):
+            if cumulative >= rank:
+                return round(lower + (bound - lower) * (rank - below) / max(cumulative - below, 1), 6)
+            lower, below = bound, cumulative
+        return self.buckets[-1]
+
+    def render(self) -> str:
+        with self._lock:
+            histograms = {stage: list(values) for stage, values in self._histograms.items()}
+            errors = dict(self._errors)
+            counters = dict(self._counters)
+
+        name = metric_name("stage_duration_seconds")
+        lines = [f"# HELP {name} Latency of search pipeline stages.", f"# TYPE {name} histogram"]
+        for stage, values in sorted(histograms.items()):
+            for bound, cumulative in zip(self.buckets, values):
+                lines.append(f'{name}_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{stage="{stage}",le="+Inf"}} {values[len(self.buckets)]}')
+            lines.append(f'{name}_sum{{stage="{stage}"}} {values[-1]:.6f}')
+            lines.append(f'{name}_count{{stage="{stage}"}} {values[len(self.buckets)]}')
+
+        name = metric_name("stage_errors_total")
+        lines += [f"# HELP {name} Pipeline stages that raised.", f"# TYPE {name} counter"]
+        lines += [f'{name}{{stage="{stage}"}} {value}' for stage, value in sorted(errors.items())]
+
+        for key, value in sorted(counters.items()):
+            name = metric_name(f"{key}_total")
+            lines += [f"# TYPE {name} counter", f"{name} {value:g}"]
+
+        for collector_name, collector in sorted(self._collectors.items()):
+            try:
+                gauges = collector()
+            except Exception as e:
+                logger.warning(f"⚠️ Metrics collector '{collector_name}' failed: {e}")
+                continue
+            for key, value in sorted(gauges.items()):
+                name = metric_name(f"{collector_name}_{key}")
+                lines += [f"# TYPE {name} gauge", f"{name} {float(value):g}"]
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+def render_prometheus() -> str:
+    return REGISTRY.render()
+
+
+# === /metrics Endpoint ===
+def serve_metrics(port: int = METRICS_PORT, host: str = "0.0.0.0") -> "ThreadingHTTPServer":
+    """Serve `GET /metrics` in Prometheus text format from a daemon thread."""
+    # http.server (and the email package it loads) is only imported when metrics are served
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    logger.info(f"📈 Serving Prometheus metrics on http://{host}:{server.server_port}/metrics")
+    return server
@@ -1,14 +1,591 @@
-from qdrant_client import QdrantClient
-from qdrant_client.http.models import Distance, VectorParams
+from __future__ import annotations
 
-def init_qdrant(path="./qdrant_storage", collection="ecommerce-products"):
-    client = QdrantClient(path=path)
-    if collection not in [c.name for c in client.get_collections().collections]:
+import logging
+import os
+import threading
+import time
+import numpy as np
+
+from typing import TYPE_CHECKING, Dict, List, NamedTuple, Optional, Sequence
+
+from utils.sparse_encoder import SPARSE_VECTOR_NAME, get_bm25_encoder
+
+if TYPE_CHECKING:   # qdrant_client takes ~0.5s to import; modules import it where they use it
+    from qdrant_client import QdrantClient, models
+
+logger = logging.getLogger("vector_store")
+
+# === CONFIG ===
+QDRANT_PATH = os.getenv("QDRANT_PATH", "./qdrant_storage")
+QDRANT_URL = os.getenv("QDRANT_URL")          # e.g. http://localhost:6333 — takes precedence over QDRANT_PATH
+QDRANT_API_KEY = os.getenv("QDRANT_API_KEY")
+QDRANT_TIMEOUT_S = int(os.getenv("QDRANT_TIMEOUT_S", "10"))
+COLLECTION_PROFILE = os.getenv("SMARTFIND_COLLECTION_PROFILE", "default")
+EMBEDDING_DIMS = 1536          # text-embedding-3-small
+VECTOR_BACKEND = os.getenv("SMARTFIND_VECTOR_BACKEND", "qdrant")     # "qdrant" | "numpy"
+HYBRID_PREFETCH_MULTIPLIER = 4      # candidates per retriever = top_k * multiplier before fusion
+SECTION_PREFETCH_MULTIPLIER = 4     # section chunks fetched per product slot before grouping
+QUERY_BATCH_SIZE = 64               # searches per query_batch_points request
+
+# Payload fields used in search filters: numeric ranges on price/rating, exact match on tags
+# (values are `PayloadSchemaType` names)
+PAYLOAD_INDEXES = {
+    "price": "float",
+    "rating": "float",
+    "tags": "keyword",
+}
+
+# Child collection with one point per document section, grouped back to products by `parent_id`
+SECTIONS_SUFFIX = "-sections"
+SECTION_PAYLOAD_INDEXES = {**PAYLOAD_INDEXES, "parent_id": "keyword"}
+
+
+# === Collection Profiles ===
+class CollectionProfile(NamedTuple):
+    """
+    Storage layout of a new collection.
+
+    `dims` below EMBEDDING_DIMS keeps a Matryoshka prefix of each text-embedding-3-small
+    vector (re-normalized), which the model is trained to support. Quantized profiles
+    keep the compressed vectors in RAM and rescore the top candidates (see
+    QUANTIZATION_OVERSAMPLING) against the original vectors, which can then live on disk.
+    """
+    dims: int = EMBEDDING_DIMS
+    quantization: Optional[str] = None    # None | "int8" | "binary"
+    on_disk: bool = False                 # original vectors memory-mapped from disk
+    hnsw_m: int = 16
+    hnsw_ef_construct: int = 100
+
+
+PROFILES: Dict[str, CollectionProfile] = {
+    "default": CollectionProfile(),
+    "int8": CollectionProfile(quantization="int8", on_disk=True),
+    "binary": CollectionProfile(quantization="binary", on_disk=True),
+    "int8-512": CollectionProfile(dims=512, quantization="int8", on_disk=True),
+    "compact": CollectionProfile(dims=768, quantization="int8", on_disk=True, hnsw_m=8, hnsw_ef_construct=64),
+}
+# Candidates rescored with the original vectors = limit * oversampling
+QUANTIZATION_OVERSAMPLING = {"int8": 2.0, "binary": 3.0}
+
+
+def get_profile(name: Optional[str] = None) -> CollectionProfile:
+    name = name or COLLECTION_PROFILE
+    if name not in PROFILES:
+        raise ValueError(f"Unknown collection profile '{name}'. Choose from: {sorted(PROFILES)}")
+    return PROFILES[name]
+
+
+def fit_dims(vector, dims: int) -> List[float]:
+    """Matryoshka-truncate an embedding to `dims` and re-normalize it (no-op at full size)."""
+    if len(vector) <= dims:
+        return vector
+    head = np.asarray(vector[:dims], dtype=np.float32)
+    norm = float(np.linalg.norm(head))
+    return (head / norm if norm else head).tolist()
+
+
+# === Search Results ===
+# Payload fields fetched at query time; the raw `document`/`reviews` stay in the payload but are never read back
+DISPLAY_PAYLOAD_FIELDS = ["product_name", "summary", "review_snippet", "price", "rating", "tags"]
+
+
+class SearchHit:
+    """One retrieved product with the display fields the reranker and report need."""
+
+    __slots__ = ("id", "score", "product_name", "document", "reviews", "price", "rating", "tags", "rerank_score")
+
+    def __init__(self, id, score: float, product_name: str = "", document: str = "", reviews: str = "",
+                 price: float = 0.0, rating: float = 0.0, tags: Optional[List[str]] = None,
+                 rerank_score: Optional[float] = None):
+        self.id = id
+        self.score = score
+        self.product_name = product_name
+        self.document = document
+        self.reviews = reviews
+        self.price = price
+        self.rating = rating
+        self.tags = tags or []
+        self.rerank_score = rerank_score
+
+    @classmethod
+    def from_point(cls, point, score: Optional[float] = None) -> "SearchHit":
+        """Hit from a scored point, or from a payload-only record (e.g. a group lookup) plus `score`."""
+        payload = point.payload or {}
+        return cls(
+            id=str(point.id),
+            score=point.score if score is None else score,
+            product_name=payload.get("product_name") or "",
+            document=payload.get("summary") or "",
+            reviews=payload.get("review_snippet") or "",
+            price=payload.get("price") or 0.0,
+            rating=payload.get("rating") or 0.0,
+            tags=payload.get("tags") or [],
+        )
+
+    @property
+    def final_score(self) -> float:
+        """Reranker score if the hit was reranked, else the retrieval score."""
+        return self.rerank_score if self.rerank_score is not None else self.score
+
+    def with_rerank_score(self, score: float) -> "SearchHit":
+        return SearchHit(self.id, self.score, self.product_name, self.document, self.reviews,
+                         self.price, self.rating, self.tags, score)
+
+    def to_dict(self) -> dict:
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+    def __repr__(self) -> str:
+        return f"SearchHit(id={self.id!r}, score={self.final_score:.4f}, product_name={self.product_name[:40]!r})"
+
+
+# === Shared Client ===
+class _SerializedClient:
+    """
+    Proxy that serializes calls into an embedded (path-based) QdrantClient.
+
+    Local mode keeps the collection in this process and is not safe for concurrent
+    writers, so every call takes the same lock. Server clients are thread-safe and
+    are returned unwrapped.
+    """
+
+    def __init__(self, client: QdrantClient):
+        self._client = client
+        self._lock = threading.RLock()
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if not callable(attr):
+            return attr
+
+        def locked(*args, **kwargs):
+            with self._lock:
+                return attr(*args, **kwargs)
+        return locked
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def _client_key(path: str, url: Optional[str]) -> str:
+    return f"url:{url}" if url else f"path:{os.path.abspath(path)}"
+
+
+def _create_client(path: str, url: Optional[str]):
+    from qdrant_client import QdrantClient
+
+    if url:
+        logger.info(f"Connecting to Qdrant server at {url}")
+        return QdrantClient(url=url, api_key=QDRANT_API_KEY, timeout=QDRANT_TIMEOUT_S)
+    logger.info(f"Opening embedded Qdrant storage at {path}")
+    return _SerializedClient(QdrantClient(path=path))
+
+
+def is_embedded(client) -> bool:
+    """Whether `client` runs Qdrant in this process (path or ':memory:') rather than talking to a server."""
+    from qdrant_client.local.qdrant_local import QdrantLocal
+
+    inner = client._client if isinstance(client, _SerializedClient) else client
+    return isinstance(getattr(inner, "_client", inner), QdrantLocal)
+
+
+def get_qdrant_client(path=QDRANT_PATH, collection="ecommerce-products", url=QDRANT_URL):
+    """
+    Return the process-wide Qdrant client for `url` (server mode) or `path` (embedded mode),
+    creating it on first use. Callers must not close it; use `reset_qdrant_client` instead.
+    """
+    key = _client_key(path, url)
+    client = _clients.get(key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is None:
+                client = _clients[key] = _create_client(path, url)
+    return client
+
+
+def reset_qdrant_client(path=QDRANT_PATH, url=QDRANT_URL):
+    """Close and forget the shared client so the next call reconnects (e.g. after a failed health check)."""
+    with _clients_lock:
+        client = _clients.pop(_client_key(path, url), None)
+    if client is not None:
+        try:
+            client.close()
+        except Exception as e:
+            logger.warning(f"⚠️ Error while closing Qdrant client: {e}")
+
+
+def check_qdrant_health(path=QDRANT_PATH, collection="ecommerce-products", url=QDRANT_URL) -> dict:
+    """
+    Probe the shared client: server version, whether `collection` exists and round-trip latency.
+    Works for both an embedded storage path and a Qdrant server URL.
+    """
+    start = time.perf_counter()
+    try:
+        client = get_qdrant_client(path=path, url=url)
+        version = client.info().version
+        exists = client.collection_exists(collection)
+        return {
+            "ok": True,
+            "mode": "server" if url else "embedded",
+            "version": version,
+            "collection_exists": exists,
+            "latency_ms": round((time.perf_counter() - start) * 1000, 2),
+        }
+    except Exception as e:
+        logger.warning(f"⚠️ Qdrant health check failed: {e}")
+        return {
+            "ok": False,
+            "mode": "server" if url else "embedded",
+            "error": str(e),
+            "latency_ms": round((time.perf_counter() - start) * 1000, 2),
+        }
+
+
+def quantization_config(profile: CollectionProfile):
+    from qdrant_client import models
+
+    if profile.quantization == "int8":
+        return models.ScalarQuantization(scalar=models.ScalarQuantizationConfig(
+            type=models.ScalarType.INT8, quantile=0.99, always_ram=True
+        ))
+    if profile.quantization == "binary":
+        return models.BinaryQuantization(binary=models.BinaryQuantizationConfig(always_ram=True))
+    return None
+
+
+def ensure_collection(client, collection="ecommerce-products", profile: Optional[CollectionProfile] = None):
+    """
+    Create `collection` (cosine dense vector laid out per `profile`, plus the BM25 sparse
+    vector) if it does not exist. Existing collections keep the layout they were created with.
+    """
+    from qdrant_client import models
+
+    profile = profile or get_profile()
+    if not client.collection_exists(collection):   # also true for aliases (imported artifacts)
         client.create_collection(
             collection_name=collection,
-            vectors_config=VectorParams(size=1536, distance=Distance.COSINE)
+            vectors_config=models.VectorParams(
+                size=profile.dims,
+                distance=models.Distance.COSINE,
+                on_disk=profile.on_disk,
+                hnsw_config=models.HnswConfigDiff(m=profile.hnsw_m, ef_construct=profile.hnsw_ef_construct),
+            ),
+            sparse_vectors_config={SPARSE_VECTOR_NAME: models.SparseVectorParams()},
+            quantization_config=quantization_config(profile),
         )
+
+
+def init_qdrant(path=QDRANT_PATH, collection="ecommerce-products", url=QDRANT_URL, sections: bool = False,
+                profile: Optional[CollectionProfile] = None):
+    """Shared client with `collection` (and, with `sections=True`, its section collection) created if missing."""
+    client = get_qdrant_client(path=path, url=url)
+    ensure_collection(client, collection, profile)
+    if sections:
+        ensure_collection(client, sections_collection_name(collection), profile)
+    if url:  # embedded storage ignores payload indexes
+        ensure_payload_indexes(client, collection)
+        if sections:
+            ensure_payload_indexes(client, sections_collection_name(collection), SECTION_PAYLOAD_INDEXES)
     return client
 
-def get_qdrant_client(path="./qdrant_storage", collection="ecommerce-products"):
-    return QdrantClient(path=path)
+
+def sections_collection_name(collection="ecommerce-products") -> str:
+    return f"{collection}{SECTIONS_SUFFIX}"
+
+
+class CollectionLayout(NamedTuple):
+    dims: int
+    search_params: Optional[models.SearchParams]
+
+
+_layouts: Dict[str, CollectionLayout] = {}
+
+
+def collection_layout(client, collection="ecommerce-products") -> CollectionLayout:
+    """
+    Dense vector size and query-time search params of an existing collection, read once per
+    process: queries must be truncated to the same Matryoshka prefix, and quantized
+    collections are searched with rescoring against the original vectors.
+    """
+    if collection not in _layouts:
+        from qdrant_client import models
+
+        config = client.get_collection(collection).config
+        vectors = config.params.vectors
+        vectors = vectors.get("", next(iter(vectors.values()))) if isinstance(vectors, dict) else vectors
+        quantization = vectors.quantization_config or config.quantization_config
+        search_params = None
+        if quantization is not None:
+            kind = "binary" if isinstance(quantization, models.BinaryQuantization) else "int8"
+            search_params = models.SearchParams(quantization=models.QuantizationSearchParams(
+                rescore=True, oversampling=QUANTIZATION_OVERSAMPLING[kind]
+            ))
+        _layouts[collection] = CollectionLayout(dims=vectors.size, search_params=search_params)
+    return _layouts[collection]
+
+
+def has_sparse_vectors(client, collection="ecommerce-products", name=SPARSE_VECTOR_NAME) -> bool:
+    """Whether the collection was created with the named BM25 sparse vector (older collections were not)."""
+    sparse_config = client.get_collection(collection).config.params.sparse_vectors or {}
+    return name in sparse_config
+
+
+def ensure_payload_indexes(client, collection="ecommerce-products", indexes=PAYLOAD_INDEXES):
+    """Create any missing payload index from `indexes` (no-op for fields already indexed)."""
+    existing = client.get_collection(collection).payload_schema or {}
+    for field, schema in indexes.items():
+        if field not in existing:
+            client.create_payload_index(collection_name=collection, field_name=field, field_schema=schema)
+
+
+# === Search Backends ===
+class VectorStore:
+    """
+    Product retrieval behind `semantic_search`.
+
+    Backends take query embeddings at full size (they truncate to their own Matryoshka
+    dims) plus an optional Qdrant `Filter`, and return `SearchHit`s carrying the display
+    fields. Subclasses implement `search_batch`, so batch jobs can amortize per-request cost.
+    `hybrid` and `sections` are hints that backends without BM25/section indexes ignore.
+    """
+
+    name = "base"
+
+    def search_batch(self, queries: Sequence[str], vectors: Sequence[List[float]],
+                     filters: Optional[Sequence[Optional[models.Filter]]] = None, top_k: int = 5,
+                     hybrid: bool = False, sections: bool = False) -> List[List[SearchHit]]:
+        raise NotImplementedError
+
+    def search(self, query: str, vector: List[float], filter_obj: Optional[models.Filter] = None, top_k: int = 5,
+               hybrid: bool = False, sections: bool = False) -> List[SearchHit]:
+        return self.search_batch([query], [vector], [filter_obj], top_k, hybrid, sections)[0]
+
+    def warm_up(self):
+        """Open connections and read lazily loaded collection metadata before the first search."""
+
+
+class QdrantVectorStore(VectorStore):
+    """
+    Qdrant collection (embedded or server) with optional BM25 hybrid fusion and
+    per-product max-sim over the section collection.
+    """
+
+    name = "qdrant"
+
+    def __init__(self, collection: str = "ecommerce-products", client=None):
+        self.collection = collection
+        self.sections_collection = sections_collection_name(collection)
+        self._client = client
+        self._section_support: Optional[bool] = None
+        self._sparse_support: Dict[str, bool] = {}
+
+    @property
+    def client(self):
+        return self._client or get_qdrant_client(collection=self.collection)
+
+    def warm_up(self):
+        collection_layout(self.client, self.collection)
+        self.supports_sparse(self.collection)
+        if self.has_section_index():
+            collection_layout(self.client, self.sections_collection)
+            self.supports_sparse(self.sections_collection)
+
+    def search_batch(self, queries, vectors, filters=None, top_k=5, hybrid=False, sections=False):
+        """
+        Searches for several queries go out as `query_batch_points` requests of up to
+        QUERY_BATCH_SIZE queries each instead of one round trip per query.
+        """
+        filters = filters or [None] * len(queries)
+        if not queries:
+            return []
+        if sections and self.has_section_index():
+            return self.section_search_batch(queries, vectors, filters, top_k, hybrid)
+
+        layout = collection_layout(self.client, self.collection)
+        requests = [
+            self._query_request(self.collection, query, fit_dims(vector, layout.dims), filter_obj, top_k, top_k,
+                                layout.search_params, DISPLAY_PAYLOAD_FIELDS, hybrid)
+            for query, vector, filter_obj in zip(queries, vectors, filters)
+        ]
+        return [
+            [SearchHit.from_point(point) for point in response.points]
+            for response in self._query_batch(self.collection, requests)
+        ]
+
+    def _query_request(self, collection: str, query: str, dense: List[float], filter_obj: Optional[models.Filter],
+                       limit: int, prefetch_limit: int, search_params, with_payload, hybrid: bool) -> models.QueryRequest:
+        """Dense request, or dense + BM25 prefetches fused with RRF when `hybrid` and sparse support allow."""
+        from qdrant_client import models
+
+        sparse = self.sparse_query_vector(query, collection) if hybrid else None
+        if sparse is None:
+            return models.QueryRequest(query=dense, filter=filter_obj, params=search_params, limit=limit,
+                                       with_payload=with_payload)
+        prefetch_limit *= HYBRID_PREFETCH_MULTIPLIER
+        return models.QueryRequest(
+            prefetch=[
+                models.Prefetch(query=dense, filter=filter_obj, limit=prefetch_limit, params=search_params),
+                models.Prefetch(query=sparse, using=SPARSE_VECTOR_NAME, filter=filter_obj, limit=prefetch_limit),
+            ],
+            query=models.FusionQuery(fusion=models.Fusion.RRF),
+            limit=limit,
+            with_payload=with_payload
+        )
+
+    def _query_batch(self, collection: str, requests: List[models.QueryRequest]) -> List[models.QueryResponse]:
+        responses = []
+        for start in range(0, len(requests), QUERY_BATCH_SIZE):
+            responses.extend(self.client.query_batch_points(
+                collection_name=collection, requests=requests[start:start + QUERY_BATCH_SIZE]
+            ))
+        return responses
+
+    def section_search_batch(self, queries: Sequence[str], vectors: Sequence[List[float]],
+                             filters: Sequence[Optional[models.Filter]], top_k: int,
+                             hybrid: bool) -> List[List[SearchHit]]:
+        """
+        Search the section chunks and aggregate them per product (max-sim).
+
+        Each product is ranked by its best section (title, description, specs or a review
+        window). Dense-only searches group chunks by `parent_id` server-side and look up the
+        products' display payload in the same request (Qdrant has no batched group query,
+        so these run one per query). Hybrid searches fuse dense and BM25 chunk candidates
+        with RRF in one batched request, keep the first (best) chunk per product
+        client-side, and fetch all products in a single `retrieve`, because embedded Qdrant
+        drops prefetch queries and filters inside group queries.
+        """
+        qdrant = self.client
+        layout = collection_layout(qdrant, self.sections_collection)
+        search_params = layout.search_params
+        dense = [fit_dims(vector, layout.dims) for vector in vectors]
+        if not (hybrid and self.supports_sparse(self.sections_collection)):
+            return [
+                self._section_groups(vector, filter_obj, top_k, search_params)
+                for vector, filter_obj in zip(dense, filters)
+            ]
+
+        limit = top_k * SECTION_PREFETCH_MULTIPLIER
+        requests = [
+            self._query_request(self.sections_collection, query, vector, filter_obj, limit, limit, search_params,
+                                ["parent_id"], hybrid)
+            for query, vector, filter_obj in zip(queries, dense, filters)
+        ]
+        rankings = []
+        for response in self._query_batch(self.sections_collection, requests):
+            best = {}
+            for chunk in response.points:
+                best.setdefault(chunk.payload["parent_id"], chunk.score)
+            rankings.append(list(best.items())[:top_k])
+
+        parent_ids = list(dict.fromkeys(pid for ranking in rankings for pid, _ in ranking))
+        products = {
+            str(point.id): point
+            for point in qdrant.retrieve(self.collection, ids=parent_ids, with_payload=DISPLAY_PAYLOAD_FIELDS)
+        } if parent_ids else {}
+        return [
+            [SearchHit.from_point(products[pid], score=score) for pid, score in ranking if pid in products]
+            for ranking in rankings
+        ]
+
+    def _section_groups(self, dense: List[float], filter_obj: Optional[models.Filter], top_k: int,
+                        search_params) -> List[SearchHit]:
+        from qdrant_client import models
+
+        groups = self.client.query_points_groups(
+            collection_name=self.sections_collection,
+            group_by="parent_id",
+            query=dense,
+            query_filter=filter_obj,
+            search_params=search_params,
+            limit=top_k,
+            group_size=1,
+            with_payload=False,
+            with_lookup=models.WithLookup(collection=self.collection, with_payload=DISPLAY_PAYLOAD_FIELDS,
+                                          with_vectors=False),
+        ).groups
+        return [SearchHit.from_point(group.lookup, score=group.hits[0].score) for group in groups if group.lookup]
+
+    def has_section_index(self) -> bool:
+        """Whether ingest built the section collection (checked once per store)."""
+        if self._section_support is None:
+            qdrant = self.client
+            self._section_support = (
+                qdrant.collection_exists(self.sections_collection)
+                and qdrant.count(collection_name=self.sections_collection, exact=False).count > 0
+            )
+        return self._section_support
+
+    def supports_sparse(self, collection: Optional[str] = None) -> bool:
+        """Whether the collection carries BM25 vectors and the vocabulary is available (checked once per store)."""
+        collection = collection or self.collection
+        if collection not in self._sparse_support:
+            self._sparse_support[collection] = has_sparse_vectors(self.client, collection)
+        return self._sparse_support[collection] and get_bm25_encoder() is not None
+
+    def sparse_query_vector(self, query: str, collection: Optional[str] = None) -> Optional[models.SparseVector]:
+        """BM25 query vector, or None if the collection/vocabulary lacks sparse support or no term is known."""
+        if not self.supports_sparse(collection):
+            return None
+        sparse = get_bm25_encoder().encode_query(query)
+        return sparse if sparse.indices else None
+
+
+_stores: Dict[tuple, VectorStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_vector_store(backend: Optional[str] = None, collection: str = "ecommerce-products") -> VectorStore:
+    """Shared search backend by name (defaults to SMARTFIND_VECTOR_BACKEND)."""
+    backend = backend or VECTOR_BACKEND
+    key = (backend, collection)
+    if key not in _stores:
+        with _stores_lock:
+            if key not in _stores:
+                if backend == "qdrant":
+                    _stores[key] = QdrantVectorStore(collection)
+                elif backend == "numpy":
+                    from utils.numpy_store import NumpyVectorStore
+                    _stores[key] = NumpyVectorStore.load(collection=collection)
+                else:
+                    raise ValueError(f"Unknown vector backend '{backend}'. Choose from: ['numpy', 'qdrant']")
+    return _stores[key]
+
+
+# === Aliases ===
+def collection_aliases(client) -> Dict[str, str]:
+    """{alias: collection} for every alias known to the server (or embedded storage)."""
+    return {alias.alias_name: alias.collection_name for alias in client.get_aliases().aliases}
+
+
+def swap_aliases(client, targets: Dict[str, Optional[str]]):
+    """
+    Point every alias in `targets` at its collection (or remove it, for None) in one
+    `update_collection_aliases` request, which a Qdrant server applies atomically: searches
+    by alias move from the old collections to the new ones at once. Cached layouts of the
+    aliases are dropped in this process.
+    """
+    from qdrant_client import models
+
+    current = collection_aliases(client)
+    operations = []
+    for alias, collection in targets.items():
+        if alias in current:
+            operations.append(models.DeleteAliasOperation(delete_alias=models.DeleteAlias(alias_name=alias)))
+        if collection is not None:
+            operations.append(models.CreateAliasOperation(
+                create_alias=models.CreateAlias(collection_name=collection, alias_name=alias)
+            ))
+    client.update_collection_aliases(change_aliases_operations=operations)
+    for alias in targets:
+        invalidate_collection(alias)
+    logger.info(f"🔀 Aliases now point to {targets}")
+
+
+def invalidate_collection(collection: str):
+    """Forget the cached layout and capabilities of `collection`, e.g. after its alias moved."""
+    _layouts.pop(collection, None)
+    for store in list(_stores.values()):
+        if isinstance(store, QdrantVectorStore) and collection in (store.collection, store.sections_collection):
+            store._section_support = None
+            store._sparse_support.clear()